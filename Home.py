@@ -1,5 +1,7 @@
 import streamlit as st
 
+from cloud_roasters.assets import inject_styles, render_logo
+
 # ========== Page Setup ==========
 st.set_page_config(
     page_title="Cloud Roasters | Home",
@@ -9,75 +11,10 @@ st.set_page_config(
 )
 
 # ========== Styling ==========
-st.markdown("""
-    <style>
-    [data-testid="stAppViewContainer"] {
-        background-color: #C8b49c;
-    }
-
-    [data-testid="collapsedControl"] {
-        display: none;
-    }
-
-    .home-container {
-        max-width: 800px;
-        margin: 0 auto;
-        background-color: #000000;
-        color: white;
-        padding: 2.5rem;
-        border-radius: 16px;
-        text-align: center;
-        box-shadow: 0 4px 20px rgba(0,0,0,0.2);
-    }
-
-    .home-container h1 {
-        font-size: 2.8rem;
-        margin-bottom: 0.75rem;
-    }
-
-    .home-container p {
-        font-size: 1.2rem;
-        margin-bottom: 3rem;  /* Space added between text and buttons */
-    }
-
-    .nav-buttons {
-        display: flex;
-        justify-content: center;
-        gap: 2rem;
-        margin-top: 2rem;
-        flex-wrap: wrap;
-    }
-
-    .nav-button {
-        padding: 1.2rem 2.5rem;
-        font-size: 1.3rem;
-        font-weight: 600;
-        border-radius: 10px;
-        background-color: #000000;
-        color: white;
-        border: 2px solid white;
-        cursor: pointer;
-        transition: background-color 0.3s ease, transform 0.2s ease;
-    }
-
-    .nav-button:hover {
-        background-color: #333333;
-        transform: translateY(-2px);
-    }
-
-    /* Space between logo and home container */
-    .stImage {
-        margin-bottom: 2rem;
-    }
-
-    a {
-        text-decoration: none;
-    }
-    </style>
-""", unsafe_allow_html=True)
+inject_styles("home")
 
 # ========== Logo ==========
-st.image("logo.png", use_container_width=True)
+render_logo()
 
 # ========== Welcome Block ==========
 with st.container():
@@ -94,6 +31,9 @@ with st.container():
                 <a href="Cloud_Roasters_Assistant" target="_self">
                     <button class="nav-button">Cloud Roasters Assistant</button>
                 </a>
+                <a href="Roasting_Dashboard" target="_self">
+                    <button class="nav-button">Roasting Dashboard</button>
+                </a>
             </div>
         </div>
     """, unsafe_allow_html=True)
@@ -0,0 +1 @@
+"""Headless benchmarks for the Cloud Roasters pages; see ``benchmarks/run.py``."""
@@ -0,0 +1,97 @@
+"""Local stand-in for Mistral's chat completions endpoint.
+
+It streams a canned answer as server-sent events after a configurable
+time-to-first-token, with a delay between chunks, and finishes with a
+``usage`` chunk the way Mistral does. Questions about roasting data get
+SQL; anything matching ``PROSE_WORDS`` gets a prose answer. Statuses queued
+with ``fail_next()`` are returned (with ``Retry-After: 0``) before answering,
+to exercise client retries.
+"""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROSE_WORDS = re.compile(r"\b(pair|pairs|brew|brewing|flavour|flavor|taste)\b", re.IGNORECASE)
+SQL_ANSWER = (
+    'SELECT "ROASTERY", COUNT(*) AS BATCHES, AVG("WEIGHT_LOSS") AS AVG_WEIGHT_LOSS '
+    'FROM ROASTING_REPORTS GROUP BY "ROASTERY" ORDER BY BATCHES DESC'
+)
+PROSE_ANSWER = (
+    "A washed Ethiopian roasted light pairs well with citrus and stone fruit; "
+    "brew it as a pour-over at around 93°C to keep the florals bright."
+)
+
+
+class MockMistral:
+    def __init__(self, first_token_latency=0.3, chunk_delay=0.01, chunk_chars=12):
+        self.first_token_latency = first_token_latency
+        self.chunk_delay = chunk_delay
+        self.chunk_chars = chunk_chars
+        self.requests = 0
+        self._failures = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="mock-mistral", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def fail_next(self, *statuses):
+        with self._lock:
+            self._failures.extend(statuses)
+
+    def answer_for(self, messages):
+        question = messages[-1]["content"] if messages else ""
+        return PROSE_ANSWER if PROSE_WORDS.search(question) else SQL_ANSWER
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with mock._lock:
+                    mock.requests += 1
+                    failure = mock._failures.pop(0) if mock._failures else None
+                if failure is not None:
+                    self.send_response(failure)
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                answer = mock.answer_for(body.get("messages", []))
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                time.sleep(mock.first_token_latency)
+                for start in range(0, len(answer), mock.chunk_chars):
+                    delta = answer[start:start + mock.chunk_chars]
+                    self._event({"choices": [{"delta": {"content": delta}}]})
+                    time.sleep(mock.chunk_delay)
+                prompt_chars = sum(len(message["content"]) for message in body.get("messages", []))
+                self._event({
+                    "choices": [],
+                    "usage": {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(answer) // 4},
+                })
+                self.wfile.write(b"data: [DONE]\n\n")
+
+            def _event(self, payload):
+                self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+        return Handler
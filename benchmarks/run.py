@@ -0,0 +1,330 @@
+"""Headless benchmarks for the Cloud Roasters pages.
+
+Drives ``Home.py``, the roasting report form and the assistant through
+Streamlit's ``AppTest`` against a DuckDB stand-in for Snowflake and a mock
+Mistral server. It reports p50/p95 wall time per interaction with warehouse
+statements, pool checkouts and Mistral requests per run, and it can save the
+report as JSON and compare it with an earlier baseline.
+
+    python -m benchmarks.run --iterations 20 --llm-latency 0.3 --save baseline
+    python -m benchmarks.run --compare benchmarks/baselines/baseline.json
+    python -m benchmarks.run --tracing-overhead
+
+``--tracing-overhead`` runs every interaction a second time with tracing
+switched off, interleaved with the traced runs so both see the same warm
+caches, and reports how much slower the traced p50 is.
+
+Background work (the write-behind flusher, mirror syncs, warm-ups) lands in
+whichever interaction it overlaps, so per-run call counts are averages.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINES = ROOT / "benchmarks" / "baselines"
+RESULTS = ROOT / "benchmarks" / "results"
+
+FORM_SUBMIT = "FormSubmitter:roasting_form-Submit"
+FORM_CONFIRM = "confirm_report"
+ASSISTANT_SUBMIT = "FormSubmitter:llm_roaster_form-Ask"
+
+
+class Bench:
+    def __init__(self, standin, pool, mistral, secrets, iterations, tracing_overhead=False):
+        self.standin = standin
+        self.pool = pool
+        self.mistral = mistral
+        self.secrets = secrets
+        self.iterations = iterations
+        self.tracing_overhead = tracing_overhead
+        self.results = {}
+
+    def app(self, page):
+        from streamlit.testing.v1 import AppTest
+
+        at = AppTest.from_file(str(ROOT / page), default_timeout=60)
+        for section, values in self.secrets.items():
+            at.secrets[section] = values
+        at.run()
+        self.check(at, page)
+        return at
+
+    def check(self, at, label):
+        if at.exception:
+            raise RuntimeError(f"{label} raised: {at.exception[0].message}")
+
+    def timed(self, interaction, index, traced):
+        from cloud_roasters.tracing import set_enabled
+
+        set_enabled(traced)
+        try:
+            started = time.perf_counter()
+            interaction(index)
+            return (time.perf_counter() - started) * 1000
+        finally:
+            set_enabled(True)
+
+    def measure(self, name, interaction, iterations=None, warmup=0):
+        from cloud_roasters.metrics import percentile
+
+        for index in range(warmup):
+            interaction(-1 - index)
+        calls_before = self.standin.snapshot()
+        checkouts_before = self.pool.stats.checkouts
+        requests_before = self.mistral.requests
+        timings = []
+        untraced = []
+        runs = iterations or self.iterations
+        for index in range(runs):
+            if not self.tracing_overhead:
+                timings.append(self.timed(interaction, index, traced=True))
+                continue
+            # Untraced runs get their own indexes so cache-busting questions
+            # stay unique; the order alternates so neither mode always goes first.
+            for traced in (index % 2 == 0, index % 2 != 0):
+                if traced:
+                    timings.append(self.timed(interaction, index, traced=True))
+                else:
+                    untraced.append(self.timed(interaction, runs + index, traced=False))
+        interactions = runs + len(untraced)
+        timings.sort()
+        untraced.sort()
+        calls_after = self.standin.snapshot()
+        statements = {
+            keyword: round((calls_after.get(keyword, 0) - calls_before.get(keyword, 0)) / interactions, 2)
+            for keyword in calls_after
+            if calls_after.get(keyword, 0) != calls_before.get(keyword, 0)
+        }
+        self.results[name] = {
+            "runs": runs,
+            "p50_ms": round(percentile(timings, 0.5), 2),
+            "p95_ms": round(percentile(timings, 0.95), 2),
+            "mean_ms": round(statistics.fmean(timings), 2),
+            "calls_per_run": {
+                "warehouse_statements": statements,
+                "pool_checkouts": round((self.pool.stats.checkouts - checkouts_before) / interactions, 2),
+                "mistral_requests": round((self.mistral.requests - requests_before) / interactions, 2),
+            },
+        }
+        if untraced:
+            untraced_p50 = percentile(untraced, 0.5)
+            self.results[name]["untraced_p50_ms"] = round(untraced_p50, 2)
+            self.results[name]["tracing_overhead_pct"] = round(
+                (percentile(timings, 0.5) - untraced_p50) / untraced_p50 * 100, 1
+            )
+
+    # ---------- scenarios ----------
+    def home(self):
+        at = self.app("Home.py")
+        self.measure("home.rerun", lambda index: at.run())
+
+    def form(self):
+        at = self.app("pages/1_Roasting_Report_Form.py")
+        self.measure("form.rerun", lambda index: at.run())
+
+        def submit(index):
+            at.text_input(key="bean_code").input(f"BENCH-{index}")
+            at.button(key=FORM_SUBMIT).click()
+            at.run()
+            self.check(at, "form submit")
+            at.button(key=FORM_CONFIRM).click()
+            at.run()
+            self.check(at, "form confirm")
+            if not at.success:
+                raise RuntimeError(f"form submit failed: {[error.value for error in at.error]}")
+
+        self.measure("form.submit", submit)
+
+    def assistant(self):
+        at = self.app("pages/2_Cloud_Roasters_Assistant.py")
+        self.measure("assistant.rerun", lambda index: at.run())
+
+        def ask(question_for):
+            def interaction(index):
+                at.text_area[0].input(question_for(index))
+                at.button(key=ASSISTANT_SUBMIT).click()
+                at.run()
+                self.check(at, "assistant question")
+                if at.error:
+                    raise RuntimeError(f"question failed: {[error.value for error in at.error]}")
+            return interaction
+
+        self.measure("assistant.question.intent", ask(lambda index: "Show me the latest batch from Coogee"))
+        self.measure("assistant.question.llm_sql", ask(lambda index: f"How many batches per roastery, run {index}?"))
+        self.measure("assistant.question.llm_cached", ask(lambda index: "How many batches per roastery overall?"), warmup=1)
+        self.measure("assistant.question.prose", ask(lambda index: f"What pairs with an Ethiopian roast, run {index}?"))
+
+    def run(self, scenarios):
+        for scenario in scenarios:
+            getattr(self, scenario)()
+        return self.results
+
+
+def seed(standin, pool, rows):
+    import numpy as np
+    import pandas as pd
+
+    from cloud_roasters.batch_ids import BLOCK_SIZE
+    from cloud_roasters.constants import ORIGINS, ROAST_LEVELS, STORES
+    from cloud_roasters.rollups import create_rollups
+    from cloud_roasters.schema import run_migrations
+
+    rng = np.random.default_rng(7)
+    today = datetime.date.today()
+    frame = pd.DataFrame({
+        "BATCH_ID": np.arange(1, rows + 1),
+        "ROASTERY": rng.choice(STORES, rows),
+        "ROAST_DATE": [today - datetime.timedelta(days=int(days)) for days in rng.integers(0, 365, rows)],
+        "BEAN_CODE": [f"SEED-{index}" for index in range(rows)],
+        "ORIGIN": rng.choice(ORIGINS, rows),
+        "MOISTURE_CONTENT": rng.uniform(9, 12, rows).round(2),
+        "ROAST_LEVEL": rng.choice(ROAST_LEVELS, rows),
+        "ROAST_DURATION_MINS": rng.integers(9, 16, rows),
+        "FIRST_CRACK_TIME_MINS": rng.integers(7, 11, rows),
+        "DEVELOPMENT_TIME_MINS": rng.integers(1, 4, rows),
+        "GREEN_BEAN_WEIGHT_KG": np.full(rows, 20.0),
+        "ROASTED_WEIGHT_KG": rng.uniform(16, 18, rows).round(2),
+        "ROAST_NOTES": "",
+    })
+    frame["WEIGHT_LOSS"] = ((frame["GREEN_BEAN_WEIGHT_KG"] - frame["ROASTED_WEIGHT_KG"]) / frame["GREEN_BEAN_WEIGHT_KG"] * 100).round(2)
+    frame["SUBMISSION_TIMESTAMP"] = pd.Timestamp.now().floor("s")
+
+    with pool.connection() as conn:
+        run_migrations(conn)
+    # Loaded directly rather than through write_reports, then the rollups
+    # are rebuilt the same way migration 3 backfills them.
+    standin.load_frame("ROASTING_REPORTS", frame)
+    with pool.connection() as conn, conn.cursor() as cursor:
+        create_rollups(cursor)
+    # The sequence was created before the seed rows; move past them.
+    standin.execute_raw("DROP SEQUENCE IF EXISTS ROASTING_REPORTS_BATCH_SEQ")
+    standin.execute_raw(f"CREATE SEQUENCE ROASTING_REPORTS_BATCH_SEQ START {rows + 1} INCREMENT BY {BLOCK_SIZE}")
+
+
+def compare(report, baseline, tolerance):
+    regressions = []
+    print(f"\n{'scenario':34} {'base p50':>10} {'p50':>10} {'base p95':>10} {'p95':>10}")
+    for name, result in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            print(f"{name:34} {'-':>10} {result['p50_ms']:>10.1f} {'-':>10} {result['p95_ms']:>10.1f}")
+            continue
+        flag = ""
+        if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(
+            f"{name:34} {before['p50_ms']:>10.1f} {result['p50_ms']:>10.1f} "
+            f"{before['p95_ms']:>10.1f} {result['p95_ms']:>10.1f}{flag}"
+        )
+    return regressions
+
+
+def print_report(report):
+    print(f"\n{'scenario':34} {'runs':>5} {'p50 ms':>9} {'p95 ms':>9}  calls per run")
+    for name, result in report["scenarios"].items():
+        calls = result["calls_per_run"]
+        statements = ", ".join(f"{keyword} {count:g}" for keyword, count in sorted(calls["warehouse_statements"].items()))
+        print(
+            f"{name:34} {result['runs']:>5} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f}  "
+            f"sql[{statements}] checkouts {calls['pool_checkouts']:g} mistral {calls['mistral_requests']:g}"
+        )
+    overheads = {name: result for name, result in report["scenarios"].items() if "tracing_overhead_pct" in result}
+    if overheads:
+        print(f"\n{'scenario':34} {'off p50':>9} {'on p50':>9} {'overhead':>9}")
+        for name, result in overheads.items():
+            print(
+                f"{name:34} {result['untraced_p50_ms']:>9.1f} {result['p50_ms']:>9.1f} "
+                f"{result['tracing_overhead_pct']:>8.1f}%"
+            )
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=5000, help="seed rows in the stand-in ROASTING_REPORTS")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="mock Mistral time to first token (s)")
+    parser.add_argument("--chunk-delay", type=float, default=0.01, help="mock Mistral delay between chunks (s)")
+    parser.add_argument("--scenarios", nargs="+", default=["home", "form", "assistant"], choices=["home", "form", "assistant"])
+    parser.add_argument("--output", type=Path, help="write the JSON report here (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--save", metavar="NAME", help="also save the report as benchmarks/baselines/NAME.json")
+    parser.add_argument("--compare", type=Path, metavar="BASELINE", help="compare against a saved JSON report")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument(
+        "--tracing-overhead", action="store_true", help="also time every interaction with tracing off and compare"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Local state has to be redirected before cloud_roasters is imported.
+    os.environ["CLOUD_ROASTERS_DATA_DIR"] = tempfile.mkdtemp(prefix="cloud-roasters-bench-")
+    sys.path.insert(0, str(ROOT))
+
+    from benchmarks.mock_mistral import MockMistral
+    from benchmarks.standin import StandIn
+    from cloud_roasters.metrics import llm_usage_summary, timing_summary
+    from cloud_roasters.pool import ConnectionPool
+
+    standin = StandIn()
+    pool = ConnectionPool(standin.connect)
+    mistral = MockMistral(first_token_latency=args.llm_latency, chunk_delay=args.chunk_delay).start()
+    secrets = {
+        "mistral": {"api_key": "benchmark", "base_url": mistral.base_url},
+        # The stand-in cannot estimate scans, so the EXPLAIN budget is off.
+        "sql_guard": {"explain_max_mb": 0},
+    }
+    try:
+        with mock.patch("cloud_roasters.db.get_pool", lambda: pool):
+            seed(standin, pool, args.rows)
+            bench = Bench(standin, pool, mistral, secrets, args.iterations, tracing_overhead=args.tracing_overhead)
+            scenarios = bench.run(args.scenarios)
+    finally:
+        mistral.stop()
+
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "iterations": args.iterations,
+            "rows": args.rows,
+            "llm_latency_s": args.llm_latency,
+            "chunk_delay_s": args.chunk_delay,
+            "tracing_overhead": args.tracing_overhead,
+            "python": sys.version.split()[0],
+        },
+        "scenarios": scenarios,
+        "stages": timing_summary(),
+        "llm_usage": llm_usage_summary(),
+    }
+    print_report(report)
+
+    output = args.output or RESULTS / f"{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, default=str))
+    print(f"\nReport written to {output}")
+    if args.save:
+        BASELINES.mkdir(parents=True, exist_ok=True)
+        baseline_path = BASELINES / f"{args.save}.json"
+        baseline_path.write_text(json.dumps(report, indent=2, default=str))
+        print(f"Baseline saved to {baseline_path}")
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text()), args.tolerance)
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
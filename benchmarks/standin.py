@@ -0,0 +1,141 @@
+"""DuckDB stand-in for Snowflake.
+
+Statements arrive in Snowflake SQL with pyformat ``%s`` placeholders and
+are translated for DuckDB: sequence syntax is rewritten by hand and
+everything else goes through sqlglot. Every execution is counted by its
+leading keyword, so a benchmark can report warehouse round trips per
+interaction. ``ConnectionPool(StandIn(...).connect)`` can then replace
+``cloud_roasters.db.get_pool()``.
+"""
+
+import collections
+import itertools
+import re
+import threading
+
+import duckdb
+import sqlglot
+
+NEXTVAL = re.compile(r"(\w+)\.NEXTVAL", re.IGNORECASE)
+SEQUENCE_OPTIONS = re.compile(r"START\s*=\s*(\d+)\s+INCREMENT\s*=\s*(\d+)", re.IGNORECASE)
+GENERATOR = re.compile(r"TABLE\s*\(\s*GENERATOR\s*\(\s*ROWCOUNT\s*=>\s*(\d+)\s*\)\s*\)", re.IGNORECASE)
+EXPLAIN = re.compile(r"^\s*EXPLAIN\s+USING\s+JSON\s+", re.IGNORECASE)
+PASSTHROUGH = ("BEGIN", "COMMIT", "ROLLBACK")
+
+
+def translate(sql):
+    sql = sql.replace("%s", "?")
+    if sql.strip().upper() in PASSTHROUGH:
+        return sql
+    sql = NEXTVAL.sub(lambda match: f"nextval('{match.group(1)}')", sql)
+    sql = SEQUENCE_OPTIONS.sub(r"START \1 INCREMENT BY \2", sql)
+    sql = GENERATOR.sub(r"range(\1)", sql)
+    if "nextval(" in sql or "SEQUENCE" in sql.upper():
+        return sql
+    try:
+        return sqlglot.transpile(sql, read="snowflake", write="duckdb")[0]
+    except sqlglot.errors.ParseError:
+        return sql
+
+
+class StandInCursor:
+    def __init__(self, standin, conn):
+        self._standin = standin
+        self._conn = conn
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def execute(self, sql, params=None, timeout=None, **kwargs):
+        self._standin.count(sql)
+        if EXPLAIN.match(sql):
+            # No scan estimate locally; report an empty plan.
+            self._rows = iter([("{}",)])
+            self.description = [("plan",)]
+            return self
+        self._conn.execute(translate(sql), list(params) if params else [])
+        self.description = self._conn.description
+        self._rows = None
+        return self
+
+    def executemany(self, sql, rows):
+        self._standin.count(sql)
+        self._conn.executemany(translate(sql), [list(row) for row in rows])
+        return self
+
+    def fetchone(self):
+        if self._rows is not None:
+            return next(self._rows, None)
+        return self._conn.fetchone()
+
+    def fetchall(self):
+        if self._rows is not None:
+            return list(self._rows)
+        return self._conn.fetchall()
+
+    def fetchmany(self, size=1):
+        if self._rows is not None:
+            return list(itertools.islice(self._rows, size))
+        return self._conn.fetchmany(size)
+
+    def close(self):
+        pass
+
+
+class StandInConnection:
+    def __init__(self, standin, conn, session_id):
+        self._standin = standin
+        self._conn = conn
+        self.session_id = session_id
+
+    def cursor(self):
+        return StandInCursor(self._standin, self._conn)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        try:
+            self._conn.rollback()
+        except duckdb.TransactionException:
+            pass
+
+    def close(self):
+        self._conn.close()
+
+
+class StandIn:
+    def __init__(self, path=":memory:"):
+        self._base = duckdb.connect(path)
+        self._sessions = itertools.count(1)
+        self._lock = threading.Lock()
+        self.calls = collections.Counter()
+
+    def connect(self):
+        with self._lock:
+            self.calls["CONNECT"] += 1
+        return StandInConnection(self, self._base.cursor(), next(self._sessions))
+
+    def load_frame(self, table, frame):
+        # Bulk seeding, not counted as a warehouse call.
+        self._base.register("frame_to_load", frame)
+        try:
+            self._base.execute(f"INSERT INTO {table} BY NAME SELECT * FROM frame_to_load")
+        finally:
+            self._base.unregister("frame_to_load")
+
+    def execute_raw(self, sql):
+        self._base.execute(sql)
+
+    def count(self, sql):
+        keyword = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+        with self._lock:
+            self.calls[keyword] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.calls)
@@ -0,0 +1 @@
+"""Shared backend helpers for the Cloud Roasters pages."""
@@ -0,0 +1,248 @@
+"""Process-wide request coalescing and admission control.
+
+``SingleFlight`` makes concurrent callers with the same key share one
+execution. ``StreamFlights`` does the same for streamed LLM answers: one
+background thread drives the stream and every subscriber replays the chunks
+as they arrive. ``AdmissionLimiter`` combines a token bucket (sustained rate
+plus burst) with a concurrency cap. Callers queue until both allow them
+through and learn how long they waited. They only give up after
+``max_wait``.
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import streamlit as st
+
+from cloud_roasters.metrics import percentile, register_stats
+
+
+class AdmissionTimeout(Exception):
+    pass
+
+
+class AdmissionLimiter:
+    def __init__(self, name, rate=5.0, burst=10, max_concurrent=4, max_wait=30.0):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self.waiting = 0
+        self.active = 0
+        self.rejected = 0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._waits = deque(maxlen=500)
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def acquire(self):
+        started = time.monotonic()
+        self._admit(started)
+        waited = time.monotonic() - started
+        try:
+            yield waited
+        finally:
+            with self._cond:
+                self.active -= 1
+                self._cond.notify_all()
+
+    def _admit(self, started):
+        deadline = started + self.max_wait
+        with self._cond:
+            self.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self.active < self.max_concurrent and self._tokens >= 1:
+                        self._tokens -= 1
+                        self.active += 1
+                        self._waits.append(now - started)
+                        return
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise AdmissionTimeout(
+                            f"{self.name} is busy; gave up after waiting {self.max_wait:g}s in the queue."
+                        )
+                    # Sleep until a token accrues; freed slots wake us via notify.
+                    until_token = (1 - self._tokens) / self.rate if self._tokens < 1 and self.rate > 0 else remaining
+                    self._cond.wait(min(remaining, max(until_token, 0.01)))
+            finally:
+                self.waiting -= 1
+
+    def _refill(self, now):
+        if self.rate <= 0:
+            self._tokens = float(self.burst)
+        else:
+            self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._waits)
+            return {
+                "active": self.active,
+                "waiting": self.waiting,
+                "rejected": self.rejected,
+                "p50_wait_ms": round(percentile(waits, 0.5, 0.0) * 1000, 2),
+                "p95_wait_ms": round(percentile(waits, 0.95, 0.0) * 1000, 2),
+            }
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self.executed = 0
+        self.shared = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        # Returns (result, shared); errors reach every caller of the flight.
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.executed += 1
+            else:
+                flight.waiters += 1
+                self.shared += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        try:
+            flight.result = fn()
+        except BaseException as exp:
+            flight.error = exp
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+        return flight.result, False
+
+    def waiters(self, key):
+        with self._lock:
+            flight = self._flights.get(key)
+            return flight.waiters if flight is not None else 0
+
+
+class SharedStream:
+    def __init__(self, produce, on_done=None):
+        self.wait_seconds = 0.0
+        self._chunks = []
+        self._done = False
+        self._error = None
+        self._on_done = on_done
+        self._cond = threading.Condition()
+        threading.Thread(
+            target=contextvars.copy_context().run, args=(self._run, produce), name="shared-stream", daemon=True
+        ).start()
+
+    def _run(self, produce):
+        try:
+            for chunk in produce(self):
+                with self._cond:
+                    self._chunks.append(chunk)
+                    self._cond.notify_all()
+        except BaseException as exp:
+            self._error = exp
+        finally:
+            if self._on_done is not None:
+                self._on_done()
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    def __iter__(self):
+        index = 0
+        while True:
+            with self._cond:
+                while index >= len(self._chunks) and not self._done:
+                    self._cond.wait()
+                if index < len(self._chunks):
+                    chunk = self._chunks[index]
+                    index += 1
+                elif self._error is not None:
+                    raise self._error
+                else:
+                    return
+            yield chunk
+
+
+class Subscription:
+    def __init__(self, stream, shared):
+        self.stream = stream
+        self.shared = shared
+
+    def __iter__(self):
+        return iter(self.stream)
+
+    @property
+    def wait_seconds(self):
+        return self.stream.wait_seconds
+
+
+class StreamFlights:
+    def __init__(self):
+        self.executed = 0
+        self.shared = 0
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, key, produce):
+        # ``produce(stream)`` runs once per key on a background thread and may
+        # set ``stream.wait_seconds``; it should finish its side effects (such
+        # as caching the answer) before returning, since the key is released
+        # as soon as it does.
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is not None:
+                self.shared += 1
+                return Subscription(stream, shared=True)
+            self.executed += 1
+            stream = self._streams[key] = SharedStream(produce, on_done=lambda: self._release(key))
+            return Subscription(stream, shared=False)
+
+    def _release(self, key):
+        with self._lock:
+            self._streams.pop(key, None)
+
+
+def admission_settings(backend):
+    settings = st.secrets.get("admission", {})
+    defaults = {"mistral": (1.0, 5, 4), "snowflake": (10.0, 20, 4)}[backend]
+    return {
+        "rate": float(settings.get(f"{backend}_rate", defaults[0])),
+        "burst": int(settings.get(f"{backend}_burst", defaults[1])),
+        "max_concurrent": int(settings.get(f"{backend}_concurrency", defaults[2])),
+        "max_wait": float(settings.get("max_wait", 30)),
+    }
+
+
+@st.cache_resource
+def get_limiter(backend):
+    limiter = AdmissionLimiter(backend.capitalize(), **admission_settings(backend))
+    register_stats(f"admission.{backend}", limiter.stats)
+    return limiter
+
+
+@st.cache_resource
+def get_llm_flights():
+    return StreamFlights()
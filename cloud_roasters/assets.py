@@ -0,0 +1,86 @@
+"""Static assets: pre-sized logo variants and the shared stylesheet.
+
+Logo variants are written to ``static/`` (served at ``app/static/`` when
+``server.enableStaticServing`` is on) once per process, or ahead of time with
+``python -m cloud_roasters.assets``.
+"""
+
+import logging
+from pathlib import Path
+
+import streamlit as st
+
+APP_DIR = Path(__file__).resolve().parent.parent
+STATIC_DIR = APP_DIR / "static"
+STYLES_DIR = Path(__file__).resolve().parent / "styles"
+LOGO_SOURCE = APP_DIR / "logo.png"
+LOGO_WIDTHS = (480, 960)
+
+logger = logging.getLogger(__name__)
+
+
+# ========== Logo ==========
+def build_logo_variants(source=LOGO_SOURCE, target=STATIC_DIR, widths=LOGO_WIDTHS, quality=80):
+    from PIL import Image
+
+    target.mkdir(parents=True, exist_ok=True)
+    source_mtime = source.stat().st_mtime
+    variants = {}
+    with Image.open(source) as image:
+        image.load()
+        for width in widths:
+            width = min(width, image.width)
+            path = target / f"logo-{width}.webp"
+            variants[width] = path.name
+            if path.exists() and path.stat().st_mtime >= source_mtime:
+                continue
+            height = round(image.height * width / image.width)
+            image.resize((width, height), Image.LANCZOS).save(path, "WEBP", quality=quality, method=6)
+
+        fallback = target / f"logo-{max(variants)}.png"
+        if not fallback.exists() or fallback.stat().st_mtime < source_mtime:
+            width = max(variants)
+            height = round(image.height * width / image.width)
+            image.resize((width, height), Image.LANCZOS).save(fallback, "PNG", optimize=True)
+    return {"webp": variants, "fallback": fallback.name}
+
+
+@st.cache_resource(show_spinner=False)
+def logo_variants():
+    try:
+        return build_logo_variants()
+    except Exception:
+        # render_logo() falls back to the original image.
+        logger.warning("Could not build logo variants from %s", LOGO_SOURCE, exc_info=True)
+        return None
+
+
+def render_logo():
+    variants = logo_variants()
+    if variants is None or not st.get_option("server.enableStaticServing"):
+        st.image(str(LOGO_SOURCE), use_container_width=True)
+        return
+    srcset = ", ".join(f"app/static/{name} {width}w" for width, name in sorted(variants["webp"].items()))
+    st.markdown(
+        f"""
+        <picture class="cr-logo">
+            <source type="image/webp" srcset="{srcset}" sizes="(max-width: 800px) 100vw, 800px">
+            <img src="app/static/{variants['fallback']}" alt="Cloud Roasters">
+        </picture>
+        """,
+        unsafe_allow_html=True,
+    )
+
+
+# ========== Styles ==========
+@st.cache_resource(show_spinner=False)
+def stylesheet(*names):
+    return "\n".join((STYLES_DIR / f"{name}.css").read_text() for name in ("base", *names))
+
+
+def inject_styles(*names):
+    st.markdown(f"<style>{stylesheet(*names)}</style>", unsafe_allow_html=True)
+
+
+if __name__ == "__main__":
+    print(build_logo_variants())
@@ -0,0 +1,76 @@
+"""Block-reserved BATCH_ID allocation.
+
+``ROASTING_REPORTS_BATCH_SEQ`` increments by ``BLOCK_SIZE``, so every
+``NEXTVAL`` reserves a private range of IDs for this process. IDs are then
+handed out from memory, and two processes can never hand out the same one.
+"""
+
+import threading
+
+import streamlit as st
+
+from cloud_roasters.db import get_connection
+from cloud_roasters.tracing import span
+
+SEQUENCE_NAME = "ROASTING_REPORTS_BATCH_SEQ"
+BLOCK_SIZE = 20
+
+
+class BatchIdAllocator:
+    def __init__(self, reserve_block, block_size=BLOCK_SIZE):
+        self._reserve_block = reserve_block
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def allocate(self):
+        with self._lock:
+            if self._next >= self._end:
+                start = int(self._reserve_block())
+                self._next, self._end = start, start + self.block_size
+            batch_id = self._next
+            self._next += 1
+            return batch_id
+
+    @property
+    def remaining(self):
+        with self._lock:
+            return self._end - self._next
+
+
+def create_sequence(cursor):
+    # Start past any IDs that were handed out by the old SELECT MAX scheme.
+    cursor.execute('SELECT MAX("BATCH_ID") FROM ROASTING_REPORTS')
+    row = cursor.fetchone()
+    start = 1 if row is None or row[0] is None else int(row[0]) + 1
+    cursor.execute(
+        f"CREATE SEQUENCE IF NOT EXISTS {SEQUENCE_NAME} START = {start} INCREMENT = {BLOCK_SIZE}"
+    )
+
+
+def reserve_block():
+    with span("db.reserve_batch_ids", block_size=BLOCK_SIZE), get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT {SEQUENCE_NAME}.NEXTVAL")
+            return cursor.fetchone()[0]
+
+
+@st.cache_resource(show_spinner=False)
+def get_batch_id_allocator():
+    return BatchIdAllocator(reserve_block)
+
+
+def reserve_ids(count):
+    # Bulk loads skip the in-memory allocator and reserve whole blocks in a
+    # single round-trip: each generated NEXTVAL is the start of a fresh block.
+    if count <= 0:
+        return []
+    blocks = -(-count // BLOCK_SIZE)
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {SEQUENCE_NAME}.NEXTVAL FROM TABLE(GENERATOR(ROWCOUNT => {blocks}))"
+            )
+            starts = sorted(int(row[0]) for row in cursor.fetchall())
+    return [start + offset for start in starts for offset in range(BLOCK_SIZE)][:count]
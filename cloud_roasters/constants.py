@@ -0,0 +1,15 @@
+"""Reference lists shared by the form, the assistant and the dashboards."""
+
+STORES = (
+    "Martin Place Store", "Bondi Store", "Coogee Store",
+    "Paddington Store", "Surry Hills Store", "Bronte Store", "Newtown Store",
+)
+
+ORIGINS = (
+    "Ethiopia", "Brazil", "Colombia", "Kenya", "Costa Rica", "Guatemala", "Honduras", "Peru", "Mexico", "India",
+    "Vietnam", "Indonesia", "Rwanda", "Tanzania", "Panama", "El Salvador", "Nicaragua", "Burundi", "Papua New Guinea",
+    "Yemen", "Uganda", "China", "Thailand", "Philippines", "Zambia", "Malawi", "Dominican Republic", "Haiti",
+    "Venezuela", "Cameroon", "Bolivia", "Laos", "Nepal", "Cuba", "Ivory Coast", "Sri Lanka", "Timor-Leste",
+)
+
+ROAST_LEVELS = ("Light", "Medium", "Medium-Dark", "Dark")
@@ -0,0 +1,44 @@
+"""Streamlit glue for the shared Snowflake connection pool."""
+
+import time
+from contextlib import contextmanager
+
+import snowflake.connector
+import streamlit as st
+
+from cloud_roasters.metrics import register_stats
+from cloud_roasters.pool import ConnectionPool
+from cloud_roasters.tracing import span
+
+SNOWFLAKE_KEYS = ("user", "password", "account", "warehouse", "database", "schema", "role")
+
+
+def snowflake_params():
+    cfg = st.secrets["snowflake"]
+    return {key: cfg[key] for key in SNOWFLAKE_KEYS if key in cfg}
+
+
+@st.cache_resource
+def get_pool():
+    params = snowflake_params()
+    settings = st.secrets.get("snowflake_pool", {})
+    pool = ConnectionPool(
+        lambda: snowflake.connector.connect(**params),
+        max_size=int(settings.get("max_size", 4)),
+        idle_timeout=float(settings.get("idle_timeout", 300)),
+        checkout_timeout=float(settings.get("checkout_timeout", 30)),
+        health_check_interval=float(settings.get("health_check_interval", 60)),
+    )
+    register_stats("snowflake_pool", lambda: {**pool.stats.snapshot(), "size": pool.size, "idle": pool.idle_count})
+    return pool
+
+
+@contextmanager
+def get_connection():
+    # The span covers the whole checkout; wait_ms is the time spent getting a
+    # connection out of the pool.
+    with span("db.connection") as current:
+        started = time.perf_counter()
+        with get_pool().connection() as conn:
+            current.set(wait_ms=round((time.perf_counter() - started) * 1000, 3))
+            yield conn
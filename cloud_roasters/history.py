@@ -0,0 +1,173 @@
+"""Per-session assistant conversation history.
+
+Each turn keeps the question, the prose answer and a snapshot of every
+result it produced. Only the newest turn holds on to its live result pager.
+Once a newer turn arrives, the rows loaded so far are frozen: small results
+stay in memory and larger ones are written to Parquet under
+``sessions/<id>/`` in the data directory, one row group per page, and paged
+back from disk. Only ``max_turns`` turns are kept, and evicted turns take
+their spill files with them. Re-rendering history never re-runs the LLM or
+a query.
+
+Every rerun touches the session's spill directory, so the sweep of
+directories left by ended sessions only removes idle ones. A spill file
+that is gone anyway shows its turn's result as expired.
+"""
+
+import itertools
+import logging
+import os
+import shutil
+import time
+import uuid
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+from cloud_roasters.paths import DATA_DIR, data_path
+from cloud_roasters.results import ResultPager
+
+logger = logging.getLogger(__name__)
+
+SESSIONS_DIR = "sessions"
+
+
+class ResultSnapshot:
+    def __init__(self, sql, params, pager):
+        self.sql = sql
+        self.params = params
+        self.partial = False
+        self.expired = False
+        self._budget = {"page_rows": pager.page_rows, "max_rows": pager.max_rows, "max_bytes": pager.max_bytes}
+        self._live = pager
+        self._frame = None
+        self._path = None
+
+    @property
+    def spilled(self):
+        return self._path is not None
+
+    def pager(self):
+        # None once the spill file has been swept.
+        if self._live is not None:
+            return self._live
+        if self._path is not None:
+            try:
+                return ResultPager.from_parquet(self._path, **self._budget)
+            except FileNotFoundError:
+                logger.info("Spilled result %s is gone; showing it as expired", self._path)
+                self._path = None
+                self.expired = True
+        if self.expired:
+            return None
+        return ResultPager.from_frame(self._frame, **self._budget)
+
+    def freeze(self, path, inline_bytes):
+        if self._live is None:
+            return
+        frame = self._live.to_frame()
+        # Batches the user never paged to are not fetched just for history.
+        self.partial = not self._live.exhausted
+        self._live = None
+        if int(frame.memory_usage(deep=True).sum()) <= inline_bytes:
+            self._frame = frame
+            return
+        try:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            pq.write_table(table, path, row_group_size=self._budget["page_rows"])
+            self._path = path
+        except Exception:
+            logger.warning("Could not spill a result to %s; keeping the first page only", path, exc_info=True)
+            self._frame = frame.head(self._budget["page_rows"])
+            self.partial = True
+
+    def discard(self):
+        if self._path is not None:
+            self._path.unlink(missing_ok=True)
+            self._path = None
+        self._live = None
+        self._frame = None
+
+
+class Turn:
+    def __init__(self, question):
+        self.id = None
+        self.question = question
+        self.answer = None
+        self.results = []
+        self.notices = []
+        self.errors = []
+
+
+class ConversationHistory:
+    def __init__(self, session_id, max_turns=20, inline_bytes=1024 * 1024):
+        self.session_id = session_id
+        self.max_turns = max_turns
+        self.inline_bytes = inline_bytes
+        self.turns = []
+        self._ids = itertools.count(1)
+
+    def add(self, turn):
+        if self.turns:
+            self._freeze(self.turns[-1])
+        turn.id = next(self._ids)
+        self.turns.append(turn)
+        while len(self.turns) > self.max_turns:
+            for result in self.turns.pop(0).results:
+                result.discard()
+        return turn
+
+    def touch(self):
+        # Marks the spill directory as in use for purge_stale_sessions().
+        try:
+            os.utime(DATA_DIR / SESSIONS_DIR / self.session_id)
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for turn in self.turns:
+            for result in turn.results:
+                result.discard()
+        self.turns = []
+
+    def _freeze(self, turn):
+        for index, result in enumerate(turn.results):
+            path = data_path(SESSIONS_DIR, self.session_id, f"turn-{turn.id}-{index}.parquet")
+            result.freeze(path, self.inline_bytes)
+
+
+def purge_stale_sessions(max_age):
+    # Streamlit does not say when a session ends, so spill directories left by
+    # old sessions are swept whenever a new one starts.
+    root = DATA_DIR / SESSIONS_DIR
+    if not root.is_dir():
+        return
+    cutoff = time.time() - max_age
+    for directory in root.iterdir():
+        try:
+            if directory.is_dir() and directory.stat().st_mtime < cutoff:
+                shutil.rmtree(directory, ignore_errors=True)
+        except OSError:
+            continue
+
+
+def history_settings():
+    settings = st.secrets.get("history", {})
+    return {
+        "max_turns": int(settings.get("max_turns", 20)),
+        "inline_bytes": int(float(settings.get("inline_mb", 1)) * 1024 * 1024),
+        "stale_hours": float(settings.get("stale_hours", 24)),
+    }
+
+
+def get_history():
+    if "assistant_history" not in st.session_state:
+        settings = history_settings()
+        purge_stale_sessions(settings["stale_hours"] * 3600)
+        st.session_state.assistant_history = ConversationHistory(
+            uuid.uuid4().hex, max_turns=settings["max_turns"], inline_bytes=settings["inline_bytes"],
+        )
+    history = st.session_state.assistant_history
+    history.touch()
+    return history
@@ -0,0 +1,186 @@
+"""Deterministic fast path for common assistant questions.
+
+Recognizes a few question shapes using the known stores, origins and roast
+levels, and fills parameterized SQL templates with bound parameters. The
+templates are plain, portable SQL, so they run unchanged on Snowflake and on
+the local mirror. Questions that don't clearly fit a shape return ``None`` and
+go to the LLM, and so do matches that leave a time period or a numeric filter
+in the question unused, since answering those without it would be wrong.
+"""
+
+import re
+import threading
+from collections import Counter
+from datetime import date, timedelta
+
+import streamlit as st
+
+from cloud_roasters.constants import ORIGINS, ROAST_LEVELS, STORES
+from cloud_roasters.metrics import register_stats
+
+ORIGIN_ADJECTIVES = {"Brazilian": "Brazil", "Peruvian": "Peru", "Mexican": "Mexico", "Panamanian": "Panama"}
+
+METRIC_ALIASES = (
+    ("weight loss", "WEIGHT_LOSS"),
+    ("development time", "DEVELOPMENT_TIME_MINS"),
+    ("first crack", "FIRST_CRACK_TIME_MINS"),
+    ("moisture", "MOISTURE_CONTENT"),
+    ("roast duration", "ROAST_DURATION_MINS"),
+    ("roast time", "ROAST_DURATION_MINS"),
+    ("duration", "ROAST_DURATION_MINS"),
+)
+
+# Words that signal extra conditions the templates can't express.
+COMPLEX_WORDS = re.compile(
+    r"\b(compare|compared|versus|vs|and|or|between|except|without|not|per|by|each|trend|correlat\w*)\b"
+)
+# Filters none of the templates can express.
+FILTER_WORDS = re.compile(
+    r"\b(above|below|over|under|more than|less than|greater than|at least|at most|higher than|lower than|exceed\w*)\b"
+)
+# Any time-bounded phrase, parsed by PERIODS or not. These are removed before
+# looking for LATEST, so "last 7 days" is never read as "the last 7 batches".
+PERIOD_PHRASES = re.compile(
+    r"\b(today|yesterday|tonight|this (?:week|month|year)|(?:last|past|previous) (?:week|month|year)"
+    r"|(?:in )?the (?:last|past|previous) (?:\d{1,3} )?(?:days?|weeks?|months?|years?)"
+    r"|(?:last|past|previous) \d{1,3} (?:days?|weeks?|months?|years?)|since \w+|in \d{4}"
+    r"|january|february|march|april|may|june|july|august|september|october|november|december)\b"
+)
+LATEST = re.compile(r"\b(latest|last|most recent|newest)\b(?:\s+(\d{1,3}))?")
+BATCH_WORDS = re.compile(r"\bbatch(?:es)?\b|\broasts?\b")
+AVERAGE = re.compile(r"\b(average|avg|mean)\b")
+PERIODS = (
+    (re.compile(r"\btoday\b"), lambda today: today),
+    (re.compile(r"\bthis week\b"), lambda today: today - timedelta(days=today.weekday())),
+    (re.compile(r"\bthis month\b"), lambda today: today.replace(day=1)),
+    (re.compile(r"\b(?:last|past) (\d{1,3}) days\b"), None),
+)
+
+
+def _alias_pattern(aliases):
+    ordered = sorted(aliases, key=len, reverse=True)
+    return re.compile(r"\b(" + "|".join(re.escape(alias) for alias in ordered) + r")\b")
+
+
+STORE_ALIASES = {store.lower(): store for store in STORES}
+STORE_ALIASES.update({store.lower().removesuffix(" store"): store for store in STORES})
+ORIGIN_ALIASES = {origin.lower(): origin for origin in ORIGINS}
+ORIGIN_ALIASES.update({f"{origin.lower()}n": origin for origin in ORIGINS if origin.endswith("a")})
+ORIGIN_ALIASES.update({adjective.lower(): origin for adjective, origin in ORIGIN_ADJECTIVES.items()})
+LEVEL_ALIASES = {level.lower(): level for level in ROAST_LEVELS}
+LEVEL_ALIASES.update({level.lower().replace("-", " "): level for level in ROAST_LEVELS})
+
+STORE_PATTERN = _alias_pattern(STORE_ALIASES)
+ORIGIN_PATTERN = _alias_pattern(ORIGIN_ALIASES)
+LEVEL_PATTERN = _alias_pattern(LEVEL_ALIASES)
+METRIC_LOOKUP = dict(METRIC_ALIASES)
+METRIC_PATTERN = _alias_pattern(METRIC_LOOKUP)
+
+
+class IntentMatch:
+    def __init__(self, route, sql, params, confidence):
+        self.route = route
+        self.sql = sql
+        self.params = tuple(params)
+        self.confidence = confidence
+
+
+def _entities(pattern, aliases, text):
+    return {aliases[match] for match in pattern.findall(text)}
+
+
+def _period_start(text, today):
+    for pattern, start in PERIODS:
+        match = pattern.search(text)
+        if match:
+            return start(today) if start else today - timedelta(days=int(match.group(1)))
+    return None
+
+
+class IntentRouter:
+    def __init__(self, threshold=0.8):
+        self.threshold = threshold
+        self.hits = Counter()
+        self.low_confidence = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def route(self, question, today=None):
+        match = self.match(question, today or date.today())
+        with self._lock:
+            if match is None:
+                self.fallbacks += 1
+                return None
+            if match.confidence < self.threshold:
+                self.low_confidence += 1
+                return None
+            self.hits[match.route] += 1
+        return match
+
+    def match(self, question, today):
+        text = re.sub(r"[^\w\s-]", " ", question.lower())
+        text = re.sub(r"\s+", " ", text).strip()
+        stores = _entities(STORE_PATTERN, STORE_ALIASES, text)
+        origins = _entities(ORIGIN_PATTERN, ORIGIN_ALIASES, text)
+        levels = _entities(LEVEL_PATTERN, LEVEL_ALIASES, text)
+        metrics = _entities(METRIC_PATTERN, METRIC_LOOKUP, text)
+
+        confidence = 1.0
+        if COMPLEX_WORDS.search(text) or FILTER_WORDS.search(text):
+            confidence -= 0.5
+        if max(len(stores), len(origins), len(levels), len(metrics)) > 1:
+            confidence -= 0.5
+        has_period = PERIOD_PHRASES.search(text) is not None
+        # Templates that don't filter by date can't answer a time-bounded question.
+        undated = confidence - 0.5 if has_period else confidence
+
+        latest = LATEST.search(PERIOD_PHRASES.sub(" ", text))
+        if latest and BATCH_WORDS.search(text) and len(stores) == 1 and not (origins or levels or metrics):
+            limit = min(int(latest.group(2) or 1), 50)
+            return IntentMatch(
+                "latest_batch_at_store",
+                f'SELECT * FROM ROASTING_REPORTS WHERE "ROASTERY" = %s '
+                f'ORDER BY "SUBMISSION_TIMESTAMP" DESC LIMIT {limit}',
+                [stores.pop()],
+                undated,
+            )
+
+        start = _period_start(text, today)
+        if start is not None and BATCH_WORDS.search(text) and len(origins) == 1 and not (stores or levels or metrics):
+            return IntentMatch(
+                "origin_batches_in_period",
+                'SELECT * FROM ROASTING_REPORTS WHERE "ORIGIN" = %s AND "ROAST_DATE" >= %s '
+                'ORDER BY "ROAST_DATE" DESC, "BATCH_ID" DESC LIMIT 1000',
+                [origins.pop(), start],
+                # The period is used, but a second one ("today and yesterday") is not.
+                confidence - 0.5 if len(PERIOD_PHRASES.findall(text)) > 1 else confidence,
+            )
+
+        if AVERAGE.search(text) and len(metrics) == 1 and len(levels) == 1 and not (stores or origins):
+            metric = metrics.pop()
+            return IntentMatch(
+                "average_metric_for_roast_level",
+                f'SELECT "ROAST_LEVEL", AVG("{metric}") AS AVERAGE_{metric}, COUNT(*) AS BATCHES '
+                f'FROM ROASTING_REPORTS WHERE "ROAST_LEVEL" = %s GROUP BY "ROAST_LEVEL"',
+                [levels.pop()],
+                undated,
+            )
+        return None
+
+    def stats(self):
+        with self._lock:
+            routed = sum(self.hits.values())
+            total = routed + self.low_confidence + self.fallbacks
+            return {
+                "routes": dict(self.hits),
+                "low_confidence": self.low_confidence,
+                "fallbacks": self.fallbacks,
+                "hit_rate": round(routed / total, 3) if total else 0.0,
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def get_intent_router():
+    router = IntentRouter(threshold=float(st.secrets.get("intent_router", {}).get("threshold", 0.8)))
+    register_stats("intent_router", router.stats)
+    return router
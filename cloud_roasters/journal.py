@@ -0,0 +1,284 @@
+"""Durable write-behind queue for roasting reports.
+
+Submissions are appended to a local SQLite journal in WAL mode (a local
+fsync), and a background flusher drains them to the warehouse in batches,
+retrying with exponential backoff until they land. When a batch is rejected
+because of its data it is halved until the failing record is written on its
+own; a record that is still rejected alone after ``max_attempts`` tries is
+moved to a dead-letter table, so it cannot hold up the records queued behind
+it. Outages (connection, timeout and other transient errors) only back off:
+they neither halve the batch nor count against any record.
+"""
+
+import json
+import random
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+
+import snowflake.connector.errors as sf_errors
+import streamlit as st
+
+from cloud_roasters.metrics import register_stats
+from cloud_roasters.paths import data_path
+from cloud_roasters.reports import write_reports
+from cloud_roasters.tracing import current_span
+
+DATE_COLUMNS = ("ROAST_DATE",)
+TIMESTAMP_COLUMNS = ("SUBMISSION_TIMESTAMP",)
+# SQLSTATE classes for data exceptions and integrity constraint violations.
+RECORD_SQLSTATE_CLASSES = ("22", "23")
+
+
+def is_record_error(exp):
+    # Errors caused by the records being written, as opposed to the warehouse
+    # being unreachable or busy.
+    if isinstance(exp, (sf_errors.DataError, sf_errors.IntegrityError, ValueError, TypeError, KeyError)):
+        return True
+    sqlstate = getattr(exp, "sqlstate", None) or ""
+    return isinstance(exp, sf_errors.ProgrammingError) and sqlstate.startswith(RECORD_SQLSTATE_CLASSES)
+
+
+def _encode(record):
+    return json.dumps(
+        {key: value.isoformat() if isinstance(value, (date, datetime)) else value for key, value in record.items()}
+    )
+
+
+def _decode(payload):
+    record = json.loads(payload)
+    for column in DATE_COLUMNS:
+        if record.get(column):
+            record[column] = date.fromisoformat(record[column])
+    for column in TIMESTAMP_COLUMNS:
+        if record.get(column):
+            record[column] = datetime.fromisoformat(record[column])
+    return record
+
+
+# ========== Journal ==========
+class RecordJournal:
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pending (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                payload TEXT NOT NULL,
+                enqueued_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS dead_letter (
+                id INTEGER PRIMARY KEY,
+                payload TEXT NOT NULL,
+                enqueued_at REAL NOT NULL,
+                attempts INTEGER NOT NULL,
+                last_error TEXT,
+                failed_at REAL NOT NULL
+            )
+        """)
+
+    def append(self, record):
+        payload = _encode(record)
+        current_span().set(payload_bytes=len(payload))
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO pending (payload, enqueued_at) VALUES (?, ?)", (payload, time.time())
+            )
+            return cursor.lastrowid
+
+    def peek(self, limit):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload FROM pending ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        return [(entry_id, _decode(payload)) for entry_id, payload in rows]
+
+    def ack(self, entry_ids):
+        with self._lock:
+            self._conn.executemany("DELETE FROM pending WHERE id = ?", [(entry_id,) for entry_id in entry_ids])
+
+    def mark_failed(self, entry_ids, error):
+        # Returns the highest attempt count among the entries.
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE pending SET attempts = attempts + 1, last_error = ? WHERE id = ?",
+                [(str(error)[:500], entry_id) for entry_id in entry_ids],
+            )
+            placeholders = ", ".join("?" * len(entry_ids))
+            return self._conn.execute(
+                f"SELECT MAX(attempts) FROM pending WHERE id IN ({placeholders})", list(entry_ids)
+            ).fetchone()[0] or 0
+
+    def dead_letter(self, entry_id):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT INTO dead_letter (id, payload, enqueued_at, attempts, last_error, failed_at) "
+                "SELECT id, payload, enqueued_at, attempts, last_error, ? FROM pending WHERE id = ?",
+                (time.time(), entry_id),
+            )
+            self._conn.execute("DELETE FROM pending WHERE id = ?", (entry_id,))
+            self._conn.execute("COMMIT")
+
+    def dead_letters(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload, attempts, last_error, failed_at FROM dead_letter ORDER BY id"
+            ).fetchall()
+        return [
+            (entry_id, _decode(payload), attempts, error, failed_at)
+            for entry_id, payload, attempts, error, failed_at in rows
+        ]
+
+    def requeue_dead_letters(self):
+        # Back to the head of the queue (ids are kept) with a fresh attempt count.
+        with self._lock:
+            self._conn.execute("BEGIN")
+            moved = self._conn.execute(
+                "INSERT INTO pending (id, payload, enqueued_at) SELECT id, payload, enqueued_at FROM dead_letter"
+            ).rowcount
+            self._conn.execute("DELETE FROM dead_letter")
+            self._conn.execute("COMMIT")
+        return moved
+
+    def depth(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+
+    def dead_letter_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+
+    def lag_seconds(self):
+        with self._lock:
+            oldest = self._conn.execute("SELECT MIN(enqueued_at) FROM pending").fetchone()[0]
+        return 0.0 if oldest is None else max(0.0, time.time() - oldest)
+
+
+# ========== Flusher ==========
+class JournalFlusher:
+    def __init__(
+        self, journal, write_batch, batch_size=200, interval=2.0, base_backoff=1.0, max_backoff=60.0, max_attempts=8,
+    ):
+        self.journal = journal
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.interval = interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.flushed = 0
+        self.failures = 0
+        self.dead_lettered = 0
+        self.last_error = None
+        self.last_flush_at = None
+        self._consecutive_failures = 0
+        self._limit = batch_size
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="report-journal-flusher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def notify(self):
+        self._wake.set()
+
+    def flush_once(self):
+        entries = self.journal.peek(self._limit)
+        if not entries:
+            return 0
+        entry_ids = [entry_id for entry_id, _ in entries]
+        try:
+            self.write_batch([record for _, record in entries])
+        except Exception as exp:
+            if not is_record_error(exp):
+                raise
+            if len(entries) > 1:
+                # Narrow down to the record that fails; only failures of a
+                # record written on its own count towards dead-lettering.
+                # The limit grows back only as smaller batches succeed.
+                self._limit = max(1, len(entries) // 2)
+                raise
+            if self.journal.mark_failed(entry_ids, exp) < self.max_attempts:
+                raise
+            self.journal.dead_letter(entry_ids[0])
+            self.dead_lettered += 1
+            return 0
+        self.journal.ack(entry_ids)
+        self._limit = min(self.batch_size, self._limit * 2)
+        self.flushed += len(entries)
+        self.last_flush_at = time.time()
+        return len(entries)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                # Keep draining while writes succeed and records are left.
+                while self.flush_once() and self.journal.depth():
+                    pass
+                self._consecutive_failures = 0
+                self.last_error = None
+                delay = self.interval
+            except Exception as exp:
+                self.failures += 1
+                self._consecutive_failures += 1
+                self.last_error = str(exp)
+                backoff = min(self.max_backoff, self.base_backoff * 2 ** (self._consecutive_failures - 1))
+                delay = backoff * random.uniform(0.5, 1.0)
+            self._wake.wait(delay)
+            self._wake.clear()
+
+
+# ========== Queue ==========
+class ReportQueue:
+    def __init__(self, journal, flusher):
+        self.journal = journal
+        self.flusher = flusher
+
+    def submit(self, record):
+        entry_id = self.journal.append(record)
+        self.flusher.notify()
+        return entry_id
+
+    def dead_letters(self):
+        return self.journal.dead_letters()
+
+    def retry_dead_letters(self):
+        moved = self.journal.requeue_dead_letters()
+        self.flusher.notify()
+        return moved
+
+    def stats(self):
+        return {
+            "depth": self.journal.depth(),
+            "lag_seconds": round(self.journal.lag_seconds(), 1),
+            "flushed": self.flusher.flushed,
+            "failures": self.flusher.failures,
+            "dead_letters": self.journal.dead_letter_count(),
+            "last_error": self.flusher.last_error,
+            "last_flush_at": self.flusher.last_flush_at,
+        }
+
+
+@st.cache_resource(show_spinner=False)
+def get_report_queue():
+    journal = RecordJournal(data_path("roasting_reports_journal.sqlite3"))
+    flusher = JournalFlusher(journal, write_reports).start()
+    queue = ReportQueue(journal, flusher)
+    register_stats("report_queue", queue.stats)
+    return queue
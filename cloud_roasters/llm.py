@@ -0,0 +1,144 @@
+"""Mistral chat-completions client.
+
+Keeps one pooled keep-alive ``requests.Session`` per process, applies
+connect/read timeouts, retries 429/5xx and connection failures with jittered
+exponential backoff, and can stream completions over server-sent events.
+"""
+
+import json
+import random
+import re
+import time
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+
+DEFAULT_BASE_URL = "https://api.mistral.ai"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+SQL_PATTERN = re.compile(r"(?i)^(SELECT|WITH|INSERT|UPDATE|DELETE)")
+
+
+class LLMError(Exception):
+    pass
+
+
+class MistralClient:
+    def __init__(
+        self,
+        api_key,
+        base_url=DEFAULT_BASE_URL,
+        connect_timeout=5.0,
+        read_timeout=60.0,
+        max_retries=3,
+        backoff=0.5,
+        max_backoff=8.0,
+        pool_size=8,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        })
+
+    def complete(self, messages, model, temperature=0.2):
+        payload = {"model": model, "messages": messages, "temperature": temperature}
+        response = self._post(payload, stream=False)
+        try:
+            return response.json()["choices"][0]["message"]["content"].strip()
+        except (ValueError, KeyError, IndexError) as exp:
+            raise LLMError(f"Unexpected response from Mistral: {exp}") from exp
+
+    def stream(self, messages, model, temperature=0.2, on_usage=None):
+        # Mistral reports token usage on the final chunk; on_usage receives it.
+        payload = {"model": model, "messages": messages, "temperature": temperature, "stream": True}
+        response = self._post(payload, stream=True)
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except ValueError as exp:
+                    raise LLMError(f"Malformed stream event from Mistral: {data[:200]}") from exp
+                if chunk.get("usage") and on_usage is not None:
+                    on_usage(chunk["usage"])
+                for choice in chunk.get("choices", []):
+                    content = (choice.get("delta") or {}).get("content")
+                    if content:
+                        yield content
+
+    def _post(self, payload, stream):
+        url = f"{self.base_url}/v1/chat/completions"
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as exp:
+                error = exp
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    try:
+                        response.raise_for_status()
+                    except requests.HTTPError as exp:
+                        response.close()
+                        raise LLMError(str(exp)) from exp
+                    return response
+                error = LLMError(f"Mistral returned HTTP {response.status_code}")
+                retry_after = _retry_after(response)
+                response.close()
+            if attempt == self.max_retries:
+                raise LLMError(f"Mistral request failed after {attempt + 1} attempt(s): {error}") from error
+            delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+            time.sleep(retry_after if retry_after is not None else random.uniform(0, delay))
+
+
+def _retry_after(response):
+    try:
+        return min(float(response.headers.get("Retry-After")), 30.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def split_sql_stream(chunks, peek_chars=8):
+    """Peek at the start of a streamed answer to tell SQL from prose.
+
+    Returns ``(is_sql, chunks)`` where ``chunks`` replays the peeked text
+    followed by the rest of the stream, so SQL can be buffered while prose is
+    rendered as it arrives.
+    """
+    chunks = iter(chunks)
+    head = ""
+    for chunk in chunks:
+        head += chunk
+        if len(head.lstrip()) >= peek_chars:
+            break
+
+    def replay():
+        if head:
+            yield head
+        yield from chunks
+
+    return SQL_PATTERN.match(head.lstrip()) is not None, replay()
+
+
+@st.cache_resource(show_spinner=False)
+def get_llm_client():
+    settings = st.secrets["mistral"]
+    return MistralClient(
+        settings["api_key"],
+        base_url=settings.get("base_url", DEFAULT_BASE_URL),
+        connect_timeout=float(settings.get("connect_timeout", 5)),
+        read_timeout=float(settings.get("read_timeout", 60)),
+        max_retries=int(settings.get("max_retries", 3)),
+    )
@@ -0,0 +1,105 @@
+"""Persistent answer cache in front of the LLM.
+
+Answers are keyed on the normalized question plus the prompt version and
+model, so changing either naturally misses. Entries live in SQLite so they
+survive restarts, expire after ``ttl`` seconds and are evicted least recently
+used first once ``max_entries`` is exceeded.
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+
+import streamlit as st
+
+from cloud_roasters.metrics import register_stats
+from cloud_roasters.paths import data_path
+
+
+def normalize_question(question):
+    question = re.sub(r"\s+", " ", question.strip().lower())
+    return question.rstrip(" ?!.")
+
+
+def answer_key(question, prompt_version, model):
+    raw = f"{prompt_version}\x1f{model}\x1f{normalize_question(question)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    def __init__(self, path, max_entries=2000, ttl=7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                key TEXT PRIMARY KEY,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)")
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT answer, created_at FROM answers WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, question, answer):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, question, answer, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, question, answer, now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM answers WHERE key IN ("
+                "SELECT key FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "entries": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def get_answer_cache():
+    settings = st.secrets.get("llm_cache", {})
+    cache = AnswerCache(
+        data_path("llm_answers.sqlite3"),
+        max_entries=int(settings.get("max_entries", 2000)),
+        ttl=float(settings.get("ttl", 7 * 24 * 3600)),
+    )
+    register_stats("answer_cache", cache.stats)
+    return cache
@@ -0,0 +1,109 @@
+"""Process-wide render timings, LLM usage and component counters.
+
+Timings compare full reruns with fragment reruns; LLM usage records token
+counts and latency per completion so prompt changes can be measured. Every
+``timed()`` block is also a tracing span (see ``tracing.py``). Caches, the
+router, the mirror, limiters and the pool register their ``stats()`` here
+when they are created, and the Diagnostics page shows them.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from cloud_roasters.tracing import span
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_timings = defaultdict(lambda: deque(maxlen=500))
+_llm_usage = deque(maxlen=500)
+_stats_sources = {}
+
+
+@contextmanager
+def timed(name, **attrs):
+    started = time.perf_counter()
+    try:
+        with span(name, **attrs) as current:
+            yield current
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with _lock:
+            _timings[name].append(elapsed_ms)
+        logger.debug("%s took %.1f ms", name, elapsed_ms)
+
+
+def percentile(values, fraction, default=None):
+    # Nearest-rank percentile (fraction 0.95 for p95) of values sorted in
+    # ascending order; the pool, limiters, tracing and benchmarks share it.
+    if not values:
+        return default
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def timing_summary():
+    with _lock:
+        snapshot = {name: sorted(values) for name, values in _timings.items()}
+    return {
+        name: {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 0.5), 2),
+            "p95_ms": round(percentile(values, 0.95), 2),
+        }
+        for name, values in snapshot.items()
+        if values
+    }
+
+
+def register_stats(name, source):
+    # ``source`` is called on demand and returns a dict of counters.
+    with _lock:
+        _stats_sources[name] = source
+
+
+def component_stats():
+    with _lock:
+        sources = dict(_stats_sources)
+    stats = {}
+    for name, source in sorted(sources.items()):
+        try:
+            stats[name] = source()
+        except Exception:
+            logger.warning("Could not read %s stats", name, exc_info=True)
+    return stats
+
+
+def record_llm_usage(model, prompt_tokens, completion_tokens, latency_ms, first_token_ms=None):
+    with _lock:
+        _llm_usage.append({
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_ms": latency_ms,
+            "first_token_ms": first_token_ms,
+        })
+    logger.info(
+        "%s: %s prompt + %s completion tokens in %.0f ms", model, prompt_tokens, completion_tokens, latency_ms
+    )
+
+
+def llm_usage_summary():
+    with _lock:
+        records = list(_llm_usage)
+    if not records:
+        return {}
+    latencies = sorted(record["latency_ms"] for record in records)
+    first_tokens = sorted(record["first_token_ms"] for record in records if record["first_token_ms"] is not None)
+    prompt_tokens = [record["prompt_tokens"] for record in records if record["prompt_tokens"] is not None]
+    completion_tokens = [record["completion_tokens"] for record in records if record["completion_tokens"] is not None]
+    return {
+        "count": len(records),
+        "avg_prompt_tokens": round(sum(prompt_tokens) / len(prompt_tokens), 1) if prompt_tokens else None,
+        "avg_completion_tokens": round(sum(completion_tokens) / len(completion_tokens), 1) if completion_tokens else None,
+        "p50_ms": round(percentile(latencies, 0.5), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p50_first_token_ms": round(percentile(first_tokens, 0.5), 2) if first_tokens else None,
+    }
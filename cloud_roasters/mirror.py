@@ -0,0 +1,208 @@
+"""Local DuckDB mirror of ROASTING_REPORTS and a router for assistant SQL.
+
+The mirror syncs incrementally: it pulls rows submitted since its own max
+``SUBMISSION_TIMESTAMP`` (minus a lookback window, since write-behind and
+bulk loads can land late) or with a ``BATCH_ID`` above its own max. Then it
+compares row counts with Snowflake and falls back to a full refresh if they
+disagree. A bulk load can replace existing batches in place, which neither
+check notices, so the next sync after one is a full refresh. Compatible read queries are transpiled to DuckDB and answered
+locally; anything that fails locally, or arrives while the mirror is stale,
+goes to Snowflake.
+"""
+
+import threading
+import time
+from datetime import timedelta
+
+import duckdb
+import pandas as pd
+import sqlglot
+import streamlit as st
+
+from cloud_roasters.db import get_connection
+from cloud_roasters.metrics import register_stats
+from cloud_roasters.paths import data_path
+from cloud_roasters.reports import REPORT_COLUMNS, add_write_listener
+
+MIRROR_DDL = """
+    CREATE TABLE IF NOT EXISTS ROASTING_REPORTS (
+        BATCH_ID BIGINT PRIMARY KEY,
+        ROAST_DATE DATE,
+        ROASTERY VARCHAR,
+        BEAN_CODE VARCHAR,
+        ORIGIN VARCHAR,
+        MOISTURE_CONTENT DOUBLE,
+        ROAST_LEVEL VARCHAR,
+        ROAST_DURATION_MINS INTEGER,
+        FIRST_CRACK_TIME_MINS INTEGER,
+        DEVELOPMENT_TIME_MINS INTEGER,
+        GREEN_BEAN_WEIGHT_KG DOUBLE,
+        ROASTED_WEIGHT_KG DOUBLE,
+        WEIGHT_LOSS DOUBLE,
+        ROAST_NOTES VARCHAR,
+        SUBMISSION_TIMESTAMP TIMESTAMP
+    )
+"""
+COLUMN_LIST = ", ".join(REPORT_COLUMNS)
+
+
+def read_frame(cursor):
+    fetch_pandas_all = getattr(cursor, "fetch_pandas_all", None)
+    if callable(fetch_pandas_all):
+        return fetch_pandas_all()
+    return pd.DataFrame(cursor.fetchall(), columns=[desc[0] for desc in cursor.description])
+
+
+def fetch_reports_since(since_timestamp, after_batch_id):
+    query = f"SELECT {COLUMN_LIST} FROM ROASTING_REPORTS"
+    params = None
+    if since_timestamp is not None:
+        query += ' WHERE "SUBMISSION_TIMESTAMP" >= %s OR "BATCH_ID" > %s'
+        params = (since_timestamp, after_batch_id)
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            frame = read_frame(cursor)
+            cursor.execute("SELECT COUNT(*) FROM ROASTING_REPORTS")
+            remote_rows = cursor.fetchone()[0]
+    return frame, remote_rows
+
+
+class LocalMirror:
+    def __init__(self, path, source, lookback=timedelta(hours=24), sync_interval=60.0, max_staleness=300.0):
+        self.source = source
+        self.lookback = lookback
+        self.sync_interval = sync_interval
+        self.max_staleness = max_staleness
+        self.last_sync_at = None
+        self.last_sync_rows = 0
+        self.last_error = None
+        self.local_hits = 0
+        self.fallbacks = 0
+        self._full_refresh = False
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._conn = duckdb.connect(str(path))
+        self._conn.execute(MIRROR_DDL)
+
+    # ---------- sync ----------
+    def sync(self):
+        with self._sync_lock:
+            full_refresh, self._full_refresh = self._full_refresh, False
+            with self._lock:
+                latest, max_batch_id, local_rows = self._conn.execute(
+                    "SELECT MAX(SUBMISSION_TIMESTAMP), MAX(BATCH_ID), COUNT(*) FROM ROASTING_REPORTS"
+                ).fetchone()
+            since = None if latest is None or full_refresh else latest - self.lookback
+            try:
+                frame, remote_rows = self.source(since, max_batch_id or 0)
+                self._upsert(frame, replace_all=since is None)
+            except Exception:
+                self._full_refresh = self._full_refresh or full_refresh
+                raise
+
+            with self._lock:
+                local_rows = self._conn.execute("SELECT COUNT(*) FROM ROASTING_REPORTS").fetchone()[0]
+            if since is not None and local_rows != remote_rows:
+                # Something landed outside the incremental window (or was
+                # removed upstream); a full refresh is cheap at this size.
+                frame, remote_rows = self.source(None, None)
+                self._upsert(frame, replace_all=True)
+
+            self.last_sync_at = time.time()
+            self.last_sync_rows = len(frame)
+            self.last_error = None
+            return len(frame)
+
+    def _upsert(self, frame, replace_all=False):
+        frame = frame.loc[:, list(REPORT_COLUMNS)]
+        with self._lock:
+            self._conn.execute("BEGIN TRANSACTION")
+            try:
+                if replace_all:
+                    self._conn.execute("DELETE FROM ROASTING_REPORTS")
+                self._conn.register("incoming", frame)
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO ROASTING_REPORTS ({COLUMN_LIST}) SELECT {COLUMN_LIST} FROM incoming"
+                )
+                self._conn.unregister("incoming")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def request_sync(self, written=None):
+        # Write listener. Bulk loads arrive as a frame and may have replaced
+        # older batches, so they force a full refresh.
+        if isinstance(written, pd.DataFrame):
+            self._full_refresh = True
+        self._wake.set()
+
+    def start(self):
+        threading.Thread(target=self._run, name="roasting-mirror-sync", daemon=True).start()
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                self.sync()
+            except Exception as exp:
+                self.last_error = str(exp)
+            self._wake.wait(self.sync_interval)
+            self._wake.clear()
+
+    # ---------- queries ----------
+    def is_fresh(self):
+        return self.last_sync_at is not None and time.time() - self.last_sync_at <= self.max_staleness
+
+    def query(self, snowflake_sql, params=None):
+        """Run Snowflake SQL locally; returns None when it should go to Snowflake instead.
+
+        Parameterized queries (``%s`` placeholders) must already be portable
+        SQL; they are bound as-is rather than transpiled.
+        """
+        if not self.is_fresh():
+            self.fallbacks += 1
+            return None
+        try:
+            if params:
+                local_sql = snowflake_sql.replace("%s", "?")
+            else:
+                local_sql = sqlglot.transpile(snowflake_sql, read="snowflake", write="duckdb")[0]
+            with self._lock:
+                frame = self._conn.execute(local_sql, list(params or ())).df()
+        except Exception:
+            self.fallbacks += 1
+            return None
+        # Match Snowflake, which reports unquoted identifiers in upper case.
+        frame.columns = [str(column).upper() for column in frame.columns]
+        self.local_hits += 1
+        return frame
+
+    def staleness(self):
+        age = None if self.last_sync_at is None else time.time() - self.last_sync_at
+        return {
+            "synced": self.last_sync_at is not None,
+            "age_seconds": None if age is None else round(age, 1),
+            "fresh": self.is_fresh(),
+            "last_sync_rows": self.last_sync_rows,
+            "last_error": self.last_error,
+            "local_hits": self.local_hits,
+            "fallbacks": self.fallbacks,
+        }
+
+
+@st.cache_resource(show_spinner=False)
+def get_local_mirror():
+    settings = st.secrets.get("local_mirror", {})
+    mirror = LocalMirror(
+        data_path("roasting_reports_mirror.duckdb"),
+        fetch_reports_since,
+        lookback=timedelta(hours=float(settings.get("lookback_hours", 24))),
+        sync_interval=float(settings.get("sync_interval", 60)),
+        max_staleness=float(settings.get("max_staleness", 300)),
+    )
+    add_write_listener(mirror.request_sync)
+    register_stats("local_mirror", mirror.staleness)
+    return mirror.start()
@@ -0,0 +1,12 @@
+"""Local on-disk locations for journals, caches and mirrors."""
+
+import os
+from pathlib import Path
+
+DATA_DIR = Path(os.environ.get("CLOUD_ROASTERS_DATA_DIR", ".cloud_roasters"))
+
+
+def data_path(*parts):
+    path = DATA_DIR.joinpath(*parts)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
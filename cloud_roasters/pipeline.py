@@ -0,0 +1,195 @@
+"""Concurrent stages for answering assistant questions.
+
+While the LLM is still streaming, ``warm_up`` checks a Snowflake connection
+out of the pool and refreshes the table watermark, so connection setup and
+warehouse resume are off the critical path by the time SQL arrives. Each
+statement then runs as a ``QueryJob`` on its own pooled connection, which
+lets independent statements run concurrently. Workers never call Streamlit;
+they return a ``QueryOutcome`` that the page renders.
+
+Identical statements in flight at the same time (from any session) share
+one execution, and Snowflake work passes through the shared admission
+limiter, so bursts queue rather than pile onto the warehouse.
+
+Cancelling a job drops it if it has not started. If it is already running,
+its Snowflake session's queries are cancelled with
+``SYSTEM$CANCEL_ALL_QUERIES``. A query that other sessions are still waiting
+on is left running.
+"""
+
+import contextvars
+import logging
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+import streamlit as st
+
+from cloud_roasters.admission import SingleFlight, get_limiter
+from cloud_roasters.db import get_pool
+from cloud_roasters.metrics import timed
+from cloud_roasters.mirror import get_local_mirror
+from cloud_roasters.query_cache import get_query_cache, normalize_sql
+from cloud_roasters.results import ResultPager
+from cloud_roasters.sql_guard import check_scan_cost
+
+logger = logging.getLogger(__name__)
+
+
+class QueryOutcome:
+    def __init__(self, sql, params, pager=None, source=None, error=None, mirror_age=None, wait_seconds=0.0):
+        self.sql = sql
+        self.params = params
+        self.pager = pager
+        self.source = source
+        self.error = error
+        self.mirror_age = mirror_age
+        self.wait_seconds = wait_seconds
+        self.shared = False
+
+
+class QueryJob:
+    def __init__(self, sql, params=None):
+        self.sql = sql
+        self.params = params
+        self.key = (normalize_sql(sql), tuple(params or ()))
+        self.future = None
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._session_id = None
+
+    @property
+    def cancelled(self):
+        with self._lock:
+            return self._cancelled
+
+    def attach(self, conn):
+        with self._lock:
+            if self._cancelled:
+                raise CancelledError()
+            self._session_id = getattr(conn, "session_id", None)
+
+    def detach(self):
+        with self._lock:
+            self._session_id = None
+
+    def cancel(self, pool, server_side=True):
+        with self._lock:
+            self._cancelled = True
+            session_id = self._session_id
+        if self.future is not None and self.future.cancel():
+            return
+        if session_id is None or not server_side:
+            return
+        try:
+            with pool.connection() as conn, conn.cursor() as cursor:
+                cursor.execute("SELECT SYSTEM$CANCEL_ALL_QUERIES(%s)", (session_id,))
+        except Exception:
+            logger.warning("Could not cancel queries for session %s", session_id, exc_info=True)
+
+    def outcome(self, timeout=None):
+        try:
+            return self.future.result(timeout)
+        except CancelledError:
+            return QueryOutcome(self.sql, self.params, error="Query cancelled.")
+
+
+class QueryPipeline:
+    def __init__(self, pool, query_cache, mirror, limiter, max_workers=4):
+        self.pool = pool
+        self.query_cache = query_cache
+        self.mirror = mirror
+        self.limiter = limiter
+        self.flights = SingleFlight()
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="assistant-pipeline")
+
+    def warm_up(self):
+        return self._executor.submit(contextvars.copy_context().run, self._warm_up)
+
+    def _warm_up(self):
+        with timed("assistant.warm_up"):
+            try:
+                with self.pool.connection() as conn:
+                    self.query_cache.watermark(conn)
+            except Exception:
+                # Warming is best effort; the query itself reports real failures.
+                logger.warning("Snowflake warm-up failed", exc_info=True)
+
+    def submit(self, sql, params, settings, budget):
+        job = QueryJob(sql, params)
+        # Copying the context keeps worker spans under the caller's trace.
+        job.future = self._executor.submit(contextvars.copy_context().run, self._run, job, settings, budget)
+        return job
+
+    def cancel(self, job):
+        # Only stop the query itself if no other session is waiting on it.
+        job.cancel(self.pool, server_side=not self.flights.waiters(job.key))
+
+    def _run(self, job, settings, budget):
+        with timed("assistant.query") as current:
+            try:
+                outcome, shared = self.flights.do(job.key, lambda: self._execute(job, settings, budget))
+                rows = outcome.pager.rows_loaded if outcome.pager is not None else 0
+                current.set(source=outcome.source or "none", rows=rows, shared=shared)
+                if not shared:
+                    return outcome
+                copy = QueryOutcome(
+                    job.sql, job.params, outcome.pager, outcome.source, outcome.error,
+                    outcome.mirror_age, outcome.wait_seconds,
+                )
+                copy.shared = True
+                return copy
+            except CancelledError:
+                return QueryOutcome(job.sql, job.params, error="Query cancelled.")
+            except Exception as exp:
+                if job.cancelled:
+                    return QueryOutcome(job.sql, job.params, error="Query cancelled.")
+                return QueryOutcome(job.sql, job.params, error=exp)
+
+    def _execute(self, job, settings, budget):
+        # Most questions can be answered from the local DuckDB mirror; anything
+        # it can't run (or a stale mirror) falls back to Snowflake.
+        df = self.mirror.query(job.sql, job.params)
+        if df is not None:
+            return QueryOutcome(
+                job.sql, job.params, ResultPager.from_frame(df, **budget), "mirror",
+                mirror_age=self.mirror.staleness()["age_seconds"],
+            )
+
+        with self.limiter.acquire() as waited, self.pool.connection() as conn:
+            watermark = self.query_cache.watermark(conn)
+            df = self.query_cache.get(job.sql, watermark, job.params)
+            if df is not None:
+                return QueryOutcome(
+                    job.sql, job.params, ResultPager.from_frame(df, **budget), "cache", wait_seconds=waited,
+                )
+
+            job.attach(conn)
+            try:
+                with conn.cursor() as cur:
+                    if settings["explain_max_bytes"]:
+                        check_scan_cost(cur, job.sql, settings["explain_max_bytes"], job.params)
+                    cur.execute(job.sql, job.params or None, timeout=settings["statement_timeout"])
+                    pager = ResultPager.from_cursor(cur, **budget)
+                pager.page(0)
+            finally:
+                job.detach()
+            # Only results that arrived whole with the first page are cached.
+            if pager.exhausted and not pager.truncated:
+                self.query_cache.put(job.sql, watermark, pager.to_frame(), job.params)
+            return QueryOutcome(job.sql, job.params, pager, "snowflake", wait_seconds=waited)
+
+
+def pipeline_settings():
+    settings = st.secrets.get("pipeline", {})
+    return {
+        "max_workers": int(settings.get("max_workers", 4)),
+        "max_statements": int(settings.get("max_statements", 4)),
+    }
+
+
+@st.cache_resource
+def get_query_pipeline():
+    return QueryPipeline(
+        get_pool(), get_query_cache(), get_local_mirror(), get_limiter("snowflake"),
+        max_workers=pipeline_settings()["max_workers"],
+    )
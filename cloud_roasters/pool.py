@@ -0,0 +1,239 @@
+"""Process-wide connection pool.
+
+The pool is driver-agnostic: it is given a zero-argument ``connect`` callable
+and hands out whatever that returns, so it works the same against
+``snowflake.connector.connect`` and a local stand-in such as ``sqlite3``.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from cloud_roasters.metrics import percentile
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes free within the checkout timeout."""
+
+
+# ========== Metrics ==========
+class PoolStats:
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.evicted = 0
+        self.health_failures = 0
+        self.wait_ms = deque(maxlen=window)
+        self.hold_ms = deque(maxlen=window)
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def record_checkout(self, wait_ms, hold_ms):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_ms.append(wait_ms)
+            self.hold_ms.append(hold_ms)
+
+    def snapshot(self):
+        with self._lock:
+            waits = sorted(self.wait_ms)
+            holds = sorted(self.hold_ms)
+            return {
+                "checkouts": self.checkouts,
+                "created": self.created,
+                "reused": self.reused,
+                "discarded": self.discarded,
+                "evicted": self.evicted,
+                "health_failures": self.health_failures,
+                "wait_ms_p50": round(percentile(waits, 0.5, 0.0), 2),
+                "wait_ms_p95": round(percentile(waits, 0.95, 0.0), 2),
+                "hold_ms_p50": round(percentile(holds, 0.5, 0.0), 2),
+                "hold_ms_p95": round(percentile(holds, 0.95, 0.0), 2),
+            }
+
+
+# ========== Pool ==========
+class _Slot:
+    __slots__ = ("conn", "last_used", "last_checked")
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.last_used = now
+        self.last_checked = now
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        connect,
+        max_size=4,
+        idle_timeout=300,
+        checkout_timeout=30,
+        health_check_interval=60,
+        health_query="SELECT 1",
+    ):
+        self._connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.health_query = health_query
+        self._idle = deque()
+        self._open = 0
+        self._cond = threading.Condition()
+        self.stats = PoolStats()
+
+    @contextmanager
+    def connection(self):
+        started = time.perf_counter()
+        slot = self._checkout()
+        acquired = time.perf_counter()
+        broken = False
+        try:
+            yield slot.conn
+        except Exception:
+            broken = not self._reset(slot.conn)
+            raise
+        finally:
+            self._release(slot, discard=broken)
+            self.stats.record_checkout(
+                (acquired - started) * 1000, (time.perf_counter() - acquired) * 1000
+            )
+
+    def close_all(self):
+        with self._cond:
+            slots = list(self._idle)
+            self._idle.clear()
+            self._open -= len(slots)
+            self._cond.notify_all()
+        for slot in slots:
+            _close_quietly(slot.conn)
+
+    @property
+    def size(self):
+        with self._cond:
+            return self._open
+
+    @property
+    def idle_count(self):
+        with self._cond:
+            return len(self._idle)
+
+    # ---------- internals ----------
+    def _checkout(self):
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            self._evict_idle()
+            with self._cond:
+                slot = self._idle.pop() if self._idle else None
+                if slot is None and self._open < self.max_size:
+                    self._open += 1
+                    create = True
+                else:
+                    create = False
+                if slot is None and not create:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"No connection available after {self.checkout_timeout}s "
+                            f"(pool size {self.max_size})."
+                        )
+                    self._cond.wait(remaining)
+                    continue
+
+            if create:
+                return self._create()
+            if self._is_healthy(slot):
+                self.stats.incr("reused")
+                return slot
+            # Transparent reconnect: drop the dead session and open a fresh one
+            # in its place without giving up the reserved pool slot.
+            self.stats.incr("health_failures")
+            _close_quietly(slot.conn)
+            return self._create()
+
+    def _create(self):
+        try:
+            slot = _Slot(self._connect())
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        self.stats.incr("created")
+        return slot
+
+    def _release(self, slot, discard=False):
+        if discard or _is_closed(slot.conn):
+            self.stats.incr("discarded")
+            _close_quietly(slot.conn)
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            return
+        slot.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(slot)
+            self._cond.notify()
+
+    def _is_healthy(self, slot):
+        if _is_closed(slot.conn):
+            return False
+        if time.monotonic() - slot.last_checked < self.health_check_interval:
+            return True
+        try:
+            cursor = slot.conn.cursor()
+            try:
+                cursor.execute(self.health_query)
+                cursor.fetchone()
+            finally:
+                cursor.close()
+        except Exception:
+            return False
+        slot.last_checked = time.monotonic()
+        return True
+
+    def _reset(self, conn):
+        try:
+            conn.rollback()
+        except Exception:
+            return False
+        return not _is_closed(conn)
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = []
+        with self._cond:
+            # Oldest idle connections sit at the left end of the deque.
+            while self._idle and self._idle[0].last_used < cutoff:
+                expired.append(self._idle.popleft())
+            self._open -= len(expired)
+            if expired:
+                self._cond.notify_all()
+        for slot in expired:
+            self.stats.incr("evicted")
+            _close_quietly(slot.conn)
+
+
+def _is_closed(conn):
+    is_closed = getattr(conn, "is_closed", None)
+    if callable(is_closed):
+        try:
+            return bool(is_closed())
+        except Exception:
+            return True
+    return False
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
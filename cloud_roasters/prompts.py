@@ -0,0 +1,147 @@
+"""Compact, schema-driven prompts for the roasting assistant.
+
+The ``ROASTING_REPORTS`` columns, their types and the known values of the
+categorical columns are introspected once per schema version and cached, so
+the prompt follows the table instead of a hard-coded column list. The system
+prompt is built deterministically from that snapshot and carries everything
+except the question, so consecutive requests share an identical prefix that
+providers can cache.
+"""
+
+import hashlib
+import logging
+
+import streamlit as st
+
+from cloud_roasters.constants import ORIGINS, ROAST_LEVELS, STORES
+from cloud_roasters.db import get_connection
+from cloud_roasters.reports import REPORT_COLUMNS
+from cloud_roasters.schema import ensure_schema
+
+logger = logging.getLogger(__name__)
+
+TABLE = "ROASTING_REPORTS"
+VALUE_COLUMNS = ("ROASTERY", "ORIGIN", "ROAST_LEVEL")
+
+COLUMNS_QUERY = """
+    SELECT COLUMN_NAME, DATA_TYPE
+    FROM INFORMATION_SCHEMA.COLUMNS
+    WHERE TABLE_SCHEMA = CURRENT_SCHEMA() AND TABLE_NAME = %s
+    ORDER BY ORDINAL_POSITION
+"""
+
+# Short type names keep the column list cheap in tokens.
+TYPE_ABBREVIATIONS = {
+    "TEXT": "text", "VARCHAR": "text", "NUMBER": "num", "FLOAT": "num", "INTEGER": "int",
+    "DATE": "date", "TIMESTAMP_NTZ": "ts", "TIMESTAMP_LTZ": "ts", "TIMESTAMP_TZ": "ts", "TIMESTAMP": "ts",
+}
+
+RULES = (
+    "You answer questions for a coffee roasting company.",
+    f"For questions about roasting data, reply with only one Snowflake SQL SELECT over {TABLE}, no explanation.",
+    "For coffee knowledge (pairings, brewing, flavour), reply in plain prose.",
+    "Filter ROASTERY, ORIGIN and BEAN_CODE with case-insensitive partial matches, e.g. ROASTERY ILIKE '%coogee%'.",
+    "Wrap string values in single quotes.",
+)
+
+
+def fallback_snapshot():
+    return {
+        "columns": [(column, "") for column in REPORT_COLUMNS],
+        "values": {"ROASTERY": list(STORES), "ORIGIN": list(ORIGINS), "ROAST_LEVEL": list(ROAST_LEVELS)},
+    }
+
+
+def introspect_schema(conn, max_values=50):
+    with conn.cursor() as cursor:
+        cursor.execute(COLUMNS_QUERY, (TABLE,))
+        columns = [(name, data_type) for name, data_type in cursor.fetchall()]
+        values = {}
+        for column in VALUE_COLUMNS:
+            cursor.execute(
+                f'SELECT DISTINCT "{column}" FROM {TABLE} WHERE "{column}" IS NOT NULL ORDER BY 1 LIMIT {int(max_values)}'
+            )
+            values[column] = [row[0] for row in cursor.fetchall()]
+    return {"columns": columns, "values": values}
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_schema_snapshot(schema_version, max_values=50):
+    # Keyed on the migration version, so a schema change re-introspects; the
+    # TTL picks up new stores or origins between migrations. Failures raise
+    # rather than return the fallback, so the fallback is never cached.
+    with get_connection() as conn:
+        snapshot = introspect_schema(conn, max_values)
+    if not snapshot["columns"]:
+        raise LookupError(f"No columns found for {TABLE} in the current schema")
+    # An empty table still has the reference lists to offer.
+    for column, known in fallback_snapshot()["values"].items():
+        snapshot["values"][column] = snapshot["values"].get(column) or known
+    return snapshot
+
+
+def prompt_settings():
+    settings = st.secrets.get("prompt", {})
+    return {
+        "max_values": int(settings.get("max_values", 50)),
+        "max_tokens": int(settings.get("max_tokens", 600)),
+    }
+
+
+def current_snapshot():
+    settings = prompt_settings()
+    try:
+        version = ensure_schema()
+    except Exception:
+        logger.warning("Could not check the schema version", exc_info=True)
+        return fallback_snapshot()
+    try:
+        return load_schema_snapshot(version, settings["max_values"])
+    except Exception:
+        logger.warning("Schema introspection failed; using the built-in column list", exc_info=True)
+        return fallback_snapshot()
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English and SQL identifiers.
+    return (len(text) + 3) // 4
+
+
+def _render_system_prompt(snapshot, values_per_column):
+    columns = ", ".join(
+        f"{name} {TYPE_ABBREVIATIONS.get(data_type.upper(), data_type.lower())}".strip()
+        for name, data_type in snapshot["columns"]
+    )
+    lines = list(RULES)
+    lines.append(f"{TABLE}({columns})")
+    for column in VALUE_COLUMNS:
+        known = sorted(str(value) for value in snapshot["values"].get(column, []))
+        if not known or values_per_column == 0:
+            continue
+        shown = known[:values_per_column]
+        more = f" (+{len(known) - len(shown)} more)" if len(known) > len(shown) else ""
+        lines.append(f"{column} values: {', '.join(shown)}{more}")
+    return "\n".join(lines)
+
+
+def build_system_prompt(snapshot, max_tokens=600):
+    # Value lists are the only part that grows with the data, so they are
+    # trimmed until the prompt fits the budget.
+    longest = max((len(values) for values in snapshot["values"].values()), default=0)
+    per_column = longest
+    prompt = _render_system_prompt(snapshot, per_column)
+    while estimate_tokens(prompt) > max_tokens and per_column > 0:
+        per_column = per_column // 2
+        prompt = _render_system_prompt(snapshot, per_column)
+    return prompt
+
+
+def prompt_fingerprint(system_prompt):
+    return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:12]
+
+
+def build_messages(question, system_prompt):
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": question.strip()},
+    ]
@@ -0,0 +1,164 @@
+"""Result cache for assistant SQL, invalidated by a ROASTING_REPORTS watermark.
+
+Entries are keyed on normalized SQL (plus bound parameters) and stamped with the table watermark
+(row count, max BATCH_ID, max SUBMISSION_TIMESTAMP) at the time they ran. A
+cached frame is served only while the watermark is unchanged. Snowflake
+answers the watermark query from table metadata, so checking it does not
+resume the warehouse.
+
+Replacing a batch in place can leave all three unchanged, so every write in
+this process (the reports write listener) also drops the cache and bumps a
+generation that is part of the watermark; a query that was already running
+then cannot store its stale result. Bulk replacements from other processes
+move the watermark through the fresh SUBMISSION_TIMESTAMP they are given.
+
+The watermark says nothing about the clock, so SQL that reads it is keyed on
+the current Sydney date (``CURRENT_DATE``) or not cached at all (time of day,
+``CURRENT_TIMESTAMP`` and friends).
+"""
+
+import functools
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import sqlglot
+import streamlit as st
+from sqlglot import exp
+
+from cloud_roasters.metrics import register_stats
+from cloud_roasters.reports import add_write_listener
+from cloud_roasters.validation import sydney_now
+
+WATERMARK_QUERY = 'SELECT COUNT(*), MAX("BATCH_ID"), MAX("SUBMISSION_TIMESTAMP") FROM ROASTING_REPORTS'
+
+
+def normalize_sql(sql):
+    return re.sub(r"\s+", " ", sql.strip()).rstrip(";").strip()
+
+
+TIME_OF_DAY_FUNCTIONS = tuple(
+    getattr(exp, name)
+    for name in ("CurrentTimestamp", "CurrentTime", "CurrentDatetime", "Localtime", "Localtimestamp")
+    if hasattr(exp, name)
+)
+TIME_OF_DAY_NAMES = {"NOW", "SYSTIMESTAMP", "CURRENT_TIME", "LOCALTIME", "UNIX_TIMESTAMP"}
+
+
+@functools.lru_cache(maxsize=1024)
+def clock_dependence(sql):
+    # "time" when the result depends on the time of day, "date" when it
+    # depends only on today's date, None when it depends on neither.
+    try:
+        tree = sqlglot.parse_one(sql, read="snowflake")
+    except sqlglot.errors.SqlglotError:
+        return "time"
+    if tree.find(*TIME_OF_DAY_FUNCTIONS) or any(
+        function.name.upper() in TIME_OF_DAY_NAMES for function in tree.find_all(exp.Anonymous)
+    ):
+        return "time"
+    return "date" if tree.find(exp.CurrentDate) else None
+
+
+def cache_key(sql, params=None):
+    # None for SQL whose result can't be cached.
+    sql = normalize_sql(sql)
+    dependence = clock_dependence(sql)
+    if dependence == "time":
+        return None
+    return sql, tuple(params or ()), sydney_now().date() if dependence == "date" else None
+
+
+def fetch_watermark(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(WATERMARK_QUERY)
+        return tuple(str(value) for value in cursor.fetchone())
+
+
+class QueryResultCache:
+    def __init__(self, max_bytes=256 * 1024 * 1024, watermark_ttl=2.0):
+        self.max_bytes = max_bytes
+        self.watermark_ttl = watermark_ttl
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._watermark = None
+        self._watermark_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def watermark(self, conn):
+        # Reuse a very recent watermark so back-to-back questions share one
+        # metadata lookup; local writes reset it via invalidate().
+        with self._lock:
+            if self._watermark is not None and time.monotonic() - self._watermark_at < self.watermark_ttl:
+                return self._watermark
+            generation = self._generation
+        watermark = (generation, *fetch_watermark(conn))
+        with self._lock:
+            if generation == self._generation:
+                self._watermark, self._watermark_at = watermark, time.monotonic()
+        return watermark
+
+    def invalidate(self, *_):
+        with self._lock:
+            self._generation += 1
+            self._watermark = None
+            self._entries.clear()
+            self.bytes = 0
+
+    def get(self, sql, watermark, params=None):
+        key = cache_key(sql, params)
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != watermark:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, sql, watermark, df, params=None):
+        nbytes = int(df.memory_usage(deep=True).sum())
+        if nbytes > self.max_bytes // 4:
+            return False
+        key = cache_key(sql, params)
+        if key is None:
+            return False
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[2]
+            self._entries[key] = (watermark, df, nbytes)
+            self.bytes += nbytes
+            while self.bytes > self.max_bytes and self._entries:
+                _, (_, _, evicted_bytes) = self._entries.popitem(last=False)
+                self.bytes -= evicted_bytes
+        return True
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def get_query_cache():
+    settings = st.secrets.get("query_cache", {})
+    cache = QueryResultCache(
+        max_bytes=int(settings.get("max_mb", 256)) * 1024 * 1024,
+        watermark_ttl=float(settings.get("watermark_ttl", 2.0)),
+    )
+    add_write_listener(cache.invalidate)
+    register_stats("query_cache", cache.stats)
+    return cache
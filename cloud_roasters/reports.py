@@ -0,0 +1,113 @@
+"""Warehouse writes for ROASTING_REPORTS rows."""
+
+import logging
+
+from snowflake.connector.pandas_tools import write_pandas
+
+from cloud_roasters.db import get_connection
+from cloud_roasters.rollups import apply_rollup_delta
+
+logger = logging.getLogger(__name__)
+
+REPORT_COLUMNS = (
+    "BATCH_ID", "ROAST_DATE", "ROASTERY", "BEAN_CODE", "ORIGIN", "MOISTURE_CONTENT", "ROAST_LEVEL",
+    "ROAST_DURATION_MINS", "FIRST_CRACK_TIME_MINS", "DEVELOPMENT_TIME_MINS", "GREEN_BEAN_WEIGHT_KG",
+    "ROASTED_WEIGHT_KG", "WEIGHT_LOSS", "ROAST_NOTES", "SUBMISSION_TIMESTAMP",
+)
+
+_write_listeners = []
+
+INSERT_QUERY = f"""
+    INSERT INTO ROASTING_REPORTS
+    ({", ".join(f'"{column}"' for column in REPORT_COLUMNS)})
+    VALUES ({", ".join(["%s"] * len(REPORT_COLUMNS))})
+"""
+
+
+def add_write_listener(listener):
+    # Listeners are called with the frame or list of records after each
+    # successful write, e.g. to invalidate caches built on ROASTING_REPORTS.
+    _write_listeners.append(listener)
+
+
+def _notify_listeners(written):
+    # The write has already committed, so a failing listener is only logged:
+    # raising here would report (and the journal would replay) a write that
+    # actually landed.
+    for listener in list(_write_listeners):
+        try:
+            listener(written)
+        except Exception:
+            logger.exception("Report write listener %r failed", listener)
+
+
+def write_reports(records):
+    # Delete-then-insert in one transaction keeps replays idempotent: if a
+    # flush committed but the journal ack was lost, retrying rewrites the
+    # same rows instead of duplicating them. Rollups get the matching
+    # subtract-old/add-new deltas inside the same transaction.
+    batch_ids = [record["BATCH_ID"] for record in records]
+    rows = [tuple(record[column] for column in REPORT_COLUMNS) for record in records]
+    batch_filter = f'"BATCH_ID" IN ({", ".join(["%s"] * len(batch_ids))})'
+    affected_rows = f"SELECT * FROM ROASTING_REPORTS WHERE {batch_filter}"
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("BEGIN")
+            apply_rollup_delta(cursor, affected_rows, batch_ids, sign=-1)
+            cursor.execute(f"DELETE FROM ROASTING_REPORTS WHERE {batch_filter}", batch_ids)
+            cursor.executemany(INSERT_QUERY, rows)
+            apply_rollup_delta(cursor, affected_rows, batch_ids, sign=1)
+            conn.commit()
+    _notify_listeners(records)
+
+
+def existing_batch_ids(batch_ids):
+    # Which of ``batch_ids`` are already in ROASTING_REPORTS, from one range
+    # read over the key column.
+    batch_ids = {int(batch_id) for batch_id in batch_ids}
+    if not batch_ids:
+        return set()
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                'SELECT "BATCH_ID" FROM ROASTING_REPORTS WHERE "BATCH_ID" BETWEEN %s AND %s',
+                (min(batch_ids), max(batch_ids)),
+            )
+            return batch_ids & {int(row[0]) for row in cursor.fetchall()}
+
+
+def bulk_load_reports(df):
+    # One PUT + COPY into a session-scoped staging table, then a single
+    # replace-by-BATCH_ID into ROASTING_REPORTS.
+    frame = df.loc[:, list(REPORT_COLUMNS)]
+    column_list = ", ".join(f'"{column}"' for column in REPORT_COLUMNS)
+    with get_connection() as conn:
+        success, _, nrows, _ = write_pandas(
+            conn,
+            frame,
+            "ROASTING_REPORTS_STAGE",
+            auto_create_table=True,
+            overwrite=True,
+            table_type="temporary",
+            use_logical_type=True,
+        )
+        if not success:
+            raise RuntimeError("Bulk upload to the staging table failed.")
+        with conn.cursor() as cursor:
+            cursor.execute("BEGIN")
+            apply_rollup_delta(
+                cursor,
+                'SELECT r.* FROM ROASTING_REPORTS r JOIN ROASTING_REPORTS_STAGE s ON r."BATCH_ID" = s."BATCH_ID"',
+                sign=-1,
+            )
+            cursor.execute(
+                'DELETE FROM ROASTING_REPORTS USING ROASTING_REPORTS_STAGE '
+                'WHERE ROASTING_REPORTS."BATCH_ID" = ROASTING_REPORTS_STAGE."BATCH_ID"'
+            )
+            cursor.execute(
+                f"INSERT INTO ROASTING_REPORTS ({column_list}) SELECT {column_list} FROM ROASTING_REPORTS_STAGE"
+            )
+            apply_rollup_delta(cursor, "SELECT * FROM ROASTING_REPORTS_STAGE", sign=1)
+            conn.commit()
+    _notify_listeners(frame)
+    return nrows
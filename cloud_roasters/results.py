@@ -0,0 +1,173 @@
+"""Memory-bounded, lazily fetched query results.
+
+With Snowflake, a finished query is described by its result batches
+(``cursor.get_result_batches()``), which can be downloaded independently
+of the connection as Arrow data. The pager keeps only those descriptors and
+downloads the next batch when the user pages past what is loaded, so the
+pooled connection goes straight back to the pool. Drivers without result
+batches (local stand-ins) are read eagerly with ``fetchmany`` up to the same
+row/byte budget.
+"""
+
+import threading
+
+import pandas as pd
+import pyarrow.parquet as pq
+import streamlit as st
+
+from cloud_roasters.tracing import span
+
+DEFAULT_PAGE_ROWS = 200
+DEFAULT_MAX_ROWS = 100_000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _frame_bytes(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def _load_batch(batch):
+    try:
+        return batch.to_pandas()
+    except Exception:
+        # JSON-format result batches cannot go through Arrow.
+        return pd.DataFrame(list(batch.create_iter()), columns=batch.column_names)
+
+
+class ResultPager:
+    def __init__(self, loaders, columns, page_rows=DEFAULT_PAGE_ROWS, max_rows=DEFAULT_MAX_ROWS, max_bytes=DEFAULT_MAX_BYTES):
+        self.columns = list(columns)
+        self.page_rows = page_rows
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.rows_loaded = 0
+        self.bytes_loaded = 0
+        self.truncated = False
+        self._loaders = list(loaders)
+        self._frames = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_cursor(cls, cursor, **budget):
+        columns = [desc[0] for desc in cursor.description or []]
+        get_result_batches = getattr(cursor, "get_result_batches", None)
+        batches = get_result_batches() if callable(get_result_batches) else None
+        if batches is not None:
+            return cls([lambda batch=batch: _load_batch(batch) for batch in batches], columns, **budget)
+
+        pager = cls([], columns, **budget)
+        if not columns:
+            return pager
+        fetch_rows = max(pager.page_rows, 1000)
+        with span("results.fetch") as current:
+            while not pager.truncated:
+                rows = cursor.fetchmany(fetch_rows)
+                if not rows:
+                    break
+                pager._append(pd.DataFrame(rows, columns=columns))
+            current.set(rows=pager.rows_loaded, bytes=pager.bytes_loaded)
+        return pager
+
+    @classmethod
+    def from_frame(cls, df, **budget):
+        pager = cls([], df.columns, **budget)
+        pager._append(df)
+        return pager
+
+    @classmethod
+    def from_parquet(cls, path, **budget):
+        # One loader per row group, so paging reads only what it shows.
+        parquet = pq.ParquetFile(path)
+        loaders = [
+            lambda group=group: parquet.read_row_group(group).to_pandas()
+            for group in range(parquet.num_row_groups)
+        ]
+        return cls(loaders, parquet.schema_arrow.names, **budget)
+
+    @property
+    def exhausted(self):
+        with self._lock:
+            return self.truncated or not self._loaders
+
+    def page_count(self):
+        # Pages known so far; one more is possible while batches remain.
+        with self._lock:
+            known = -(-self.rows_loaded // self.page_rows)
+            return max(known, 1)
+
+    def page(self, index):
+        end = (index + 1) * self.page_rows
+        with self._lock:
+            while self.rows_loaded < end and self._loaders and not self.truncated:
+                with span("results.fetch_batch") as current:
+                    rows, nbytes = self.rows_loaded, self.bytes_loaded
+                    self._append(self._loaders.pop(0)())
+                    current.set(rows=self.rows_loaded - rows, bytes=self.bytes_loaded - nbytes)
+            frame = self._frames_concat()
+        return frame.iloc[index * self.page_rows:end]
+
+    def to_frame(self):
+        with self._lock:
+            return self._frames_concat()
+
+    def _frames_concat(self):
+        if not self._frames:
+            return pd.DataFrame(columns=self.columns)
+        if len(self._frames) > 1:
+            self._frames = [pd.concat(self._frames, ignore_index=True)]
+        return self._frames[0]
+
+    def _append(self, df):
+        remaining_rows = self.max_rows - self.rows_loaded
+        if len(df) > remaining_rows:
+            df = df.iloc[:remaining_rows]
+            self.truncated = True
+        nbytes = _frame_bytes(df)
+        remaining_bytes = self.max_bytes - self.bytes_loaded
+        if nbytes > remaining_bytes and len(df):
+            df = df.iloc[:int(len(df) * max(remaining_bytes, 0) / nbytes)]
+            nbytes = _frame_bytes(df)
+            self.truncated = True
+        if len(df):
+            self._frames.append(df)
+            self.rows_loaded += len(df)
+            self.bytes_loaded += nbytes
+        if self.truncated:
+            self._loaders.clear()
+
+
+# ========== Streamlit ==========
+def result_budget():
+    settings = st.secrets.get("query_results", {})
+    return {
+        "page_rows": int(settings.get("page_rows", DEFAULT_PAGE_ROWS)),
+        "max_rows": int(settings.get("max_rows", DEFAULT_MAX_ROWS)),
+        "max_bytes": int(settings.get("max_mb", DEFAULT_MAX_BYTES // (1024 * 1024))) * 1024 * 1024,
+    }
+
+
+def render_pager(pager, key):
+    page_key = f"{key}_page"
+    page_index = st.session_state.get(page_key, 0)
+    df = pager.page(page_index)
+    if df.empty and page_index:
+        page_index = st.session_state[page_key] = max(0, pager.page_count() - 1)
+        df = pager.page(page_index)
+
+    st.dataframe(df, use_container_width=True, hide_index=True)
+
+    start = page_index * pager.page_rows
+    has_next = start + len(df) < pager.rows_loaded or not pager.exhausted
+    total = f"{pager.rows_loaded}{'' if pager.exhausted else '+'}"
+    note = " Result truncated at the row/memory budget." if pager.truncated else ""
+
+    previous_col, info_col, next_col = st.columns([1, 3, 1])
+    previous_col.button(
+        "← Previous", key=f"{key}_previous", disabled=page_index == 0,
+        on_click=lambda: st.session_state.update({page_key: page_index - 1}),
+    )
+    info_col.caption(f"Rows {start + 1 if len(df) else 0}–{start + len(df)} of {total}.{note}")
+    next_col.button(
+        "Next →", key=f"{key}_next", disabled=not has_next,
+        on_click=lambda: st.session_state.update({page_key: page_index + 1}),
+    )
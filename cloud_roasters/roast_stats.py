@@ -0,0 +1,342 @@
+"""Online roast statistics per origin and roast level for submit-time checks.
+
+For every (ORIGIN, ROAST_LEVEL) the store keeps a streaming mean/variance
+(Welford) and P² quantile markers for weight loss, roast duration and the
+development time ratio. It is built in bulk from one aggregate query over
+recent history, then kept current by the report write listener. Scoring a
+new batch is a dictionary lookup plus a few arithmetic operations, so the
+form never scans ROASTING_REPORTS.
+
+Replayed flushes and replaced batches can be counted twice, and bulk loads
+only mark the store stale. A background rebuild every ``rebuild_hours``
+(sooner after a bulk load) corrects that drift. Records observed while a
+rebuild is querying are replayed onto the rebuilt groups, so they are not
+lost (at worst they are counted twice until the next rebuild).
+"""
+
+import logging
+import math
+import threading
+import time
+from bisect import bisect_right, insort
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from cloud_roasters.db import get_connection
+from cloud_roasters.reports import add_write_listener
+
+logger = logging.getLogger(__name__)
+
+# Name -> SQL expression over ROASTING_REPORTS.
+METRICS = {
+    "WEIGHT_LOSS": '"WEIGHT_LOSS"',
+    "ROAST_DURATION_MINS": '"ROAST_DURATION_MINS"',
+    "DEVELOPMENT_RATIO": '"DEVELOPMENT_TIME_MINS" / NULLIF("ROAST_DURATION_MINS", 0)',
+}
+METRIC_LABELS = {
+    "WEIGHT_LOSS": "Weight loss (%)",
+    "ROAST_DURATION_MINS": "Roast duration (minutes)",
+    "DEVELOPMENT_RATIO": "Development time ratio",
+}
+# P² marker probabilities: min, the 2.5/97.5% tails, quartiles, median, max.
+MARKERS = (0.0, 0.025, 0.25, 0.5, 0.75, 0.975, 1.0)
+# After a failed rebuild, try again this much later.
+RETRY_SECONDS = 300
+
+
+def metric_values(record):
+    duration = record.get("ROAST_DURATION_MINS")
+    development = record.get("DEVELOPMENT_TIME_MINS")
+    values = {
+        "WEIGHT_LOSS": record.get("WEIGHT_LOSS"),
+        "ROAST_DURATION_MINS": duration,
+        "DEVELOPMENT_RATIO": development / duration if duration and development is not None else None,
+    }
+    return {
+        name: float(value)
+        for name, value in values.items()
+        if value is not None and not pd.isna(value)
+    }
+
+
+class P2Quantiles:
+    # Jain & Chlamtac's P² estimator, generalized to any set of marker
+    # probabilities: constant memory and constant time per observation.
+    def __init__(self, probabilities=MARKERS):
+        self.probabilities = probabilities
+        self.count = 0
+        # Sorted first observations until there is one per marker.
+        self.heights = []
+        self.positions = None
+
+    def seed(self, count, heights):
+        heights = np.maximum.accumulate(np.asarray(heights, dtype=float))
+        self.count = count
+        if count < len(self.probabilities):
+            # Too few observations for markers: stand in for them with evenly
+            # spaced quantiles of the summary, as if they had been add()ed.
+            spots = np.linspace(0.0, 1.0, count) if count > 1 else np.zeros(count)
+            self.heights = [float(height) for height in np.interp(spots, self.probabilities, heights)]
+            self.positions = None
+            return
+        self.heights = [float(height) for height in heights]
+        positions = []
+        for probability in self.probabilities:
+            position = 1 + round((count - 1) * probability)
+            positions.append(max(position, positions[-1] + 1) if positions else position)
+        # Keep the top markers inside the count as well.
+        for index in range(len(positions) - 1, -1, -1):
+            positions[index] = min(positions[index], count - (len(positions) - 1 - index))
+        self.positions = positions
+
+    def add(self, value):
+        self.count += 1
+        if self.positions is None:
+            insort(self.heights, value)
+            if len(self.heights) == len(self.probabilities):
+                self.positions = list(range(1, len(self.heights) + 1))
+            return
+
+        q, n = self.heights, self.positions
+        if value < q[0]:
+            q[0] = value
+            cell = 0
+        elif value >= q[-1]:
+            q[-1] = value
+            cell = len(q) - 2
+        else:
+            cell = bisect_right(q, value) - 1
+        for index in range(cell + 1, len(n)):
+            n[index] += 1
+
+        for index in range(1, len(q) - 1):
+            offset = 1 + (self.count - 1) * self.probabilities[index] - n[index]
+            if (offset >= 1 and n[index + 1] - n[index] > 1) or (offset <= -1 and n[index - 1] - n[index] < -1):
+                step = 1 if offset > 0 else -1
+                height = self._parabolic(index, step)
+                if not q[index - 1] < height < q[index + 1]:
+                    height = q[index] + step * (q[index + step] - q[index]) / (n[index + step] - n[index])
+                q[index] = height
+                n[index] += step
+
+    def _parabolic(self, i, step):
+        q, n = self.heights, self.positions
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    @property
+    def ready(self):
+        return self.positions is not None
+
+    def quantile(self, probability):
+        return float(np.interp(probability, self.probabilities, self.heights)) if self.ready else None
+
+    def rank(self, value):
+        # Estimated fraction of observations below ``value``.
+        return float(np.interp(value, self.heights, self.probabilities)) if self.ready else None
+
+
+class MetricStats:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.quantiles = P2Quantiles()
+
+    @classmethod
+    def from_summary(cls, count, mean, variance, heights):
+        stats = cls()
+        stats.count = int(count)
+        stats.mean = float(mean)
+        stats.m2 = float(variance or 0.0) * max(stats.count - 1, 0)
+        stats.quantiles.seed(stats.count, heights)
+        return stats
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.quantiles.add(value)
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+class MetricCheck:
+    def __init__(self, metric, value, stats, min_samples, z_threshold):
+        self.metric = metric
+        self.label = METRIC_LABELS[metric]
+        self.value = value
+        self.count = stats.count if stats is not None else 0
+        self.enough_history = self.count >= min_samples
+        self.mean = stats.mean if stats is not None else None
+        self.z = None
+        self.low = self.median = self.high = self.rank = None
+        self.flagged = False
+        if not self.enough_history:
+            return
+        std = stats.std
+        self.z = (value - stats.mean) / std if std > 0 else 0.0
+        if stats.quantiles.ready:
+            self.low = stats.quantiles.quantile(MARKERS[1])
+            self.median = stats.quantiles.quantile(0.5)
+            self.high = stats.quantiles.quantile(MARKERS[-2])
+            self.rank = stats.quantiles.rank(value)
+        # The 2.5-97.5% band is shown as the typical range; only a large z or
+        # a value beyond anything seen for the group is flagged.
+        beyond = stats.quantiles.ready and not stats.quantiles.heights[0] <= value <= stats.quantiles.heights[-1]
+        self.flagged = abs(self.z) >= z_threshold or beyond
+
+
+class AnomalyReport:
+    def __init__(self, origin, roast_level, checks):
+        self.origin = origin
+        self.roast_level = roast_level
+        self.checks = checks
+        scored = [abs(check.z) for check in checks if check.z is not None]
+        # The largest |z| across the checked metrics; None without history.
+        self.score = max(scored) if scored else None
+        self.flagged = [check for check in checks if check.flagged]
+
+
+class RoastStats:
+    def __init__(self, load_history, min_samples=10, z_threshold=3.0, rebuild_interval=24 * 3600):
+        self.min_samples = min_samples
+        self.z_threshold = z_threshold
+        self.rebuild_interval = rebuild_interval
+        self.built_at = None
+        self.observed = 0
+        self._load_history = load_history
+        self._groups = {}
+        self._lock = threading.Lock()
+        self._stale = False
+        self._rebuilding = False
+        # Records observed while a rebuild is loading history, or None.
+        self._replay = None
+
+    def rebuild(self):
+        with self._lock:
+            # A bulk load from here on must trigger another rebuild.
+            self._stale = False
+            self._replay = []
+        try:
+            groups = {}
+            for origin, roast_level, metric, count, mean, variance, heights in self._load_history():
+                groups.setdefault((origin, roast_level), {})[metric] = MetricStats.from_summary(
+                    count, mean, variance, heights
+                )
+        except Exception:
+            with self._lock:
+                self._replay = None
+            raise
+        with self._lock:
+            for record in self._replay:
+                _add_record(groups, record)
+            self._replay = None
+            self._groups = groups
+            self.built_at = time.time()
+        logger.info("Rebuilt roast statistics for %s origin/roast level groups", len(groups))
+
+    def observe(self, written):
+        # Write listener. Bulk loads arrive as a frame; rather than replaying
+        # them row by row here, the next score() rebuilds in the background.
+        if isinstance(written, pd.DataFrame):
+            self._stale = True
+            return
+        with self._lock:
+            for record in written:
+                _add_record(self._groups, record)
+                if self._replay is not None:
+                    self._replay.append(record)
+                self.observed += 1
+
+    def score(self, record):
+        self._maybe_rebuild()
+        origin, roast_level = record.get("ORIGIN"), record.get("ROAST_LEVEL")
+        with self._lock:
+            group = self._groups.get((origin, roast_level), {})
+            checks = [
+                MetricCheck(metric, value, group.get(metric), self.min_samples, self.z_threshold)
+                for metric, value in metric_values(record).items()
+            ]
+        return AnomalyReport(origin, roast_level, checks)
+
+    def _maybe_rebuild(self):
+        stale = self._stale or self.built_at is None or time.time() - self.built_at > self.rebuild_interval
+        with self._lock:
+            if not stale or self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild_in_background, name="roast-stats-rebuild", daemon=True).start()
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        except Exception:
+            logger.warning("Roast statistics rebuild failed", exc_info=True)
+            with self._lock:
+                self.built_at = time.time() - self.rebuild_interval + RETRY_SECONDS
+                self._stale = False
+        finally:
+            self._rebuilding = False
+
+
+def _add_record(groups, record):
+    group = groups.setdefault((record.get("ORIGIN"), record.get("ROAST_LEVEL")), {})
+    for metric, value in metric_values(record).items():
+        group.setdefault(metric, MetricStats()).add(value)
+
+
+def history_query():
+    columns = ['"ORIGIN"', '"ROAST_LEVEL"']
+    for expression in METRICS.values():
+        columns += [f"COUNT({expression})", f"AVG({expression})", f"VAR_SAMP({expression})", f"MIN({expression})"]
+        columns += [f"APPROX_PERCENTILE({expression}, {probability})" for probability in MARKERS[1:-1]]
+        columns.append(f"MAX({expression})")
+    return (
+        f"SELECT {', '.join(columns)} FROM ROASTING_REPORTS "
+        'WHERE "ROAST_DATE" >= DATEADD(day, -%s, CURRENT_DATE()) '
+        'GROUP BY "ORIGIN", "ROAST_LEVEL"'
+    )
+
+
+def load_history_stats(lookback_days):
+    # Yields (origin, roast level, metric, count, mean, variance, marker heights).
+    width = 3 + len(MARKERS)
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(history_query(), (lookback_days,))
+            rows = cursor.fetchall()
+    for row in rows:
+        origin, roast_level = row[0], row[1]
+        for index, metric in enumerate(METRICS):
+            count, mean, variance, *heights = row[2 + index * width:2 + (index + 1) * width]
+            if count:
+                yield origin, roast_level, metric, count, mean, variance, [float(height) for height in heights]
+
+
+# ========== Streamlit ==========
+@st.cache_resource(show_spinner="Loading roast statistics...")
+def get_roast_stats():
+    settings = st.secrets.get("roast_stats", {})
+    lookback_days = int(settings.get("lookback_days", 365))
+    store = RoastStats(
+        lambda: load_history_stats(lookback_days),
+        min_samples=int(settings.get("min_samples", 10)),
+        z_threshold=float(settings.get("z_threshold", 3.0)),
+        rebuild_interval=float(settings.get("rebuild_hours", 24)) * 3600,
+    )
+    try:
+        store.rebuild()
+    except Exception:
+        # Scoring without history just reports "not enough history"; a
+        # rebuild is retried in the background on the next score().
+        logger.warning("Could not build roast statistics", exc_info=True)
+    add_write_listener(store.observe)
+    return store
@@ -0,0 +1,112 @@
+"""Daily roasting rollups maintained alongside ROASTING_REPORTS.
+
+``ROASTING_ROLLUPS_DAILY`` holds one row per roast date x roastery x origin
+x roast level with a batch count and, for each metric, the non-null count,
+sum and sum of squares, from which mean and variance can be derived. Writes
+apply signed deltas in the same transaction as the report rows: the old rows
+being replaced are subtracted and the new rows added, so replays stay exact.
+"""
+
+import pandas as pd
+import streamlit as st
+
+from cloud_roasters.db import get_connection
+
+ROLLUP_TABLE = "ROASTING_ROLLUPS_DAILY"
+ROLLUP_DIMENSIONS = ("ROAST_DATE", "ROASTERY", "ORIGIN", "ROAST_LEVEL")
+ROLLUP_METRICS = ("WEIGHT_LOSS", "ROAST_DURATION_MINS", "DEVELOPMENT_TIME_MINS", "MOISTURE_CONTENT")
+
+_MEASURES = ("BATCH_COUNT",) + tuple(
+    f"{prefix}_{metric}" for metric in ROLLUP_METRICS for prefix in ("N", "SUM", "SUMSQ")
+)
+
+
+def _aggregate_sql(rows_sql):
+    aggregates = ["COUNT(*) AS BATCH_COUNT"]
+    for metric in ROLLUP_METRICS:
+        aggregates += [
+            f"COUNT({metric}) AS N_{metric}",
+            f"COALESCE(SUM({metric}), 0) AS SUM_{metric}",
+            f"COALESCE(SUM({metric} * {metric}), 0) AS SUMSQ_{metric}",
+        ]
+    dimensions = ", ".join(ROLLUP_DIMENSIONS)
+    return f"SELECT {dimensions}, {', '.join(aggregates)} FROM ({rows_sql}) GROUP BY {dimensions}"
+
+
+def create_rollups(cursor):
+    measures = ",\n".join(
+        f"{measure} {'INTEGER' if measure == 'BATCH_COUNT' or measure.startswith('N_') else 'FLOAT'} DEFAULT 0"
+        for measure in _MEASURES
+    )
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+            ROAST_DATE DATE,
+            ROASTERY VARCHAR(255),
+            ORIGIN VARCHAR(255),
+            ROAST_LEVEL VARCHAR(50),
+            {measures}
+        )
+    """)
+    cursor.execute(f"DELETE FROM {ROLLUP_TABLE}")
+    cursor.execute(
+        f"INSERT INTO {ROLLUP_TABLE} ({', '.join(ROLLUP_DIMENSIONS + _MEASURES)}) "
+        + _aggregate_sql("SELECT * FROM ROASTING_REPORTS")
+    )
+
+
+def apply_rollup_delta(cursor, rows_sql, params=None, sign=1):
+    """Add (``sign=1``) or subtract (``sign=-1``) the rows selected by ``rows_sql``."""
+    on = " AND ".join(f"t.{dimension} IS NOT DISTINCT FROM s.{dimension}" for dimension in ROLLUP_DIMENSIONS)
+    updates = ", ".join(f"{measure} = t.{measure} + {sign} * s.{measure}" for measure in _MEASURES)
+    columns = ", ".join(ROLLUP_DIMENSIONS + _MEASURES)
+    values = ", ".join(
+        [f"s.{dimension}" for dimension in ROLLUP_DIMENSIONS] + [f"{sign} * s.{measure}" for measure in _MEASURES]
+    )
+    cursor.execute(
+        f"""
+        MERGE INTO {ROLLUP_TABLE} t
+        USING ({_aggregate_sql(rows_sql)}) s
+        ON {on}
+        WHEN MATCHED THEN UPDATE SET {updates}
+        WHEN NOT MATCHED THEN INSERT ({columns}) VALUES ({values})
+        """,
+        params,
+    )
+    if sign < 0:
+        cursor.execute(f"DELETE FROM {ROLLUP_TABLE} WHERE BATCH_COUNT <= 0")
+
+
+# ========== Reading ==========
+GROUPINGS = {
+    "Origin": ("ORIGIN",),
+    "Roastery": ("ROASTERY",),
+    "Roast Level": ("ROAST_LEVEL",),
+    "Origin x Roast Level": ("ORIGIN", "ROAST_LEVEL"),
+    "Week x Roastery": ("DATE_TRUNC('WEEK', ROAST_DATE) AS WEEK", "ROASTERY"),
+    "Day": ("ROAST_DATE",),
+}
+
+
+def summary_sql(grouping, metric):
+    group_columns = GROUPINGS[grouping]
+    positions = ", ".join(str(index + 1) for index in range(len(group_columns)))
+    n, total, squares = f"SUM(N_{metric})", f"SUM(SUM_{metric})", f"SUM(SUMSQ_{metric})"
+    return f"""
+        SELECT {', '.join(group_columns)},
+            SUM(BATCH_COUNT) AS BATCHES,
+            {total} / NULLIF({n}, 0) AS MEAN,
+            SQRT(GREATEST(({squares} - {total} * {total} / NULLIF({n}, 0)) / NULLIF({n} - 1, 0), 0)) AS STDDEV
+        FROM {ROLLUP_TABLE}
+        WHERE ROAST_DATE BETWEEN %s AND %s
+        GROUP BY {positions}
+        ORDER BY {positions}
+    """
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_summary(grouping, metric, start, end):
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(summary_sql(grouping, metric), (start, end))
+            columns = [desc[0] for desc in cursor.description]
+            return pd.DataFrame(cursor.fetchall(), columns=columns)
@@ -0,0 +1,84 @@
+"""Versioned schema migrations for the roasting warehouse tables.
+
+Each migration is ``(version, description, steps)`` where a step is either a
+SQL string or a callable taking a cursor. Applied versions are recorded in
+``SCHEMA_MIGRATIONS`` so only newer migrations run; ``ensure_schema()`` runs
+them once per server process.
+"""
+
+import streamlit as st
+
+from cloud_roasters.batch_ids import create_sequence
+from cloud_roasters.db import get_connection
+from cloud_roasters.rollups import create_rollups
+
+MIGRATIONS_TABLE = "SCHEMA_MIGRATIONS"
+
+CREATE_ROASTING_REPORTS = """
+    CREATE TABLE IF NOT EXISTS ROASTING_REPORTS (
+        "BATCH_ID" INTEGER PRIMARY KEY,
+        "ROASTERY" VARCHAR(255),
+        "ROAST_DATE" DATE,
+        "BEAN_CODE" VARCHAR(255),
+        "ORIGIN" VARCHAR(255),
+        "MOISTURE_CONTENT" NUMBER(5,2),
+        "ROAST_LEVEL" VARCHAR(50),
+        "ROAST_DURATION_MINS" INTEGER,
+        "FIRST_CRACK_TIME_MINS" INTEGER,
+        "DEVELOPMENT_TIME_MINS" INTEGER,
+        "GREEN_BEAN_WEIGHT_KG" NUMBER(10,2),
+        "ROASTED_WEIGHT_KG" NUMBER(10,2),
+        "WEIGHT_LOSS" NUMBER(5,2),
+        "ROAST_NOTES" VARCHAR(500),
+        "SUBMISSION_TIMESTAMP" TIMESTAMP
+    )
+"""
+
+# Append new migrations to the end; never edit or reorder applied ones.
+MIGRATIONS = [
+    (1, "Create ROASTING_REPORTS", [CREATE_ROASTING_REPORTS]),
+    (2, "Create block-reserved BATCH_ID sequence", [create_sequence]),
+    (3, "Create and backfill ROASTING_ROLLUPS_DAILY", [create_rollups]),
+]
+
+
+def current_version(cursor):
+    cursor.execute(f"SELECT MAX(VERSION) FROM {MIGRATIONS_TABLE}")
+    row = cursor.fetchone()
+    return 0 if row is None or row[0] is None else int(row[0])
+
+
+def run_migrations(conn, migrations=MIGRATIONS):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+                VERSION INTEGER PRIMARY KEY,
+                DESCRIPTION VARCHAR(255),
+                APPLIED_AT TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        version = current_version(cursor)
+        for target, description, steps in sorted(migrations, key=lambda m: m[0]):
+            if target <= version:
+                continue
+            for step in steps:
+                if callable(step):
+                    step(cursor)
+                else:
+                    cursor.execute(step)
+            cursor.execute(
+                f"INSERT INTO {MIGRATIONS_TABLE} (VERSION, DESCRIPTION) VALUES (%s, %s)",
+                (target, description),
+            )
+            conn.commit()
+            version = target
+        return version
+    finally:
+        cursor.close()
+
+
+@st.cache_resource(show_spinner=False)
+def ensure_schema():
+    with get_connection() as conn:
+        return run_migrations(conn)
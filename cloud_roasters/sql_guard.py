@@ -0,0 +1,238 @@
+"""Parse-and-rewrite guard for LLM-generated SQL.
+
+Only single read-only queries over ``ROASTING_REPORTS`` get through
+(``split_statements`` breaks a multi-statement answer up first). The table
+must be unqualified or qualified with the connection's own database and
+schema, and rows may only come from tables and subqueries, not from table
+functions such as ``RESULT_SCAN`` or ``GENERATOR``. Functions are limited to
+an allowlist of aggregates, window, date, string and conditional functions,
+so ``SYSTEM$`` and other unknown functions are refused. Every column
+reference is resolved in its own scope: against the report columns, the
+output columns of the subqueries and CTEs it reads from, or (in ``GROUP BY``,
+``HAVING``, ``QUALIFY`` and ``ORDER BY`` only) the select aliases of that
+scope, so an alias can never vouch for the column it is defined from. Joins
+need an equality between columns of both sides, and every query is given a
+row ``LIMIT`` no larger than the one (or the ``FETCH``) it asked for. ``check_scan_cost`` optionally asks
+Snowflake to ``EXPLAIN`` the query and refuses it if it would scan more than
+the budget.
+"""
+
+import json
+
+import sqlglot
+import streamlit as st
+from sqlglot import exp
+from sqlglot.optimizer.scope import Scope, traverse_scope
+from sqlglot.optimizer.simplify import simplify
+
+from cloud_roasters.reports import REPORT_COLUMNS
+
+ALLOWED_TABLES = {"ROASTING_REPORTS"}
+ALLOWED_COLUMNS = set(REPORT_COLUMNS)
+FORBIDDEN_NODES = (
+    exp.Insert, exp.Update, exp.Delete, exp.Merge, exp.Create, exp.Drop,
+    exp.Alter, exp.Command, exp.TruncateTable,
+)
+# Everything else, including exp.Anonymous (unknown and SYSTEM$ functions),
+# is refused.
+ALLOWED_FUNCTIONS = (
+    # Boolean connectives are function nodes in sqlglot.
+    exp.And, exp.Or,
+    # Aggregates and window functions.
+    exp.Count, exp.CountIf, exp.Sum, exp.Avg, exp.Min, exp.Max, exp.Median, exp.Mode, exp.AnyValue,
+    exp.Stddev, exp.StddevPop, exp.StddevSamp, exp.Variance, exp.VariancePop,
+    exp.ApproxQuantile, exp.PercentileCont, exp.PercentileDisc, exp.ApproxDistinct, exp.GroupConcat,
+    exp.RowNumber, exp.Rank, exp.DenseRank, exp.PercentRank, exp.CumeDist, exp.Ntile,
+    exp.Lag, exp.Lead, exp.FirstValue, exp.LastValue,
+    # Arithmetic, conditionals and casts.
+    exp.Abs, exp.Round, exp.Floor, exp.Ceil, exp.Sqrt, exp.Pow, exp.Ln, exp.Log, exp.Exp, exp.Sign,
+    exp.Greatest, exp.Least, exp.Coalesce, exp.Nullif, exp.If, exp.Case, exp.Cast, exp.SafeDivide,
+    # Dates.
+    exp.CurrentDate, exp.CurrentTimestamp, exp.Date, exp.DateFromParts, exp.TsOrDsToDate, exp.StrToDate,
+    exp.StrToTime, exp.DateAdd, exp.DateSub, exp.DateDiff, exp.DateTrunc, exp.TimestampTrunc,
+    exp.TimestampAdd, exp.TimestampDiff, exp.Extract, exp.Year, exp.Quarter, exp.Month, exp.Week,
+    exp.Day, exp.DayOfWeek, exp.DayOfMonth, exp.DayOfYear, exp.Hour, exp.Minute, exp.Dayname,
+    exp.Monthname, exp.LastDay, exp.ToChar, exp.TimeToStr,
+    # Strings.
+    exp.Upper, exp.Lower, exp.Initcap, exp.Trim, exp.Length, exp.Substring, exp.Left, exp.Right,
+    exp.Concat, exp.ConcatWs, exp.Replace, exp.SplitPart, exp.Pad, exp.Contains, exp.StartsWith,
+    exp.EndsWith, exp.RegexpLike,
+)
+# Clauses evaluated after the select list, where its aliases may be used.
+ALIAS_CLAUSES = (exp.Group, exp.Having, exp.Qualify, exp.Order)
+
+
+class SQLGuardError(Exception):
+    pass
+
+
+def split_statements(sql, max_statements=4):
+    # Lets the assistant run several independent queries from one answer;
+    # each piece still goes through guard_sql().
+    try:
+        statements = [statement for statement in sqlglot.parse(sql, read="snowflake") if statement is not None]
+    except sqlglot.errors.ParseError as error:
+        raise SQLGuardError(f"Could not parse the generated SQL: {error}") from error
+    if not statements:
+        raise SQLGuardError("The generated SQL is empty.")
+    if len(statements) > max_statements:
+        raise SQLGuardError(f"At most {max_statements} SQL statements can be run at once.")
+    return [statement.sql(dialect="snowflake") for statement in statements]
+
+
+def _function_name(function):
+    return function.name.upper() if isinstance(function, exp.Anonymous) else function.sql_name()
+
+
+def _equates_columns(condition):
+    # True when, once constants are folded (so "ON a.x = b.x OR 1 = 1" is
+    # just TRUE), one of the ANDed predicates is an equality with a different
+    # column on each side.
+    simplified = simplify(condition.copy())
+    conjuncts = simplified.flatten() if isinstance(simplified, exp.And) else [simplified]
+    for predicate in conjuncts:
+        if not isinstance(predicate, exp.EQ):
+            continue
+        left, right = predicate.left.find(exp.Column), predicate.right.find(exp.Column)
+        if left is None or right is None or left == right:
+            continue
+        if not (left.table and left.table == right.table):
+            return True
+    return False
+
+
+def _output_columns(scope):
+    # Column names a subquery or CTE exposes to the scope reading from it.
+    cte = scope.expression.parent
+    if isinstance(cte, exp.CTE) and cte.args.get("alias") and cte.args["alias"].columns:
+        return {column.name.upper() for column in cte.args["alias"].columns}
+    names = set()
+    for select in scope.expression.selects:
+        if isinstance(select, exp.Star) or (isinstance(select, exp.Column) and isinstance(select.this, exp.Star)):
+            for source in scope.sources.values():
+                names |= _source_columns(source)
+        elif select.alias_or_name:
+            names.add(select.alias_or_name.upper())
+    return names
+
+
+def _source_columns(source):
+    # Tables have been checked already, so any table here is ROASTING_REPORTS.
+    return _output_columns(source) if isinstance(source, Scope) else ALLOWED_COLUMNS
+
+
+def _in_alias_clause(column, scope):
+    node = column
+    while node.parent is not None and node.parent is not scope.expression:
+        node = node.parent
+    return isinstance(node, ALIAS_CLAUSES)
+
+
+def _check_column(column, scope):
+    name = column.name.upper()
+    visible = scope
+    while visible is not None:
+        for source_name, source in visible.sources.items():
+            if column.table and column.table.upper() != source_name.upper():
+                continue
+            if name in _source_columns(source):
+                return
+        visible = visible.parent
+    aliases = {select.alias.upper() for select in scope.expression.selects if isinstance(select, exp.Alias)}
+    if not column.table and name in aliases and _in_alias_clause(column, scope):
+        return
+    raise SQLGuardError(f"Unknown column {column.name}.")
+
+
+def _check_table(table, cte_names, database, schema):
+    if not isinstance(table.this, exp.Identifier):
+        raise SQLGuardError(f"Table {table.sql(dialect='snowflake')} is not available to the assistant.")
+    name = table.name.upper()
+    if name in cte_names and not table.db:
+        return
+    if name not in ALLOWED_TABLES:
+        raise SQLGuardError(f"Table {table.name} is not available to the assistant.")
+    # Qualifiers must name the connection's own database and schema, so the
+    # same table name in another database or schema is not reachable.
+    for part, expected in ((table.catalog, database), (table.db, schema)):
+        if part and (expected is None or part.upper() != expected.upper()):
+            raise SQLGuardError("Only ROASTING_REPORTS in the current database and schema is available.")
+
+
+def guard_sql(sql, max_rows=1000, database=None, schema=None):
+    try:
+        statements = [statement for statement in sqlglot.parse(sql, read="snowflake") if statement is not None]
+    except sqlglot.errors.ParseError as error:
+        raise SQLGuardError(f"Could not parse the generated SQL: {error}") from error
+    if len(statements) != 1:
+        raise SQLGuardError("Only a single SQL statement can be run.")
+
+    query = statements[0]
+    if not isinstance(query, exp.Query) or any(query.find_all(*FORBIDDEN_NODES)):
+        raise SQLGuardError("Only read-only SELECT queries can be run.")
+
+    for function in query.find_all(exp.Func):
+        if not isinstance(function, ALLOWED_FUNCTIONS):
+            raise SQLGuardError(f"Function {_function_name(function)} is not available to the assistant.")
+
+    # Rows may only come from tables and subqueries: TABLE(...), LATERAL,
+    # VALUES and stages are all refused.
+    for source in [*query.find_all(exp.From), *query.find_all(exp.Join)]:
+        if not isinstance(source.this, (exp.Table, exp.Subquery)):
+            raise SQLGuardError("Only ROASTING_REPORTS and subqueries can be queried, not table functions.")
+
+    cte_names = {cte.alias_or_name.upper() for cte in query.find_all(exp.CTE)}
+    for table in query.find_all(exp.Table):
+        _check_table(table, cte_names, database, schema)
+
+    scopes = {id(scope.expression): scope for scope in traverse_scope(query)}
+    for column in query.find_all(exp.Column):
+        # A qualified star (r.*) parses as a column named "*".
+        if not column.name or isinstance(column.this, exp.Star):
+            continue
+        node = column.parent
+        while node is not None and id(node) not in scopes:
+            node = node.parent
+        if node is None:
+            raise SQLGuardError(f"Unknown column {column.name}.")
+        _check_column(column, scopes[id(node)])
+
+    for join in query.find_all(exp.Join):
+        condition = join.args.get("on")
+        if not (join.args.get("using") or (condition is not None and _equates_columns(condition))):
+            raise SQLGuardError(
+                "Joins must match a column of one side to a column of the other with =; cross joins are not allowed."
+            )
+
+    existing = query.args.get("limit")
+    limit = max_rows
+    # LIMIT n and FETCH FIRST n ROWS keep the smaller of n and max_rows.
+    count = existing.args.get("count") if isinstance(existing, exp.Fetch) else getattr(existing, "expression", None)
+    if isinstance(count, exp.Literal) and count.is_int:
+        limit = min(limit, int(count.this))
+    return query.limit(limit).sql(dialect="snowflake")
+
+
+def check_scan_cost(cursor, sql, max_bytes, params=None):
+    cursor.execute(f"EXPLAIN USING JSON {sql}", params)
+    row = cursor.fetchone()
+    plan = json.loads(row[0]) if row and row[0] else {}
+    scanned = int(plan.get("GlobalStats", {}).get("bytesAssigned", 0))
+    if scanned > max_bytes:
+        raise SQLGuardError(
+            f"Query would scan {scanned / 1024 ** 2:,.0f} MB, over the {max_bytes / 1024 ** 2:,.0f} MB budget. "
+            "Try narrowing it with a date, roastery or origin filter."
+        )
+    return scanned
+
+
+def guard_settings():
+    settings = st.secrets.get("sql_guard", {})
+    connection = st.secrets.get("snowflake", {})
+    return {
+        "database": connection.get("database"),
+        "schema": connection.get("schema"),
+        "max_rows": int(settings.get("max_rows", 1000)),
+        "statement_timeout": int(settings.get("statement_timeout", 60)),
+        "explain_max_bytes": int(settings.get("explain_max_mb", 5120)) * 1024 * 1024,
+    }
@@ -0,0 +1,275 @@
+"""Lightweight in-process tracing for the hot paths.
+
+``span(name, **sizes)`` times a block and records it with its parent, so a
+page rerun can be broken down into connection checkouts, batch ID
+reservations, journal writes, LLM calls, queries and rendering. Finished
+spans go to a bounded ring buffer (recent detail) and to fixed-bucket
+latency histograms (process lifetime); both can be exported to a local file
+as Prometheus text or OpenTelemetry (OTLP) JSON.
+
+Tracing is on by default and costs a few microseconds per span. Set
+``CLOUD_ROASTERS_TRACING=0`` to start with it off and
+``CLOUD_ROASTERS_TRACE_BUFFER`` to change how many spans are kept; the
+diagnostics page can also switch it at runtime.
+"""
+
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from cloud_roasters.paths import data_path
+
+SERVICE_NAME = "cloud-roasters"
+# Upper bounds in milliseconds; anything slower lands in the +Inf bucket.
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_enabled = os.environ.get("CLOUD_ROASTERS_TRACING", "1") != "0"
+_current = contextvars.ContextVar("cloud_roasters_span", default=None)
+_lock = threading.Lock()
+_spans = deque(maxlen=int(os.environ.get("CLOUD_ROASTERS_TRACE_BUFFER", 5000)))
+_histograms = {}
+_size_totals = defaultdict(float)
+_errors = defaultdict(int)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "duration_ms", "attrs", "error")
+
+    def __init__(self, name, parent, attrs):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_ns = time.time_ns()
+        self.duration_ms = None
+        self.attrs = attrs
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    @property
+    def is_root(self):
+        return self.parent_id is None
+
+
+class _NoopSpan:
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self.count = 0
+
+    def observe(self, duration_ms):
+        self.counts[bisect_left(BUCKETS_MS, duration_ms)] += 1
+        self.total_ms += duration_ms
+        self.count += 1
+
+
+def is_enabled():
+    return _enabled
+
+
+def set_enabled(enabled):
+    global _enabled
+    _enabled = bool(enabled)
+
+
+@contextmanager
+def span(name, **attrs):
+    # Yields the span so callers can attach sizes once they know them
+    # (``current.set(rows=...)``). Numeric attributes are also summed per
+    # span name for the Prometheus export.
+    if not _enabled:
+        yield _NOOP
+        return
+    current = Span(name, _current.get(), attrs)
+    token = _current.set(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as exp:
+        current.error = type(exp).__name__
+        raise
+    finally:
+        current.duration_ms = (time.perf_counter() - started) * 1000
+        _current.reset(token)
+        _record(current)
+
+
+def current_span():
+    return _current.get() or _NOOP
+
+
+def _record(finished):
+    with _lock:
+        _spans.append(finished)
+        histogram = _histograms.get(finished.name)
+        if histogram is None:
+            histogram = _histograms[finished.name] = _Histogram()
+        histogram.observe(finished.duration_ms)
+        for key, value in finished.attrs.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                _size_totals[(finished.name, key)] += value
+        if finished.error is not None:
+            _errors[finished.name] += 1
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _histograms.clear()
+        _size_totals.clear()
+        _errors.clear()
+
+
+# ---------- reading ----------
+def recent_spans():
+    with _lock:
+        return list(_spans)
+
+
+def histograms():
+    # {name: (bucket upper bounds in ms, per-bucket counts incl. +Inf, count, total ms)}
+    with _lock:
+        return {
+            name: (BUCKETS_MS, list(histogram.counts), histogram.count, histogram.total_ms)
+            for name, histogram in _histograms.items()
+        }
+
+
+def span_summary():
+    # Imported here because metrics imports this module for span().
+    from cloud_roasters.metrics import percentile
+
+    # Percentiles come from the ring buffer (recent spans only); counts and
+    # means from the lifetime histograms.
+    recent = defaultdict(list)
+    for finished in recent_spans():
+        recent[finished.name].append(finished.duration_ms)
+    with _lock:
+        lifetime = {name: (histogram.count, histogram.total_ms) for name, histogram in _histograms.items()}
+        errors = dict(_errors)
+    summary = {}
+    for name, (count, total_ms) in sorted(lifetime.items()):
+        durations = sorted(recent.get(name, ()))
+        summary[name] = {
+            "count": count,
+            "errors": errors.get(name, 0),
+            "mean_ms": round(total_ms / count, 2) if count else None,
+            "p50_ms": round(percentile(durations, 0.5), 2) if durations else None,
+            "p95_ms": round(percentile(durations, 0.95), 2) if durations else None,
+            "max_ms": round(durations[-1], 2) if durations else None,
+        }
+    return summary
+
+
+def slowest_reruns(limit=10):
+    # Root spans are whole reruns (or background jobs); each comes back with
+    # the spans recorded under it, slowest first.
+    spans = recent_spans()
+    roots = sorted((finished for finished in spans if finished.is_root), key=lambda s: s.duration_ms, reverse=True)
+    wanted = {root.trace_id for root in roots[:limit]}
+    children = defaultdict(list)
+    for finished in spans:
+        if finished.trace_id in wanted and not finished.is_root:
+            children[finished.trace_id].append(finished)
+    return [(root, sorted(children[root.trace_id], key=lambda s: s.start_ns)) for root in roots[:limit]]
+
+
+# ---------- export ----------
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text():
+    with _lock:
+        snapshot = {name: (list(h.counts), h.count, h.total_ms) for name, h in _histograms.items()}
+        sizes = dict(_size_totals)
+        errors = dict(_errors)
+    lines = [
+        "# HELP cloud_roasters_span_duration_seconds Time spent in traced spans.",
+        "# TYPE cloud_roasters_span_duration_seconds histogram",
+    ]
+    for name, (counts, count, total_ms) in sorted(snapshot.items()):
+        cumulative = 0
+        for bound, bucket_count in zip((*BUCKETS_MS, None), counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound is None else f"{bound / 1000:g}"
+            lines.append(f'cloud_roasters_span_duration_seconds_bucket{{span="{_label(name)}",le="{le}"}} {cumulative}')
+        lines.append(f'cloud_roasters_span_duration_seconds_sum{{span="{_label(name)}"}} {total_ms / 1000:.6f}')
+        lines.append(f'cloud_roasters_span_duration_seconds_count{{span="{_label(name)}"}} {count}')
+    lines += [
+        "# HELP cloud_roasters_span_size_total Sizes recorded on spans (rows, bytes, tokens).",
+        "# TYPE cloud_roasters_span_size_total counter",
+    ]
+    for (name, key), total in sorted(sizes.items()):
+        lines.append(f'cloud_roasters_span_size_total{{span="{_label(name)}",size="{_label(key)}"}} {total:g}')
+    lines += [
+        "# HELP cloud_roasters_span_errors_total Spans that ended with an exception.",
+        "# TYPE cloud_roasters_span_errors_total counter",
+    ]
+    for name, total in sorted(errors.items()):
+        lines.append(f'cloud_roasters_span_errors_total{{span="{_label(name)}"}} {total}')
+    return "\n".join(lines) + "\n"
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(finished):
+    record = {
+        "traceId": finished.trace_id,
+        "spanId": finished.span_id,
+        "name": finished.name,
+        "kind": 1,
+        "startTimeUnixNano": str(finished.start_ns),
+        "endTimeUnixNano": str(finished.start_ns + int(finished.duration_ms * 1_000_000)),
+        "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in finished.attrs.items()],
+        "status": {"code": 2, "message": finished.error} if finished.error else {"code": 1},
+    }
+    if finished.parent_id is not None:
+        record["parentSpanId"] = finished.parent_id
+    return record
+
+
+def otlp_json():
+    return json.dumps({
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [_otlp_span(finished) for finished in recent_spans()],
+            }],
+        }],
+    })
+
+
+EXPORTERS = {"prometheus": (prometheus_text, "prom"), "otlp": (otlp_json, "json")}
+
+
+def export(fmt, path=None):
+    render, suffix = EXPORTERS[fmt]
+    path = path or data_path("traces", f"{time.strftime('%Y%m%d-%H%M%S')}-{fmt}.{suffix}")
+    path.write_text(render())
+    return path
@@ -0,0 +1,124 @@
+"""Validation rules for roasting reports.
+
+The same rule table drives the single-record form check and the vectorized
+bulk-upload check, so both paths accept and reject exactly the same data.
+"""
+
+from datetime import datetime
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytz
+
+SYDNEY = pytz.timezone("Australia/Sydney")
+
+REQUIRED_TEXT = {
+    "ROASTERY": "Roastery is required.",
+    "BEAN_CODE": "Bean Name / Code is required.",
+    "ORIGIN": "Bean Origin is required.",
+    "ROAST_LEVEL": "Roast Level is required.",
+}
+
+POSITIVE_NUMBERS = {
+    "ROAST_DURATION_MINS": "Roast Duration must be greater than 0.",
+    "FIRST_CRACK_TIME_MINS": "First Crack Time must be greater than 0.",
+    "DEVELOPMENT_TIME_MINS": "Development Time must be greater than 0.",
+    "GREEN_BEAN_WEIGHT_KG": "Green Bean Weight must be greater than 0.",
+    "ROASTED_WEIGHT_KG": "Final Roasted Weight must be greater than 0.",
+}
+
+BULK_REQUIRED_COLUMNS = ("ROAST_DATE", *REQUIRED_TEXT, *POSITIVE_NUMBERS)
+INTEGER_COLUMNS = ("ROAST_DURATION_MINS", "FIRST_CRACK_TIME_MINS", "DEVELOPMENT_TIME_MINS")
+
+
+# ========== Single Record ==========
+def validate_record(record):
+    errors = [message for column, message in REQUIRED_TEXT.items() if not str(record.get(column) or "").strip()]
+    errors += [message for column, message in POSITIVE_NUMBERS.items() if not record[column] > 0]
+    return errors
+
+
+def sydney_now():
+    # Naive Sydney wall-clock time, the way SUBMISSION_TIMESTAMP is stored.
+    return pd.Timestamp(datetime.now(SYDNEY).replace(microsecond=0, tzinfo=None))
+
+
+def compute_weight_loss(green_weight, roasted_weight):
+    return round(((green_weight - roasted_weight) / green_weight) * 100, 2) if green_weight else 0
+
+
+# ========== Bulk Frames ==========
+def normalize_columns(df):
+    df = df.copy()
+    df.columns = [str(column).strip().upper().replace(" ", "_") for column in df.columns]
+    return df
+
+
+def validate_frame(df):
+    """Validate a whole upload at once.
+
+    Returns ``(valid, errors)``: the cleaned rows ready to load (with
+    ``WEIGHT_LOSS`` derived) and a frame of ``ROW``/``ERROR`` pairs, where
+    ``ROW`` is the 1-based data row in the uploaded file.
+    """
+    df = normalize_columns(df)
+    missing = [column for column in BULK_REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        errors = pd.DataFrame({"ROW": [0], "ERROR": [f"Missing column(s): {', '.join(missing)}"]})
+        return df.iloc[0:0], errors
+
+    failures = {}
+    for column, message in REQUIRED_TEXT.items():
+        df[column] = df[column].astype("string").str.strip()
+        failures[message] = df[column].isna() | (df[column] == "")
+    for column, message in POSITIVE_NUMBERS.items():
+        df[column] = pd.to_numeric(df[column], errors="coerce")
+        if column in INTEGER_COLUMNS:
+            # Rounded before the check, so 0.4 minutes is rejected, not stored as 0.
+            df[column] = df[column].round()
+        failures[message] = ~(df[column] > 0)
+
+    roast_dates = pd.to_datetime(df["ROAST_DATE"], errors="coerce")
+    failures["Roast Date is missing or not a valid date."] = roast_dates.isna()
+    df["ROAST_DATE"] = roast_dates.dt.date
+
+    if "BATCH_ID" in df.columns:
+        df["BATCH_ID"] = pd.to_numeric(df["BATCH_ID"], errors="coerce").astype("Int64")
+        failures["BATCH_ID is duplicated in this file."] = df["BATCH_ID"].notna() & df["BATCH_ID"].duplicated(keep=False)
+    else:
+        df["BATCH_ID"] = pd.array([pd.NA] * len(df), dtype="Int64")
+
+    failure_matrix = pd.DataFrame(failures, index=df.index)
+    rows, rules = np.nonzero(failure_matrix.to_numpy())
+    errors = pd.DataFrame({
+        "ROW": rows + 1,
+        "ERROR": failure_matrix.columns.to_numpy()[rules],
+    })
+
+    valid = df.loc[~failure_matrix.any(axis=1)].copy()
+    for column in INTEGER_COLUMNS:
+        valid[column] = valid[column].astype("int64")
+    green = valid["GREEN_BEAN_WEIGHT_KG"]
+    valid["WEIGHT_LOSS"] = ((green - valid["ROASTED_WEIGHT_KG"]) / green * 100).round(2)
+    for column in ("MOISTURE_CONTENT", "ROAST_NOTES", "SUBMISSION_TIMESTAMP"):
+        if column not in valid.columns:
+            valid[column] = None
+    valid["MOISTURE_CONTENT"] = pd.to_numeric(valid["MOISTURE_CONTENT"], errors="coerce")
+    valid["ROAST_NOTES"] = valid["ROAST_NOTES"].fillna("").astype(str)
+    submitted = pd.to_datetime(valid["SUBMISSION_TIMESTAMP"], errors="coerce")
+    if submitted.dt.tz is not None:
+        submitted = submitted.dt.tz_convert(SYDNEY).dt.tz_localize(None)
+    valid["SUBMISSION_TIMESTAMP"] = submitted.fillna(sydney_now())
+    return valid.reset_index(drop=True), errors
+
+
+def read_report_file(name, data):
+    buffer = BytesIO(data)
+    if name.lower().endswith(".parquet"):
+        return pd.read_parquet(buffer)
+    try:
+        return pd.read_csv(buffer, engine="pyarrow")
+    except (ImportError, ValueError):
+        buffer.seek(0)
+        return pd.read_csv(buffer)
@@ -1,8 +1,20 @@
+import hashlib
 import streamlit as st
 from datetime import date, datetime
 import pytz
-import time
-import snowflake.connector
+
+from cloud_roasters.assets import inject_styles, render_logo
+from cloud_roasters.batch_ids import get_batch_id_allocator, reserve_ids
+from cloud_roasters.constants import ORIGINS, ROAST_LEVELS, STORES
+from cloud_roasters.journal import get_report_queue
+from cloud_roasters.metrics import timed
+from cloud_roasters.reports import bulk_load_reports, existing_batch_ids
+from cloud_roasters.roast_stats import get_roast_stats
+from cloud_roasters.schema import ensure_schema
+from cloud_roasters.tracing import span
+from cloud_roasters.validation import (
+    compute_weight_loss, read_report_file, sydney_now, validate_frame, validate_record,
+)
 
 st.set_page_config(
     page_title="Cloud Roasters | RRF", 
@@ -12,126 +24,149 @@ st.set_page_config(
     menu_items=None
     )
 
-def get_connection():
-    return snowflake.connector.connect(
-        user=st.secrets["snowflake"]["user"],
-        password=st.secrets["snowflake"]["password"],
-        account=st.secrets["snowflake"]["account"],
-        warehouse=st.secrets["snowflake"]["warehouse"],
-        database=st.secrets["snowflake"]["database"],
-        schema=st.secrets["snowflake"]["schema"]
-    )
+# Reset by hand after a confirmed save, since the form keeps its values
+# (clear_on_submit=False) while the batch is being reviewed.
+FORM_KEYS = (
+    "selected_store", "roast_date", "bean_code", "bean_origin", "moisture_content", "roast_type",
+    "roast_duration", "first_crack_time", "development_time", "green_weight", "roasted_weight", "roast_notes",
+)
 
-def initialize_table():
-    create_query = """
-        CREATE TABLE IF NOT EXISTS ROASTING_REPORTS (
-            "BATCH_ID" INTEGER PRIMARY KEY,
-            "ROASTERY" VARCHAR(255),
-            "ROAST_DATE" DATE,
-            "BEAN_CODE" VARCHAR(255),
-            "ORIGIN" VARCHAR(255),
-            "MOISTURE_CONTENT" NUMBER(5,2),
-            "ROAST_LEVEL" VARCHAR(50),
-            "ROAST_DURATION_MINS" INTEGER,
-            "FIRST_CRACK_TIME_MINS" INTEGER,
-            "DEVELOPMENT_TIME_MINS" INTEGER,
-            "GREEN_BEAN_WEIGHT_KG" NUMBER(10,2),
-            "ROASTED_WEIGHT_KG" NUMBER(10,2),
-            "WEIGHT_LOSS" NUMBER(5,2),
-            "ROAST_NOTES" VARCHAR(500),
-            "SUBMISSION_TIMESTAMP" TIMESTAMP
-        );
-    """
-    with get_connection() as conn:
-        with conn.cursor() as cursor:
-            cursor.execute(create_query)
-            conn.commit()
-
-def get_next_batch_id_from_table():
-    with get_connection() as conn:
-        with conn.cursor() as cursor:
-            cursor.execute('SELECT MAX("BATCH_ID") FROM ROASTING_REPORTS')
-            result = cursor.fetchone()
-            return 1 if result[0] is None else result[0] + 1
+def get_next_batch_id():
+    # The reserved ID stays with the session until insert_record() succeeds,
+    # so reruns keep showing the same number and failed submits don't burn it.
+    if "pending_batch_id" not in st.session_state:
+        with span("form.next_batch_id"):
+            st.session_state.pending_batch_id = get_batch_id_allocator().allocate()
+    return st.session_state.pending_batch_id
 
 def insert_record(record):
-    insert_query = """
-        INSERT INTO ROASTING_REPORTS 
-        ("BATCH_ID", "ROAST_DATE", "ROASTERY", "BEAN_CODE", "ORIGIN", "MOISTURE_CONTENT", "ROAST_LEVEL", 
-         "ROAST_DURATION_MINS", "FIRST_CRACK_TIME_MINS", "DEVELOPMENT_TIME_MINS", "GREEN_BEAN_WEIGHT_KG", 
-         "ROASTED_WEIGHT_KG", "WEIGHT_LOSS", "ROAST_NOTES", "SUBMISSION_TIMESTAMP")
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """
-    with get_connection() as conn:
-        with conn.cursor() as cursor:
-            cursor.execute(insert_query, (
-                record["BATCH_ID"],
-                record["ROAST_DATE"],
-                record["ROASTERY"],
-                record["BEAN_CODE"],
-                record["ORIGIN"],
-                record["MOISTURE_CONTENT"],
-                record["ROAST_LEVEL"],
-                record["ROAST_DURATION_MINS"],
-                record["FIRST_CRACK_TIME_MINS"],
-                record["DEVELOPMENT_TIME_MINS"],
-                record["GREEN_BEAN_WEIGHT_KG"],
-                record["ROASTED_WEIGHT_KG"],
-                record["WEIGHT_LOSS"],
-                record["ROAST_NOTES"],
-                record["SUBMISSION_TIMESTAMP"]
-            ))
-            conn.commit()
+    # Accepted once it is durably journalled locally; the background flusher
+    # batches it into ROASTING_REPORTS.
+    with span("form.insert_record"):
+        get_report_queue().submit(record)
 
-def main():
-    initialize_table()
-
-    st.markdown(
-        """
-        <style>
-        [data-testid="stAppViewContainer"] {
-            background-color: #C8b49c;
-        }
-        [data-testid="stForm"] {
-            background-color: #000000;
-            color: #FFFFFF;
-            padding: 20px;
-            border-radius: 10px;
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
+def show_upload_status():
+    queue = get_report_queue()
+    stats = queue.stats()
+    if stats["depth"]:
+        st.caption(
+            f"{stats['depth']} report(s) waiting to upload to Snowflake "
+            f"(oldest {stats['lag_seconds']:.0f}s)."
+        )
+    if stats["last_error"]:
+        st.caption(f"Last upload attempt failed, retrying: {stats['last_error']}")
+    if stats["dead_letters"]:
+        st.warning(f"{stats['dead_letters']} report(s) could not be uploaded and were set aside.")
+        with st.expander("Reports that failed to upload"):
+            st.dataframe(
+                [
+                    {
+                        "Batch ID": record.get("BATCH_ID"),
+                        "Bean": record.get("BEAN_CODE"),
+                        "Roast date": record.get("ROAST_DATE"),
+                        "Attempts": attempts,
+                        "Error": error,
+                    }
+                    for _, record, attempts, error, _ in queue.dead_letters()
+                ],
+                use_container_width=True,
+                hide_index=True,
+            )
+            st.button("Retry these uploads", key="retry_dead_letters", on_click=queue.retry_dead_letters)
+
+@st.cache_data(show_spinner="Validating upload...", max_entries=4)
+def validate_upload(name, data):
+    return validate_frame(read_report_file(name, data))
+
+@st.fragment
+def bulk_upload():
+    st.markdown("<h3 style='text-align: center;'>Bulk Roasting Report Upload</h3>", unsafe_allow_html=True)
+    st.caption(
+        "Upload a roaster log as CSV or Parquet with one row per batch. Rows with a BATCH_ID "
+        "replace the existing batch with that ID; rows without one are given new IDs. "
+        "A BATCH_ID that does not match an existing batch is rejected."
     )
-    st.image("logo.png", use_container_width=True)
+    uploaded_file = st.file_uploader("Roaster log:", type=["csv", "parquet"], key="bulk_file")
+    if uploaded_file is None:
+        return
+
+    data = uploaded_file.getvalue()
+    digest = hashlib.blake2b(data, digest_size=20).hexdigest()
+    valid, errors = validate_upload(uploaded_file.name, data)
+    st.write(f"{len(valid)} valid row(s), {errors['ROW'].nunique()} row(s) with errors.")
+    if not errors.empty:
+        st.error("These rows will be skipped:")
+        st.dataframe(errors, use_container_width=True, hide_index=True)
+
+    # Only IDs handed out by the sequence may be given: an unallocated ID
+    # would later be allocated to a form submission and overwrite this batch.
+    explicit = valid["BATCH_ID"].dropna().astype("int64")
+    unknown = sorted(set(explicit) - existing_batch_ids(explicit))
+    if unknown:
+        shown = ", ".join(str(batch_id) for batch_id in unknown[:20])
+        more = f" and {len(unknown) - 20} more" if len(unknown) > 20 else ""
+        st.error(
+            f"{len(unknown)} row(s) will be skipped: BATCH_ID {shown}{more} does not match an existing batch. "
+            "Leave BATCH_ID empty to add a new batch."
+        )
+        valid = valid.loc[~valid["BATCH_ID"].isin(unknown)]
+    if valid.empty:
+        return
+
+    st.dataframe(valid.head(100), use_container_width=True, hide_index=True)
+    # Loading the same file twice would insert its new batches twice, since
+    # rows without a BATCH_ID get fresh IDs on every load.
+    if st.session_state.get("bulk_loaded_digest") == digest:
+        st.info("This file has already been loaded.")
+        if not st.checkbox("Load it again (rows without a BATCH_ID are added again)", key="bulk_load_again"):
+            return
+    if st.button(f"Load {len(valid)} batch(es)", key="bulk_load"):
+        to_load = valid.copy()
+        missing_ids = to_load["BATCH_ID"].isna()
+        # A replaced batch counts as resubmitted now, so incremental readers
+        # of SUBMISSION_TIMESTAMP (the local mirror, the query cache
+        # watermark) pick the new version up.
+        to_load.loc[~missing_ids, "SUBMISSION_TIMESTAMP"] = sydney_now()
+        if missing_ids.any():
+            to_load.loc[missing_ids, "BATCH_ID"] = reserve_ids(int(missing_ids.sum()))
+        to_load["BATCH_ID"] = to_load["BATCH_ID"].astype("int64")
+        try:
+            with st.spinner("Loading into Snowflake..."):
+                loaded = bulk_load_reports(to_load)
+            st.session_state.bulk_loaded_digest = digest
+            st.session_state.pop("bulk_load_again", None)
+            st.success(f"Loaded {loaded} roasting report(s) into the database.")
+        except Exception as exp:
+            st.error(f"Error bulk loading into Snowflake: {exp}")
+
+@st.fragment
+def roasting_form():
+    # Runs as a fragment: submitting the form reruns only this function, not
+    # the page chrome above it.
+    with timed("form.fragment_run"):
+        render_roasting_form()
+
+def render_roasting_form():
+    show_upload_status()
 
-    with st.form("roasting_form", clear_on_submit=True, enter_to_submit=False):
-        batch_id = get_next_batch_id_from_table()
+    with st.form("roasting_form", clear_on_submit=False, enter_to_submit=False):
+        batch_id = get_next_batch_id()
         st.markdown("<h3 style='text-align: center;'>Roasting Report Form</h3>", unsafe_allow_html=True)
         st.markdown(f"Batch ID: {batch_id}", unsafe_allow_html=True)
 
-        store_list = [
-            "Martin Place Store", "Bondi Store", "Coogee Store",
-            "Paddington Store", "Surry Hills Store", "Bronte Store", "Newtown Store"
-        ]
-        selected_store = st.selectbox("Select Roastery Location:", store_list, key="selected_store")
+        selected_store = st.selectbox("Select Roastery Location:", STORES, key="selected_store")
 
         roast_date = st.date_input("Roast Date:", value=date.today(), key="roast_date")
         bean_code = st.text_input("Bean Name:", placeholder="Enter bean name or code", key="bean_code")
 
-        country_list = [
-            "Ethiopia", "Brazil", "Colombia", "Kenya", "Costa Rica", "Guatemala", "Honduras", "Peru", "Mexico", "India",
-            "Vietnam", "Indonesia", "Rwanda", "Tanzania", "Panama", "El Salvador", "Nicaragua", "Burundi", "Papua New Guinea",
-            "Yemen", "Uganda", "China", "Thailand", "Philippines", "Zambia", "Malawi", "Dominican Republic", "Haiti",
-            "Venezuela", "Cameroon", "Bolivia", "Laos", "Nepal", "Cuba", "Ivory Coast", "Sri Lanka", "Timor-Leste"
-        ]
-        bean_origin = st.selectbox("Bean Origin:", country_list, key="bean_origin")
+        bean_origin = st.selectbox("Bean Origin:", ORIGINS, key="bean_origin")
 
         moisture_content = st.number_input(
             "Moisture Content (%):", 
             min_value=0.0, max_value=100.0,
             value=15.0, step=0.5, key="moisture_content"
         )
-        roast_type = st.selectbox("Roast Level:", ["Light", "Medium", "Medium-Dark", "Dark"], key="roast_type")
+        roast_type = st.selectbox("Roast Level:", ROAST_LEVELS, key="roast_type")
         roast_duration = st.number_input(
             "Roast Duration (minutes):", 
             min_value=0, max_value=60,
@@ -162,57 +197,111 @@ def main():
         submitted = st.form_submit_button("Submit")
 
         if submitted:
-            errors = []
-            if not bean_code.strip():
-                errors.append("Bean Name / Code is required.")
-            if roast_duration <= 0:
-                errors.append("Roast Duration must be greater than 0.")
-            if first_crack_time <= 0:
-                errors.append("First Crack Time must be greater than 0.")
-            if development_time <= 0:
-                errors.append("Development Time must be greater than 0.")
-            if green_weight <= 0:
-                errors.append("Green Bean Weight must be greater than 0.")
-            if roasted_weight <= 0:
-                errors.append("Final Roasted Weight must be greater than 0.")
+            new_record = {
+                "BATCH_ID": batch_id,
+                "ROAST_DATE": roast_date,
+                "ROASTERY": selected_store,
+                "BEAN_CODE": bean_code,
+                "ORIGIN": bean_origin,
+                "MOISTURE_CONTENT": moisture_content,
+                "ROAST_LEVEL": roast_type,
+                "ROAST_DURATION_MINS": roast_duration,
+                "FIRST_CRACK_TIME_MINS": first_crack_time,
+                "DEVELOPMENT_TIME_MINS": development_time,
+                "GREEN_BEAN_WEIGHT_KG": green_weight,
+                "ROASTED_WEIGHT_KG": roasted_weight,
+                "ROAST_NOTES": roast_notes,
+            }
+            errors = validate_record(new_record)
 
             if errors:
+                st.session_state.pop("pending_report", None)
                 for error in errors:
                     st.error(error)
             else:
-                weight_loss = round(((green_weight - roasted_weight) / green_weight) * 100, 2) if green_weight else 0
-
-                aedt = pytz.timezone("Australia/Sydney")
-                submission_ts = datetime.now(aedt).replace(microsecond=0)
-
-                new_record = {
-                    "BATCH_ID": batch_id,
-                    "ROAST_DATE": roast_date,
-                    "ROASTERY": selected_store,
-                    "BEAN_CODE": bean_code,
-                    "ORIGIN": bean_origin,
-                    "MOISTURE_CONTENT": moisture_content,
-                    "ROAST_LEVEL": roast_type,
-                    "ROAST_DURATION_MINS": roast_duration,
-                    "FIRST_CRACK_TIME_MINS": first_crack_time,
-                    "DEVELOPMENT_TIME_MINS": development_time,
-                    "GREEN_BEAN_WEIGHT_KG": green_weight,
-                    "ROASTED_WEIGHT_KG": roasted_weight,
-                    "WEIGHT_LOSS": weight_loss,
-                    "ROAST_NOTES": roast_notes,
-                    "SUBMISSION_TIMESTAMP": submission_ts
-                }
-                try:
-                    insert_record(new_record)
-                    st.success(
-                        f"Roasting data submitted for {bean_code} (Batch #{batch_id}) on {roast_date} at {selected_store}."
-                    )
-                    st.info("Roasting Report successfully imported into database.")
-                    with st.empty():
-                        time.sleep(1)
-                        st.rerun()
-                except Exception as exp:
-                    st.error(f"Error inserting record into Snowflake: {exp}")
+                # Nothing is saved yet: the batch is checked against its
+                # origin and roast level first, and saved on confirm.
+                new_record["WEIGHT_LOSS"] = compute_weight_loss(green_weight, roasted_weight)
+                st.session_state.pending_report = new_record
+
+    show_report_messages()
+    review_pending_report()
+
+def describe_check(check):
+    if not check.enough_history:
+        return f"{check.label}: {check.value:.2f} (only {check.count} earlier batch(es) to compare with)"
+    if check.low is None:
+        return f"{check.label}: {check.value:.2f} (average {check.mean:.2f}, z {check.z:+.1f})"
+    return (
+        f"{check.label}: {check.value:.2f} (typical {check.low:.2f} to {check.high:.2f}, "
+        f"median {check.median:.2f}, z {check.z:+.1f}, {check.count} batches)"
+    )
+
+def review_pending_report():
+    record = st.session_state.get("pending_report")
+    if record is None:
+        return
+    with span("form.anomaly_score"):
+        report = get_roast_stats().score(record)
+    group = f"{record['ORIGIN']} {record['ROAST_LEVEL']} roasts"
+    with st.container(border=True):
+        st.markdown(f"**Review Batch #{record['BATCH_ID']} before saving**")
+        if report.score is None:
+            st.info(f"Not enough history for {group} to compare against yet.")
+        elif report.flagged:
+            st.warning(
+                f"Unusual for {group}: {', '.join(check.label.lower() for check in report.flagged)} "
+                f"(anomaly score {report.score:.1f}). Check the entries before confirming."
+            )
+        else:
+            st.success(f"Within the usual range for {group} (anomaly score {report.score:.1f}).")
+        for check in report.checks:
+            st.caption(describe_check(check))
+        confirm_col, edit_col = st.columns(2)
+        confirm_col.button("Confirm and save", key="confirm_report", type="primary", on_click=save_pending_report)
+        edit_col.button("Edit", key="edit_report", on_click=discard_pending_report)
+
+def save_pending_report():
+    # Button callback: runs before the rerun, which is what allows the form
+    # widgets to be reset here.
+    record = dict(st.session_state.pending_report)
+    aedt = pytz.timezone("Australia/Sydney")
+    record["SUBMISSION_TIMESTAMP"] = datetime.now(aedt).replace(microsecond=0)
+    try:
+        insert_record(record)
+    except Exception as exp:
+        st.session_state.report_messages = [("error", f"Error saving roasting report: {exp}")]
+        return
+    for key in ("pending_report", "pending_batch_id", *FORM_KEYS):
+        st.session_state.pop(key, None)
+    st.session_state.report_messages = [
+        ("success", f"Roasting data submitted for {record['BEAN_CODE']} (Batch #{record['BATCH_ID']}) "
+                    f"on {record['ROAST_DATE']} at {record['ROASTERY']}."),
+        ("info", "Roasting Report saved and queued for upload to the database."),
+    ]
+
+def discard_pending_report():
+    st.session_state.pop("pending_report", None)
+
+def show_report_messages():
+    for kind, message in st.session_state.pop("report_messages", []):
+        getattr(st, kind)(message)
+
+def render_page():
+    ensure_schema()
+
+    inject_styles()
+    render_logo()
+
+    mode = st.radio("Entry mode:", ["Single batch", "Bulk upload"], horizontal=True, key="entry_mode")
+    if mode == "Bulk upload":
+        bulk_upload()
+    else:
+        roasting_form()
+
+def main():
+    with timed("form.full_run"):
+        render_page()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
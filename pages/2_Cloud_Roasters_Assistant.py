@@ -1,8 +1,21 @@
+import time
+
 import streamlit as st
-import snowflake.connector
-import pandas as pd
-import requests
-import re
+
+from cloud_roasters.admission import AdmissionTimeout, get_limiter, get_llm_flights
+from cloud_roasters.assets import inject_styles, render_logo
+from cloud_roasters.history import ResultSnapshot, Turn, get_history
+from cloud_roasters.intents import get_intent_router
+from cloud_roasters.llm import get_llm_client, split_sql_stream
+from cloud_roasters.llm_cache import answer_key, get_answer_cache
+from cloud_roasters.metrics import record_llm_usage, timed
+from cloud_roasters.pipeline import get_query_pipeline, pipeline_settings
+from cloud_roasters.prompts import (
+    build_messages, build_system_prompt, current_snapshot, prompt_fingerprint, prompt_settings,
+)
+from cloud_roasters.results import render_pager, result_budget
+from cloud_roasters.sql_guard import SQLGuardError, guard_settings, guard_sql, split_statements
+from cloud_roasters.tracing import span
 
 # ========== Page Setup ==========
 st.set_page_config(
@@ -13,157 +26,253 @@ st.set_page_config(
 )
 
 # ========== Custom Styling ==========
-st.markdown("""
-    <style>
-    [data-testid="stAppViewContainer"] {
-        background-color: #C8b49c;
-    }
-
-    .custom-form-wrapper {
-        max-width: 800px;
-        margin: 0 auto;
-    }
-
-    [data-testid="stForm"] {
-        background-color: #000000;
-        color: #FFFFFF;
-        padding: 20px;
-        border-radius: 10px;
-    }
-
-    textarea {
-        background-color: #1c1c1c !important;
-        color: white !important;
-        border: 1px solid #555 !important;
-        border-radius: 8px !important;
-        font-size: 16px !important;
-    }
-
-    pre {
-        max-height: 300px !important;
-        overflow-y: auto !important;
-        white-space: pre-wrap !important;
-        word-wrap: break-word !important;
-    }
-    </style>
-""", unsafe_allow_html=True)
+inject_styles("assistant")
 
 # ========== Logo ==========
-st.image("logo.png", use_container_width=True)
+render_logo()
 
 # ========== Ask Mistral LLM ==========
+LLM_MODEL = "mistral-small"
+# Bump whenever the prompt rules change so cached answers are not reused; the
+# schema fingerprint below covers column and value changes.
+PROMPT_VERSION = 2
+# Queue waits shorter than this are not worth mentioning.
+WAIT_NOTICE_SECONDS = 0.5
+
 def ask_llm(question):
-    try:
-        headers = {
-            "Authorization": f"Bearer {st.secrets['mistral']['api_key']}",
-            "Content-Type": "application/json"
-        }
+    # Returns the answer as an iterable of chunks. Cache hits come back as one
+    # chunk; otherwise the answer streams from a Mistral call that is shared
+    # with any identical question already in flight.
+    with span("assistant.ask_llm") as current:
+        system_prompt = build_system_prompt(current_snapshot(), prompt_settings()["max_tokens"])
+        prompt_bytes = len(system_prompt.encode("utf-8")) + len(question.encode("utf-8"))
+        cache = get_answer_cache()
+        key = answer_key(question, f"{PROMPT_VERSION}:{prompt_fingerprint(system_prompt)}", LLM_MODEL)
+        answer = cache.get(key)
+        current.set(prompt_bytes=prompt_bytes, cached=answer is not None)
+    if answer is not None:
+        return [answer]
 
-        prompt = f"""
-        You are a helpful assistant for a coffee roasting company.
+    client, limiter = get_llm_client(), get_limiter("mistral")
+    messages = build_messages(question, system_prompt)
 
-        If the user asks a question about roasting data (e.g. batch times, weights, roast levels),
-        return a single valid Snowflake SQL query using the ROASTING_REPORTS table. Do not explain it.
+    def produce(stream):
+        # Runs once per in-flight question on a background thread, so it must
+        # not call Streamlit. The answer is cached before the flight ends.
+        with span("llm.stream", prompt_bytes=prompt_bytes) as current, limiter.acquire() as waited:
+            stream.wait_seconds = waited
+            usage = {}
+            parts = []
+            first_token_ms = None
+            started = time.perf_counter()
+            for chunk in client.stream(messages, LLM_MODEL, on_usage=usage.update):
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000
+                parts.append(chunk)
+                yield chunk
+            answer = "".join(parts).strip()
+            current.set(
+                wait_ms=round(waited * 1000, 3),
+                completion_bytes=len(answer.encode("utf-8")),
+                prompt_tokens=usage.get("prompt_tokens") or 0,
+                completion_tokens=usage.get("completion_tokens") or 0,
+            )
+        record_llm_usage(
+            LLM_MODEL,
+            usage.get("prompt_tokens"),
+            usage.get("completion_tokens"),
+            (time.perf_counter() - started) * 1000,
+            first_token_ms,
+        )
+        if answer:
+            cache.put(key, question, answer)
 
-        If the question is about coffee knowledge (e.g. bean pairings, brewing tips, flavour profiles),
-        respond with a natural language answer.
+    return get_llm_flights().subscribe(key, produce)
 
-        ROASTING_REPORTS columns:
-        BATCH_ID, ROASTERY, ROAST_DATE, BEAN_CODE, ORIGIN, MOISTURE_CONTENT,
-        ROAST_LEVEL, ROAST_DURATION_MINS, FIRST_CRACK_TIME_MINS, DEVELOPMENT_TIME_MINS,
-        GREEN_BEAN_WEIGHT_KG, ROASTED_WEIGHT_KG, WEIGHT_LOSS, ROAST_NOTES, SUBMISSION_TIMESTAMP.
+def show_llm_waits(chunks):
+    if getattr(chunks, "shared", False):
+        st.caption("Joined an identical question that was already being answered.")
+    if getattr(chunks, "wait_seconds", 0) >= WAIT_NOTICE_SECONDS:
+        st.caption(f"Waited {chunks.wait_seconds:.1f}s in the queue for Mistral.")
 
-        If the query filters by ROASTERY, ORIGIN, or BEAN_CODE, use a case-insensitive partial match like:
-        ROASTERY ILIKE '%coogee%' instead of ROASTERY = 'Coogee Store'.
+# ========== Run SQL Query ==========
+def cancel_pending_jobs():
+    # A new question (or the user leaving mid-run) abandons whatever the last
+    # one still had in flight.
+    pipeline = get_query_pipeline()
+    for job in st.session_state.pop("assistant_jobs", []):
+        pipeline.cancel(job)
 
-        Also, wrap all string values in single quotes.
+def report_error(turn, message):
+    st.error(message)
+    turn.errors.append(message)
 
-        Question: {question}
-        """
+def report_notice(turn, message):
+    # Capacity problems are a "try again shortly", not a failure.
+    st.warning(message)
+    turn.notices.append(message)
 
-        data = {
-            "model": "mistral-small",
-            "messages": [
-                {"role": "system", "content": "You are a coffee expert and Snowflake SQL expert."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.2
-        }
+def show_outcome(outcome, turn):
+    if isinstance(outcome.error, AdmissionTimeout):
+        report_notice(turn, f"{outcome.error} Please ask again in a moment.")
+        return False
+    if isinstance(outcome.error, SQLGuardError):
+        report_error(turn, f"Query blocked: {outcome.error}")
+        return False
+    if outcome.error is not None:
+        report_error(turn, f"SQL execution error:\n\n{outcome.error}")
+        return False
+    st.success("Query executed successfully!")
+    if outcome.shared:
+        st.caption("Shared the result of an identical query that was already running.")
+    if outcome.wait_seconds >= WAIT_NOTICE_SECONDS:
+        st.caption(f"Waited {outcome.wait_seconds:.1f}s in the queue for Snowflake.")
+    if outcome.source == "mirror":
+        st.caption(f"Answered from the local mirror (synced {outcome.mirror_age:.0f}s ago).")
+    if outcome.pager.rows_loaded == 0:
+        st.warning("But it returned no results.")
+    return True
 
-        response = requests.post("https://api.mistral.ai/v1/chat/completions", headers=headers, json=data)
-        response.raise_for_status()
-        return response.json()["choices"][0]["message"]["content"].strip()
+def run_statements(statements, turn):
+    # Each statement runs on its own pooled connection, so independent
+    # queries overlap instead of queueing behind each other.
+    pipeline = get_query_pipeline()
+    settings, budget = guard_settings(), result_budget()
+    jobs = [pipeline.submit(sql, params, settings, budget) for sql, params in statements]
+    st.session_state.assistant_jobs = jobs
+    try:
+        with st.spinner("Running SQL..."):
+            outcomes = [job.outcome() for job in jobs]
+    except BaseException:
+        cancel_pending_jobs()
+        raise
+    st.session_state.assistant_jobs = []
 
-    except Exception as e:
-        st.error(f"Mistral API error: {e}")
-        return ""
+    for outcome in outcomes:
+        if show_outcome(outcome, turn):
+            turn.results.append(ResultSnapshot(outcome.sql, outcome.params, outcome.pager))
 
-# ========== Snowflake Connection ==========
-def connect_to_snowflake():
-    try:
-        return snowflake.connector.connect(
-            user=st.secrets["snowflake"]["user"],
-            password=st.secrets["snowflake"]["password"],
-            account=st.secrets["snowflake"]["account"],
-            warehouse=st.secrets["snowflake"]["warehouse"],
-            database=st.secrets["snowflake"]["database"],
-            schema=st.secrets["snowflake"]["schema"],
-            role=st.secrets["snowflake"]["role"]
-        )
-    except Exception as e:
-        st.error(f"Snowflake connection failed: {e}")
-        return None
+# ========== Conversation History ==========
+def render_result(result, key):
+    st.code(result.sql, language="sql")
+    if result.params:
+        st.caption(f"Parameters: {', '.join(str(value) for value in result.params)}")
+    pager = result.pager()
+    if pager is None:
+        st.caption("These results have expired; ask again to re-run the query.")
+        return
+    if pager.rows_loaded or not pager.exhausted:
+        render_pager(pager, key=key)
+    if result.partial:
+        st.caption("Only the rows browsed before the next question were kept.")
 
-# ========== Run SQL Query ==========
-def run_query(query, conn):
-    try:
-        with conn.cursor() as cur:
-            cur.execute(query)
-            rows = cur.fetchall()
-            if not rows:
-                st.success("Query executed successfully!")
-                st.warning("But it returned no results.")
-                return pd.DataFrame()
-            columns = [desc[0] for desc in cur.description]
-            st.success("Query executed successfully!")
-            return pd.DataFrame(rows, columns=columns)
-    except Exception as e:
-        st.error(f"SQL execution error:\n\n{e}")
-        return None
+def render_turn_results(turn):
+    for index, result in enumerate(turn.results):
+        render_result(result, key=f"assistant_turn_{turn.id}_{index}")
+
+def render_turn(turn):
+    # Replays a finished turn from its stored snapshot; nothing is re-asked or re-run.
+    with st.chat_message("user"):
+        st.text(turn.question)
+    with st.chat_message("assistant"):
+        if turn.answer:
+            st.markdown(turn.answer)
+        for notice in turn.notices:
+            st.warning(notice)
+        for error in turn.errors:
+            st.error(error)
+        render_turn_results(turn)
 
 # ========== Streamlit UI ==========
 st.markdown('<div class="custom-form-wrapper">', unsafe_allow_html=True)
 
-with st.form("llm_roaster_form", clear_on_submit=True):
-    st.markdown("<h3 style='text-align: center; color: white;'>Ask About Roasting or Coffee</h3>", unsafe_allow_html=True)
+@st.fragment
+def assistant_form():
+    # Asking a question reruns only this fragment; the styling and logo
+    # above are left alone.
+    with timed("assistant.fragment_run"):
+        render_assistant_form()
 
-    question = st.text_area(
-        "What would you like to know?",
-        height=150,
-        placeholder="e.g. What goes well with an Ethiopian roast? OR Show me the latest batch from Coogee"
-    )
+def render_assistant_form():
+    history = get_history()
+    with span("assistant.render_history", turns=len(history.turns)):
+        for turn in history.turns:
+            render_turn(turn)
+    live_turn = st.container()
 
-    submitted = st.form_submit_button("Ask")
+    with st.form("llm_roaster_form", clear_on_submit=True):
+        st.markdown("<h3 style='text-align: center; color: white;'>Ask About Roasting or Coffee</h3>", unsafe_allow_html=True)
 
-    if submitted:
-        if not question.strip():
-            st.warning("⚠️ Please enter a question.")
-        else:
-            with st.spinner("🧠 Thinking..."):
-                response = ask_llm(question)
-
-            # Check if LLM response is SQL
-            if re.match(r"(?i)^(SELECT|WITH|INSERT|UPDATE|DELETE)", response.strip()):
-                with st.spinner("Running SQL..."):
-                    conn = connect_to_snowflake()
-                    if conn:
-                        df = run_query(response, conn)
-                        if df is not None:
-                            st.code(response, language="sql")
-                            if not df.empty:
-                                st.dataframe(df, use_container_width=True)
+        question = st.text_area(
+            "What would you like to know?",
+            height=150,
+            placeholder="e.g. What goes well with an Ethiopian roast? OR Show me the latest batch from Coogee"
+        )
+
+        submitted = st.form_submit_button("Ask")
+
+        if submitted:
+            if not question.strip():
+                st.warning("⚠️ Please enter a question.")
             else:
-                st.success("Answer from your coffee assistant:")
-                st.markdown(response)
+                with live_turn:
+                    answer_question(question)
+
+def answer_question(question):
+    cancel_pending_jobs()
+    turn = Turn(question)
+    with st.chat_message("user"):
+        st.text(question)
+    with st.chat_message("assistant"), timed("assistant.total"):
+        # Common question shapes skip the LLM entirely.
+        match = get_intent_router().route(question)
+        if match is not None:
+            statements = [(match.sql, match.params)]
+        else:
+            statements = ask_for_sql(question, turn)
+        if statements:
+            run_statements(statements, turn)
+        get_history().add(turn)
+        render_turn_results(turn)
+
+def ask_for_sql(question, turn):
+    # Snowflake is warmed in the background while the model is still answering.
+    get_query_pipeline().warm_up()
+    queued = get_limiter("mistral").waiting
+    if queued:
+        st.caption(f"{queued} question(s) ahead of you in the Mistral queue.")
+    try:
+        with timed("assistant.llm"), st.spinner("🧠 Thinking..."):
+            answer = ask_llm(question)
+            is_sql, chunks = split_sql_stream(answer)
+            # SQL is buffered whole before it runs; prose streams to the page.
+            response = "".join(chunks).strip() if is_sql else None
+        show_llm_waits(answer)
+        if not is_sql:
+            st.success("Answer from your coffee assistant:")
+            with timed("assistant.llm_prose"):
+                turn.answer = st.write_stream(chunks)
+            return None
+    except AdmissionTimeout as e:
+        report_notice(turn, f"{e} Please ask again in a moment.")
+        return None
+    except Exception as e:
+        report_error(turn, f"Mistral API error: {e}")
+        return None
+
+    with timed("assistant.guard"):
+        try:
+            settings = guard_settings()
+            pieces = split_statements(response, pipeline_settings()["max_statements"])
+            return [
+                (guard_sql(piece, settings["max_rows"], settings["database"], settings["schema"]), None)
+                for piece in pieces
+            ]
+        except SQLGuardError as e:
+            report_error(turn, f"Query blocked: {e}")
+            st.code(response, language="sql")
+            return None
+
+assistant_form()
 
 st.markdown('</div>', unsafe_allow_html=True)
@@ -0,0 +1,71 @@
+import streamlit as st
+from datetime import date, timedelta
+
+from cloud_roasters.assets import inject_styles, render_logo
+from cloud_roasters.rollups import GROUPINGS, ROLLUP_METRICS, load_summary
+from cloud_roasters.schema import ensure_schema
+
+# ========== Page Setup ==========
+st.set_page_config(
+    page_title="Cloud Roasters | Dashboard",
+    page_icon="☁️",
+    layout="centered",
+    initial_sidebar_state="collapsed"
+)
+
+inject_styles()
+render_logo()
+
+METRIC_LABELS = {
+    "WEIGHT_LOSS": "Weight Loss (%)",
+    "ROAST_DURATION_MINS": "Roast Duration (minutes)",
+    "DEVELOPMENT_TIME_MINS": "Development Time (minutes)",
+    "MOISTURE_CONTENT": "Moisture Content (%)",
+}
+
+# ========== Dashboard ==========
+# Reads only the daily rollups, so each view costs the same however many
+# batches have been recorded.
+@st.fragment
+def dashboard():
+    st.markdown("<h3 style='text-align: center;'>Roasting Dashboard</h3>", unsafe_allow_html=True)
+
+    grouping_col, metric_col = st.columns(2)
+    grouping = grouping_col.selectbox("Group by:", list(GROUPINGS), key="dashboard_grouping")
+    metric = metric_col.selectbox(
+        "Metric:", ROLLUP_METRICS, format_func=METRIC_LABELS.get, key="dashboard_metric"
+    )
+    today = date.today()
+    dates = st.date_input(
+        "Roast dates:", value=(today - timedelta(days=90), today), key="dashboard_dates"
+    )
+    if len(dates) != 2:
+        st.info("Pick an end date to see the summary.")
+        return
+    start, end = dates
+
+    try:
+        summary = load_summary(grouping, metric, start, end)
+    except Exception as exp:
+        st.error(f"Could not load roasting rollups: {exp}")
+        return
+
+    if summary.empty:
+        st.info("No batches recorded for these dates.")
+        return
+
+    labels = summary.columns[: len(GROUPINGS[grouping])]
+    summary["GROUP"] = summary[list(labels)].astype(str).agg(" / ".join, axis=1)
+    st.bar_chart(summary.set_index("GROUP")["MEAN"], y_label=f"Mean {METRIC_LABELS[metric]}")
+    st.dataframe(
+        summary.drop(columns="GROUP"),
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "MEAN": st.column_config.NumberColumn("Mean", format="%.2f"),
+            "STDDEV": st.column_config.NumberColumn("Std Dev", format="%.2f"),
+        },
+    )
+
+ensure_schema()
+dashboard()
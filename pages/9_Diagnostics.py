@@ -0,0 +1,153 @@
+import streamlit as st
+from datetime import datetime
+
+import pandas as pd
+
+from cloud_roasters.assets import inject_styles
+from cloud_roasters.metrics import component_stats, llm_usage_summary
+from cloud_roasters.tracing import (
+    EXPORTERS,
+    export,
+    histograms,
+    is_enabled,
+    otlp_json,
+    prometheus_text,
+    set_enabled,
+    slowest_reruns,
+    span_summary,
+)
+
+# ========== Page Setup ==========
+# Not linked from Home and hidden from the sidebar (see base.css); open it at
+# /Diagnostics. With a [diagnostics] token secret it also needs ?token=...
+st.set_page_config(
+    page_title="Cloud Roasters | Diagnostics",
+    page_icon="☁️",
+    layout="wide",
+    initial_sidebar_state="collapsed"
+)
+
+inject_styles()
+
+token = st.secrets.get("diagnostics", {}).get("token")
+if token and st.query_params.get("token") != token:
+    st.error("Page not found.")
+    st.stop()
+
+def bucket_labels(bounds):
+    return [f"≤ {bound:g} ms" for bound in bounds] + [f"> {bounds[-1]:g} ms"]
+
+def format_attrs(attrs):
+    return ", ".join(f"{key}={value}" for key, value in attrs.items())
+
+def stat_rows(component, stats, prefix=""):
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            yield from stat_rows(component, value, f"{prefix}{key}.")
+        else:
+            yield {"component": component, "stat": f"{prefix}{key}", "value": "" if value is None else str(value)}
+
+# ========== Tracing ==========
+st.markdown("<h3>Diagnostics</h3>", unsafe_allow_html=True)
+
+# Tracing is switched for the whole process, so only a visitor who passed the
+# token check may change it.
+enabled = st.toggle("Tracing enabled", value=is_enabled(), key="diagnostics_tracing", disabled=not token)
+if not token:
+    st.caption("Set a `[diagnostics] token` secret to switch tracing on or off from here.")
+elif enabled != is_enabled():
+    set_enabled(enabled)
+st.button("Refresh", key="diagnostics_refresh")
+
+# ========== Components ==========
+# Hit rates and staleness of the caches, router, mirror, limiters and pool
+# created so far in this process.
+st.markdown("<h4>Components</h4>", unsafe_allow_html=True)
+components = component_stats()
+if components:
+    st.dataframe(
+        pd.DataFrame([row for name, stats in components.items() for row in stat_rows(name, stats)]),
+        use_container_width=True,
+        hide_index=True,
+    )
+else:
+    st.caption("No components have been used in this process yet.")
+
+summary = span_summary()
+if not summary:
+    st.info("No spans recorded yet. Use the other pages, then refresh.")
+    st.stop()
+
+st.dataframe(pd.DataFrame.from_dict(summary, orient="index").rename_axis("span"), use_container_width=True)
+
+# ========== Latency Histograms ==========
+st.markdown("<h4>Latency histogram</h4>", unsafe_allow_html=True)
+lifetime = histograms()
+name = st.selectbox("Span:", sorted(lifetime), key="diagnostics_span")
+bounds, counts, count, total_ms = lifetime[name]
+st.bar_chart(pd.Series(counts, index=pd.CategoricalIndex(bucket_labels(bounds), ordered=True), name="spans"))
+st.caption(f"{count} span(s) since the server started, {total_ms / max(count, 1):.1f} ms on average.")
+
+# ========== Slowest Reruns ==========
+st.markdown("<h4>Slowest recent reruns</h4>", unsafe_allow_html=True)
+reruns = slowest_reruns(limit=10)
+if not reruns:
+    st.info("No complete reruns recorded yet. Use the other pages, then refresh.")
+else:
+    st.dataframe(
+        pd.DataFrame([
+            {
+                "started": datetime.fromtimestamp(root.start_ns / 1e9).strftime("%H:%M:%S"),
+                "span": root.name,
+                "duration_ms": round(root.duration_ms, 1),
+                "spans": len(children),
+                "error": root.error or "",
+                "sizes": format_attrs(root.attrs),
+            }
+            for root, children in reruns
+        ]),
+        use_container_width=True,
+    )
+    picked = st.selectbox(
+        "Break down:",
+        range(len(reruns)),
+        format_func=lambda index: f"{reruns[index][0].name} ({reruns[index][0].duration_ms:.0f} ms)",
+        key="diagnostics_rerun",
+    )
+    root, children = reruns[picked]
+    if children:
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    "offset_ms": round((child.start_ns - root.start_ns) / 1e6, 1),
+                    "span": child.name,
+                    "duration_ms": round(child.duration_ms, 1),
+                    "error": child.error or "",
+                    "sizes": format_attrs(child.attrs),
+                }
+                for child in children
+            ]),
+            use_container_width=True,
+        )
+    else:
+        st.caption("No nested spans were recorded for this rerun.")
+
+# ========== LLM Usage ==========
+usage = llm_usage_summary()
+if usage:
+    st.markdown("<h4>LLM usage</h4>", unsafe_allow_html=True)
+    st.json(usage)
+
+# ========== Export ==========
+st.markdown("<h4>Export</h4>", unsafe_allow_html=True)
+fmt = st.radio("Format:", list(EXPORTERS), horizontal=True, key="diagnostics_format",
+               format_func={"prometheus": "Prometheus text", "otlp": "OpenTelemetry JSON"}.get)
+file_col, download_col = st.columns(2)
+if file_col.button("Write to file", key="diagnostics_export"):
+    st.success(f"Wrote {export(fmt)}")
+download_col.download_button(
+    "Download",
+    data=prometheus_text() if fmt == "prometheus" else otlp_json(),
+    file_name=f"cloud-roasters-traces.{EXPORTERS[fmt][1]}",
+    key="diagnostics_download",
+)
@@ -0,0 +1,224 @@
+"""Persisted model and lazily computed SHAP values for the explainer app.
+
+The booster is trained once per data/parameter digest and saved under
+``EXPLAINER_CACHE_DIR``, so a fresh process loads it from disk instead of
+retraining. SHAP values come from XGBoost's built-in TreeSHAP
+(``pred_contribs``, the same exact values ``shap.TreeExplainer`` produces)
+and are computed only for what a view needs: single rows on demand and a
+seeded sample for the summary plots, which is saved to disk as well.
+Heavy plots are built on one background worker (pyplot is not thread-safe)
+and saved per view: matplotlib plots as PNG files, multi-row force plots as
+HTML. Turning a view back on, or opening it in a new process, is then instant:
+saved plots are returned without queueing behind the worker, and only plots
+still being built are tracked in memory.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shap
+import streamlit as st
+import xgboost
+from sklearn.model_selection import train_test_split
+
+CACHE_DIR = Path(os.environ.get("EXPLAINER_CACHE_DIR", ".explainer_cache"))
+NUM_ROUNDS = 10
+SPLIT_SEED = 7
+SAMPLE_SEED = 0
+PARAMS = {
+    "eta": 0.01,
+    "objective": "binary:logistic",
+    "subsample": 0.5,
+    "eval_metric": "logloss",
+    "n_jobs": -1,
+}
+
+
+def data_digest(X, y):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pd.util.hash_pandas_object(X, index=True).values.tobytes())
+    digest.update(np.ascontiguousarray(y).tobytes())
+    settings = {"params": PARAMS, "rounds": NUM_ROUNDS, "split_seed": SPLIT_SEED, "xgboost": xgboost.__version__}
+    digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _atomic_write(path, write):
+    # Readers in other processes never see a half-written file. The temporary
+    # name keeps the suffix, since xgboost and numpy pick formats from it.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{os.getpid()}-{threading.get_ident()}-{path.name}")
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def train_booster(X, y):
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=SPLIT_SEED)
+    d_train = xgboost.DMatrix(X_train, label=y_train)
+    d_test = xgboost.DMatrix(X_test, label=y_test)
+    params = {**PARAMS, "base_score": np.mean(y_train)}
+    return xgboost.train(params, d_train, NUM_ROUNDS, evals=[(d_test, "test")], verbose_eval=100, early_stopping_rounds=20)
+
+
+def load_or_train(digest, X, y):
+    path = CACHE_DIR / f"booster-{digest}.ubj"
+    if path.exists():
+        booster = xgboost.Booster()
+        booster.load_model(path)
+        return booster
+    booster = train_booster(X, y)
+    _atomic_write(path, booster.save_model)
+    return booster
+
+
+def contributions(booster, X):
+    # The last column is the bias term, i.e. the explainer's expected value.
+    contribs = booster.predict(xgboost.DMatrix(X), pred_contribs=True)
+    return contribs[:, :-1], float(contribs[0, -1])
+
+
+def sample_indices(n_rows, size, seed=SAMPLE_SEED):
+    if size >= n_rows:
+        return np.arange(n_rows)
+    return np.sort(np.random.default_rng(seed).choice(n_rows, size, replace=False))
+
+
+def sample_shap(digest, booster, X, size):
+    path = CACHE_DIR / f"shap-{digest}-{size}-{SAMPLE_SEED}.npz"
+    if path.exists():
+        with np.load(path) as saved:
+            return saved["indices"], saved["values"], float(saved["base"])
+    indices = sample_indices(len(X), size)
+    values, base = contributions(booster, X.iloc[indices])
+    _atomic_write(path, lambda tmp: np.savez(tmp, indices=indices, values=values, base=base))
+    return indices, values, base
+
+
+class PlotRenderer:
+    def __init__(self, directory=CACHE_DIR / "plots"):
+        self.directory = directory
+        self._futures = {}
+        # Reentrant: a job that finishes before submit() returns is forgotten
+        # from inside submit().
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="shap-plots")
+
+    def submit(self, key, build):
+        # ``build()`` runs once per key on the worker and must not call
+        # Streamlit; the returned future resolves to its result. The worker
+        # runs jobs in order, so submit what is on screen before prefetches.
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None:
+                future = self._futures[key] = self._executor.submit(build)
+                future.add_done_callback(partial(self._forget, key))
+            return future
+
+    def image(self, key, draw):
+        # ``draw()`` builds a pyplot figure; the future resolves to a PNG path.
+        path = self.directory / f"{key}.png"
+        if path.exists():
+            return _resolved(path)
+        return self.submit(key, partial(self._render_png, key, draw))
+
+    def html(self, key, build):
+        path = self.directory / f"{key}.html"
+        if path.exists():
+            return _resolved(path.read_text(encoding="utf-8"))
+        return self.submit(key, partial(self._render_html, key, build))
+
+    def _forget(self, key, future):
+        # Finished plots are on disk (or failed and should be retried), so
+        # only in-flight futures are kept.
+        with self._lock:
+            if self._futures.get(key) is future:
+                del self._futures[key]
+
+    def _render_png(self, key, draw):
+        import matplotlib.pyplot as plt
+
+        path = self.directory / f"{key}.png"
+        if path.exists():
+            return path
+        try:
+            draw()
+            figure = plt.gcf()
+            _atomic_write(path, lambda tmp: figure.savefig(tmp, format="png", bbox_inches="tight", dpi=110))
+            return path
+        finally:
+            plt.close("all")
+
+    def _render_html(self, key, build):
+        path = self.directory / f"{key}.html"
+        if not path.exists():
+            html = build()
+            _atomic_write(path, lambda tmp: tmp.write_text(html, encoding="utf-8"))
+            return html
+        return path.read_text(encoding="utf-8")
+
+
+def _resolved(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def waterfall(values, base, row):
+    shap.plots.waterfall(shap.Explanation(values=values, base_values=base, data=row), show=False)
+
+
+def beeswarm(values, base, data):
+    shap.plots.beeswarm(shap.Explanation(values=values, base_values=base, data=data), show=False)
+
+
+def force_plot_html(base, values, data, height, width):
+    # The page streamlit_shap.st_shap() builds for JS plots. Building the
+    # plot is the slow part for many rows, so it is done once per view.
+    plot = shap.force_plot(base, values, data)
+    shap_js = shap.getjs().replace("height=350", f"height={height}").replace("width=100", f"width={width}")
+    return f"<head>{shap_js}</head><body>{plot.html()}</body>"
+
+
+# ========== Streamlit ==========
+# Large objects are passed as underscore arguments so Streamlit does not hash
+# them on every rerun; the data digest is the cache key.
+@st.cache_data(show_spinner="Loading data...")
+def load_data():
+    X, y = shap.datasets.adult()
+    return X, y, data_digest(X, y)
+
+
+@st.cache_data(show_spinner=False)
+def load_display_data():
+    return shap.datasets.adult(display=True)[0]
+
+
+@st.cache_resource(show_spinner="Loading model...")
+def get_booster(digest, _X, _y):
+    return load_or_train(digest, _X, _y)
+
+
+@st.cache_data(max_entries=8, show_spinner="Computing SHAP values...")
+def get_sample_shap(digest, size, _booster, _X):
+    return sample_shap(digest, _booster, _X, size)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def get_row_shap(digest, row, _booster, _X):
+    values, base = contributions(_booster, _X.iloc[[row]])
+    return values[0], base
+
+
+@st.cache_resource
+def get_plot_renderer():
+    return PlotRenderer()
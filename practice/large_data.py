@@ -0,0 +1,130 @@
+"""Rendering large frames and series without sending them to the browser.
+
+Frames stay on the server: the viewer sorts them there (the sort order is
+cached per frame and column) and sends only the visible page, so websocket
+payloads and browser memory depend on the page size, not the row count.
+Chart series are downsampled with Largest-Triangle-Three-Buckets (LTTB) to
+about one point per pixel of chart width, which keeps peaks and troughs
+that plain striding would drop. Downsampled views are cached per frame key
+and width.
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+PAGE_ROWS = 100
+CHART_WIDTH_PX = 1000
+
+
+def lttb_indices(x, y, threshold):
+    # Positions of the ``threshold`` points LTTB keeps. The first and last
+    # points are always kept; every bucket in between contributes the point
+    # forming the largest triangle with the previously kept point and the
+    # mean of the next bucket.
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    mean_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 1 < len(counts):
+            next_x, next_y = mean_x[bucket + 1], mean_y[bucket + 1]
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+        px, py = x[previous], y[previous]
+        area = np.abs((px - next_x) * (y[start:end] - py) - (px - x[start:end]) * (next_y - py))
+        previous = start + int(area.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+
+def _numeric_axis(values):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return np.asarray(values, dtype="datetime64[ns]").astype(np.int64).astype(np.float64)
+    if pd.api.types.is_numeric_dtype(values):
+        return np.asarray(values, dtype=np.float64)
+    return np.arange(len(values), dtype=np.float64)
+
+
+def downsample(df, columns, x=None, width_px=CHART_WIDTH_PX):
+    # Each series is reduced on its own and the kept rows are merged, so the
+    # result has at most ``width_px`` rows per series.
+    keep_columns = ([x] if x is not None else []) + list(columns)
+    if len(df) <= width_px:
+        return df[keep_columns]
+    xs = _numeric_axis(df[x] if x is not None else df.index)
+    order = None
+    if not np.all(xs[1:] >= xs[:-1]):
+        order = np.argsort(xs, kind="stable")
+        xs = xs[order]
+    kept = []
+    for column in columns:
+        ys = np.asarray(df[column], dtype=np.float64)
+        if order is not None:
+            ys = ys[order]
+        valid = np.flatnonzero(np.isfinite(ys))
+        kept.append(valid[lttb_indices(xs[valid], ys[valid], width_px)])
+    positions = np.unique(np.concatenate(kept))
+    if order is not None:
+        positions = order[positions]
+    return df.iloc[positions][keep_columns]
+
+
+def sort_positions(df, column, descending):
+    series = df[column].reset_index(drop=True)
+    return series.sort_values(ascending=not descending, kind="stable", na_position="last").index.to_numpy()
+
+
+# ========== Streamlit ==========
+# Frames are passed as underscore arguments so Streamlit does not hash them
+# on every rerun; callers name each frame with a key that changes whenever
+# its contents do (a content digest, or a fixed name for generated data).
+@st.cache_resource(max_entries=16, show_spinner="Sorting...")
+def cached_sort_positions(frame_key, column, descending, _df):
+    return sort_positions(_df, column, descending)
+
+
+@st.cache_data(max_entries=32, show_spinner="Downsampling...")
+def cached_downsample(frame_key, columns, x, width_px, _df):
+    return downsample(_df, columns, x, width_px)
+
+
+def render_frame_viewer(df, key, frame_key=None, page_rows=PAGE_ROWS):
+    # Without a frame_key (data that changes every run) nothing is cached.
+    sort_col, order_col, page_col = st.columns([2, 1, 1])
+    column = sort_col.selectbox(
+        "Sort by", [None, *df.columns], key=f"{key}_sort",
+        format_func=lambda value: "Original order" if value is None else str(value),
+    )
+    descending = order_col.toggle("Descending", key=f"{key}_descending", disabled=column is None)
+    pages = max(1, -(-len(df) // page_rows))
+    page = page_col.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1, key=f"{key}_page")
+
+    start = (page - 1) * page_rows
+    end = min(start + page_rows, len(df))
+    if column is None:
+        window = df.iloc[start:end]
+    elif frame_key is None:
+        window = df.iloc[sort_positions(df, column, descending)[start:end]]
+    else:
+        window = df.iloc[cached_sort_positions(frame_key, column, descending, df)[start:end]]
+    st.dataframe(window, use_container_width=True)
+    st.caption(f"Rows {start + 1:,}–{end:,} of {len(df):,}.")
+
+
+def render_chart(df, frame_key=None, columns=None, x=None, width_px=CHART_WIDTH_PX, chart=st.line_chart, **chart_args):
+    columns = tuple(columns if columns is not None else [c for c in df.columns if c != x])
+    if frame_key is None:
+        view = downsample(df, columns, x, width_px)
+    else:
+        view = cached_downsample(frame_key, columns, x, width_px, df)
+    chart(view, x=x, **chart_args)
+    if len(view) < len(df):
+        st.caption(f"Showing {len(view):,} of {len(df):,} points (LTTB to a {width_px:,}px budget).")
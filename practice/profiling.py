@@ -0,0 +1,245 @@
+"""Streaming CSV profiling for the upload explorer.
+
+Files are parsed with pyarrow's streaming CSV reader one block at a time, so
+memory stays flat no matter how large the file is. Describe-style statistics
+are accumulated per block: exact count/mean/std/min/max (Chan's parallel
+update) and quantiles from a fixed-size reservoir sample, which are exact
+until the column has more values than the reservoir holds. Profiles are
+cached by content hash for uploads and by path, size and mtime for files on
+the server, so unrelated widget reruns never re-read the data.
+"""
+
+import hashlib
+import io
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import streamlit as st
+
+BLOCK_SIZE = 16 * 1024 * 1024
+PREVIEW_ROWS = 1000
+RESERVOIR_SIZE = 20_000
+FULL_LOAD_BYTES = 200 * 1024 * 1024
+CATEGORY_RATIO = 0.5
+DESCRIBE_INDEX = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+# Server-side files may only be read from under this directory; without it,
+# only uploads can be profiled.
+DATA_ROOT = Path(os.environ["PROFILE_DATA_DIR"]).resolve() if os.environ.get("PROFILE_DATA_DIR") else None
+SERVER_SUFFIXES = (".csv",)
+
+
+def file_digest(data):
+    digest = hashlib.blake2b(digest_size=20)
+    view = memoryview(data)
+    for start in range(0, len(view), 8 * 1024 * 1024):
+        digest.update(view[start:start + 8 * 1024 * 1024])
+    return digest.hexdigest()
+
+
+def resolve_server_path(raw):
+    if DATA_ROOT is None:
+        raise ValueError("Profiling files on the server is disabled; set PROFILE_DATA_DIR to enable it.")
+    path = (DATA_ROOT / raw).resolve()
+    if DATA_ROOT not in path.parents:
+        raise ValueError(f"Only files under {DATA_ROOT} can be profiled.")
+    # Dot-files and dot-directories hold secrets and config, not data.
+    if any(part.startswith(".") for part in path.relative_to(DATA_ROOT).parts):
+        raise ValueError("Hidden files and directories cannot be profiled.")
+    if path.suffix.lower() not in SERVER_SUFFIXES:
+        raise ValueError(f"Only {', '.join(SERVER_SUFFIXES)} files can be profiled.")
+    if not path.is_file():
+        raise ValueError(f"{path} is not a file.")
+    return path
+
+
+def compact_dtypes(df):
+    # Smallest integer types, and categories for repetitive text columns.
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_integer_dtype(series):
+            df[column] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series):
+            # Integer columns are read as floats (see _widened_schema).
+            if series.notna().all() and (series % 1 == 0).all():
+                df[column] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if len(series) and series.nunique(dropna=True) <= len(series) * CATEGORY_RATIO:
+                df[column] = series.astype("category")
+    return df
+
+
+def _widened_schema(open_source, block_size):
+    # The streaming reader fixes types from the first block. Integers are
+    # widened to floats so a later decimal fits, and untyped columns to text;
+    # read_blocks() switches any other column that meets a value it can't
+    # hold to text. Returns the column names in file order and the types.
+    reader = pacsv.open_csv(open_source(), read_options=pacsv.ReadOptions(block_size=block_size))
+    schema = reader.schema
+    reader.close()
+    types = {}
+    for field in schema:
+        if pa.types.is_integer(field.type):
+            types[field.name] = pa.float64()
+        elif pa.types.is_null(field.type):
+            types[field.name] = pa.string()
+    return schema.names, types
+
+
+def _blocks(open_source, block_size, column_types):
+    reader = pacsv.open_csv(
+        open_source(),
+        read_options=pacsv.ReadOptions(block_size=block_size),
+        convert_options=pacsv.ConvertOptions(column_types=column_types),
+    )
+    for batch in reader:
+        yield batch
+
+
+def read_blocks(open_source, consume, block_size=BLOCK_SIZE):
+    """Return ``consume(batches)`` over the file's record batches.
+
+    A column that meets a value its inferred type can't hold in a later
+    block (``"n/a"`` after a million numbers, a stray word in a date column)
+    is switched to text and ``consume`` runs again from the first block, so
+    callers must not keep state between calls.
+    """
+    names, column_types = _widened_schema(open_source, block_size)
+    while True:
+        try:
+            return consume(_blocks(open_source, block_size, column_types))
+        except pa.ArrowInvalid as exp:
+            match = re.search(r"CSV column #(\d+)", str(exp))
+            name = names[int(match.group(1))] if match and int(match.group(1)) < len(names) else None
+            if name is None or column_types.get(name) == pa.string():
+                raise
+            column_types[name] = pa.string()
+
+
+class StreamingColumnStats:
+    def __init__(self, reservoir_size=RESERVOIR_SIZE, seed=0):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+        self.seen = 0
+        self.reservoir = np.empty(reservoir_size)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = values[np.isfinite(values)]
+        n = len(values)
+        if not n:
+            return
+        batch_mean = values.mean()
+        batch_m2 = ((values - batch_mean) ** 2).sum()
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += batch_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        self.minimum = min(self.minimum, values.min())
+        self.maximum = max(self.maximum, values.max())
+        self._sample(values)
+
+    def _sample(self, values):
+        # Algorithm R, vectorized over the block: value t (1-based overall)
+        # replaces a random slot with probability size / t.
+        size = len(self.reservoir)
+        fill = min(max(size - self.seen, 0), len(values))
+        if fill:
+            self.reservoir[self.seen:self.seen + fill] = values[:fill]
+        rest = values[fill:]
+        if len(rest):
+            positions = np.arange(self.seen + fill + 1, self.seen + len(values) + 1)
+            slots = (self._rng.random(len(rest)) * positions).astype(np.int64)
+            keep = slots < size
+            self.reservoir[slots[keep]] = rest[keep]
+        self.seen += len(values)
+
+    @property
+    def approximate(self):
+        return self.seen > len(self.reservoir)
+
+    def describe(self):
+        if not self.count:
+            return [0.0] + [np.nan] * 7
+        sample = self.reservoir[:min(self.seen, len(self.reservoir))]
+        q25, q50, q75 = np.quantile(sample, [0.25, 0.5, 0.75])
+        std = np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan
+        return [float(self.count), self.mean, std, self.minimum, q25, q50, q75, self.maximum]
+
+
+def profile_csv(open_source, preview_rows=PREVIEW_ROWS, reservoir_size=RESERVOIR_SIZE, block_size=BLOCK_SIZE):
+    return read_blocks(open_source, lambda batches: _profile(batches, preview_rows, reservoir_size), block_size)
+
+
+def _profile(batches, preview_rows, reservoir_size):
+    stats = {}
+    previews = []
+    preview_count = 0
+    rows = 0
+    schema = None
+    for batch in batches:
+        schema = batch.schema
+        rows += batch.num_rows
+        if preview_count < preview_rows:
+            head = batch.slice(0, preview_rows - preview_count)
+            previews.append(head)
+            preview_count += head.num_rows
+        for field, column in zip(batch.schema, batch.columns):
+            if not (pa.types.is_integer(field.type) or pa.types.is_floating(field.type)):
+                continue
+            column_stats = stats.setdefault(field.name, StreamingColumnStats(reservoir_size))
+            column_stats.update(column.to_numpy(zero_copy_only=False).astype(np.float64))
+
+    if schema is None:
+        return {"rows": 0, "preview": pd.DataFrame(), "describe": pd.DataFrame(), "approximate": False, "types": {}}
+    preview = compact_dtypes(pa.Table.from_batches(previews, schema=schema).to_pandas())
+    describe = pd.DataFrame({name: column.describe() for name, column in stats.items()}, index=DESCRIBE_INDEX)
+    return {
+        "rows": rows,
+        "preview": preview,
+        "describe": describe,
+        "approximate": any(column.approximate for column in stats.values()),
+        "types": {field.name: str(field.type) for field in schema},
+    }
+
+
+def load_csv(open_source, block_size=BLOCK_SIZE):
+    batches = read_blocks(open_source, list, block_size)
+    if not batches:
+        return pd.DataFrame()
+    return compact_dtypes(pa.Table.from_batches(batches).to_pandas())
+
+
+# ========== Streamlit ==========
+# Raw bytes are passed as underscore arguments so Streamlit does not hash them
+# on every rerun; the digest (or path, size and mtime) is the cache key.
+def upload_digest(uploaded_file):
+    # Hashing a large upload is not free either, so it is done once per
+    # uploaded file (Streamlit gives each upload a new file_id), not per rerun.
+    cached = st.session_state.get("upload_digest")
+    if cached is None or cached[0] != uploaded_file.file_id:
+        cached = st.session_state.upload_digest = (uploaded_file.file_id, file_digest(uploaded_file.getvalue()))
+    return cached[1]
+
+
+@st.cache_data(max_entries=8, show_spinner="Profiling upload...")
+def profile_upload(digest, _data):
+    return profile_csv(lambda: io.BytesIO(_data))
+
+
+@st.cache_data(max_entries=2, show_spinner="Loading upload...")
+def load_upload(digest, _data):
+    return load_csv(lambda: io.BytesIO(_data))
+
+
+@st.cache_data(max_entries=8, show_spinner="Profiling file...")
+def profile_path(path, size, mtime_ns):
+    return profile_csv(lambda: pa.OSFile(path))
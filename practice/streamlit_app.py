@@ -3,21 +3,55 @@ import pandas as pd
 import numpy as np
 from time import time
 
+from large_data import render_chart, render_frame_viewer
+from profiling import (
+    DATA_ROOT, FULL_LOAD_BYTES, RESERVOIR_SIZE, load_upload, profile_path, profile_upload, resolve_server_path,
+    upload_digest,
+)
+
 st.title("First test Streamlit Application!")
 
 st.subheader('Input CSV')
 uploaded_file = st.file_uploader("Choose a file")
+server_path = None
+if DATA_ROOT is not None:
+    server_path = st.text_input(
+        "Or profile a CSV already on the server",
+        placeholder="exports/roaster_telemetry.csv",
+        help="For multi-GB exports: the file is streamed from disk in blocks instead of uploaded.",
+    )
 
 with st.expander('About this app'):
     st.write('You can now display the progress of your calculations in a Streamlit app with the `st.progress` command.')
 
+# Profiles are cached by content, so the widgets below don't re-read the file.
+profile, df = None, None
 if uploaded_file is not None:
-    df = pd.read_csv(uploaded_file)
+    data = uploaded_file.getvalue()
+    digest = upload_digest(uploaded_file)
+    profile = profile_upload(digest, data)
+    if len(data) <= FULL_LOAD_BYTES:
+        df = load_upload(digest, data)
+elif server_path:
+    try:
+        path = resolve_server_path(server_path)
+        stat = path.stat()
+        profile = profile_path(str(path), stat.st_size, stat.st_mtime_ns)
+    except ValueError as exp:
+        st.error(str(exp))
+
+if profile is not None:
     st.subheader('DataFrame')
-    st.write(df)
+    if df is not None:
+        render_frame_viewer(df, key=f"upload_{digest[:12]}", frame_key=digest)
+    else:
+        st.write(profile["preview"])
+        st.caption(f"First {len(profile['preview']):,} of {profile['rows']:,} rows.")
     st.subheader('Descriptive Statistics')
-    st.write(df.describe())
-else:
+    st.write(profile["describe"])
+    if profile["approximate"]:
+        st.caption(f"Quartiles are estimated from a {RESERVOIR_SIZE:,}-value sample per column; other statistics are exact.")
+elif not server_path:
     st.info('☝️ Upload a CSV file')
 
 with st.sidebar:
@@ -90,7 +124,11 @@ def load_data_a():
     )
     return df
 
-st.write(load_data_a())
+# Only one page of the 2,000,000 rows goes to the browser, and the chart is
+# downsampled to the chart's width.
+data_a = load_data_a()
+render_frame_viewer(data_a, key="data_a", frame_key="data_a")
+render_chart(data_a, frame_key="data_a", columns=["a", "b"])
 a1 = time()
 st.info(a1-a0)
 
@@ -105,6 +143,6 @@ def load_data_b():
     )
     return df
 
-st.write(load_data_b())
+render_frame_viewer(load_data_b(), key="data_b")
 b1 = time()
 st.info(b1-b0)
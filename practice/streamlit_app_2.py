@@ -1,33 +1,25 @@
 import streamlit as st
+import streamlit.components.v1 as components
 from streamlit_shap import st_shap
 import shap
-from sklearn.model_selection import train_test_split
-import xgboost
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
+from functools import partial
+
+from explainer import (
+    beeswarm,
+    force_plot_html,
+    get_booster,
+    get_plot_renderer,
+    get_row_shap,
+    get_sample_shap,
+    load_data,
+    load_display_data,
+    waterfall,
+)
 
 st.set_page_config(layout="wide")
 
-@st.cache_data
-def load_data():
-    return shap.datasets.adult()
-
-@st.cache_resource
-def load_model(X, y):
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=7)
-    d_train = xgboost.DMatrix(X_train, label=y_train)
-    d_test = xgboost.DMatrix(X_test, label=y_test)
-    params = {
-        "eta": 0.01,
-        "objective": "binary:logistic",
-        "subsample": 0.5,
-        "base_score": np.mean(y_train),
-        "eval_metric": "logloss",
-        "n_jobs": -1,
-    }
-    model = xgboost.train(params, d_train, 10, evals=[(d_test, "test")], verbose_eval=100, early_stopping_rounds=20)
-    return model
+SAMPLE_SIZES = [250, 500, 1000, 2000, 5000]
+FORCE_PLOT_ROWS = 1000
 
 st.title("`streamlit-shap` for displaying SHAP plots in a Streamlit app")
 
@@ -35,39 +27,62 @@ with st.expander('About the app'):
     st.markdown('''[`streamlit-shap`](https://github.com/snehankekre/streamlit-shap) is a Streamlit component that provides a wrapper to display [SHAP](https://github.com/slundberg/shap) plots in [Streamlit](https://streamlit.io/).''')
 
 st.header('Input data')
-X, y = load_data()
-X_display, y_display = shap.datasets.adult(display=True)
+X, y, digest = load_data()
 
 with st.expander('About the data'):
     st.write('Adult census data is used as the example dataset.')
-with st.expander('X'):
+# Toggles rather than expanders: a collapsed expander still renders its
+# contents, a toggle that is off skips them entirely.
+if st.toggle('Show X'):
     st.dataframe(X)
-with st.expander('y'):
+if st.toggle('Show y'):
     st.dataframe(y)
 
 st.header('SHAP output')
 
-# Train XGBoost model
-model = load_model(X, y)
+# Loaded from disk after the first training run for this data and parameters.
+model = get_booster(digest, X, y)
+
+sample_size = st.sidebar.select_slider('SHAP sample size', SAMPLE_SIZES, value=1000)
+row = st.sidebar.number_input('Data instance', min_value=0, max_value=len(X) - 1, value=0)
+
+# Plots are rendered on one background worker in submission order, so the
+# visible waterfall goes first. The beeswarm is the slowest plot; it is queued
+# next, as soon as the sample is ready, whether or not it is shown yet.
+renderer = get_plot_renderer()
+show_waterfall = st.toggle('Waterfall plot', value=True)
+if show_waterfall:
+    row_values, row_base = get_row_shap(digest, row, model, X)
+    waterfall_plot = renderer.image(
+        f"waterfall-{digest}-{row}", partial(waterfall, row_values, row_base, X.iloc[row])
+    )
 
-# Compute SHAP values
-explainer = shap.TreeExplainer(model)
-shap_values = explainer.shap_values(X)
+indices, sample_values, base_value = get_sample_shap(digest, sample_size, model, X)
+sample = X.iloc[indices]
+beeswarm_plot = renderer.image(
+    f"beeswarm-{digest}-{sample_size}", partial(beeswarm, sample_values, base_value, sample)
+)
 
-# Initialize SHAP JavaScript for visualization
-shap.initjs()
+if show_waterfall:
+    with st.spinner('Rendering waterfall plot...'):
+        st.image(str(waterfall_plot.result()))
 
-with st.expander('Waterfall plot'):
-    st_shap(shap.plots.waterfall(shap.Explanation(values=shap_values[0], base_values=explainer.expected_value, data=X.iloc[0])), height=300)
+if st.toggle('Beeswarm plot'):
+    st.caption(f'{len(indices)} sampled instances.')
+    with st.spinner('Rendering beeswarm plot...'):
+        st.image(str(beeswarm_plot.result()))
 
-with st.expander('Beeswarm plot'):
-    st_shap(shap.plots.beeswarm(shap.Explanation(values=shap_values, base_values=explainer.expected_value, data=X)), height=300)
+if st.toggle('Force plot'):
+    X_display = load_display_data()
+    row_values, row_base = get_row_shap(digest, row, model, X)
+    st.subheader(f'Data instance {row}')
+    st_shap(shap.force_plot(row_base, row_values, X_display.iloc[row, :]), height=200, width=1000)
 
-with st.expander('Force plot'):
-    st.subheader('First data instance')
-    st_shap(shap.force_plot(explainer.expected_value, shap_values[0, :], X_display.iloc[0, :]), height=200, width=1000)
-    
-    st.subheader('First thousand data instances')
-    fig, ax = plt.subplots(figsize=(12, 4))
-    shap.force_plot(explainer.expected_value, shap_values[:1000, :], X_display.iloc[:1000, :], matplotlib=True, show=False)
-    st.pyplot(fig)
\ No newline at end of file
+    shown = indices[:FORCE_PLOT_ROWS]
+    st.subheader(f'{len(shown)} sampled data instances')
+    force_plot = renderer.html(
+        f"force-{digest}-{sample_size}",
+        partial(force_plot_html, base_value, sample_values[:FORCE_PLOT_ROWS, :], X_display.iloc[shown, :], 400, 1000),
+    )
+    with st.spinner('Rendering force plot...'):
+        components.html(force_plot.result(), height=400, width=1000)
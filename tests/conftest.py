@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Local state has to be redirected before cloud_roasters is imported.
+os.environ.setdefault("CLOUD_ROASTERS_DATA_DIR", tempfile.mkdtemp(prefix="cloud-roasters-tests-"))
+sys.path.insert(0, str(ROOT))
@@ -0,0 +1,48 @@
+import os
+import time
+
+import pandas as pd
+
+from cloud_roasters.history import ConversationHistory, ResultSnapshot, Turn, purge_stale_sessions
+from cloud_roasters.results import ResultPager
+
+DAY = 24 * 3600
+
+
+def spilled_history():
+    history = ConversationHistory("session-test", inline_bytes=0)
+    turn = Turn("Show me every batch")
+    pager = ResultPager.from_frame(pd.DataFrame({"BATCH_ID": range(50)}), page_rows=10)
+    turn.results.append(ResultSnapshot("SELECT 1", None, pager))
+    history.add(turn)
+    history.add(Turn("And the next question"))
+    return history, turn.results[0]
+
+
+def age(path, seconds):
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def test_touched_session_survives_purge():
+    history, result = spilled_history()
+    assert result.spilled
+    directory = result._path.parent
+    age(directory, 2 * DAY)
+    history.touch()
+    purge_stale_sessions(DAY)
+    assert directory.is_dir()
+    assert result.pager().page(0)["BATCH_ID"].tolist() == list(range(10))
+
+
+def test_purged_result_shows_as_expired():
+    history, result = spilled_history()
+    age(result._path.parent, 2 * DAY)
+    purge_stale_sessions(DAY)
+    assert result.pager() is None
+    assert result.expired
+    assert result.pager() is None
+
+
+def test_touch_without_spills_is_a_no_op():
+    ConversationHistory("never-spilled").touch()
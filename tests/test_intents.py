@@ -0,0 +1,75 @@
+from datetime import date
+
+import pytest
+
+from cloud_roasters.intents import IntentRouter
+
+TODAY = date(2026, 3, 18)
+
+
+@pytest.fixture
+def router():
+    return IntentRouter(threshold=0.8)
+
+
+def route(router, question):
+    return router.route(question, today=TODAY)
+
+
+def test_latest_batch_at_store(router):
+    match = route(router, "Show me the latest batch from Coogee")
+    assert match.route == "latest_batch_at_store"
+    assert match.params == ("Coogee Store",)
+    assert match.sql.endswith("LIMIT 1")
+
+
+def test_latest_n_batches(router):
+    assert route(router, "last 5 batches at Bondi").sql.endswith("LIMIT 5")
+
+
+def test_origin_batches_in_period(router):
+    match = route(router, "Kenyan batches from the last 30 days")
+    assert match.route == "origin_batches_in_period"
+    assert match.params == ("Kenya", date(2026, 2, 16))
+    assert route(router, "Brazil roasts this month").params == ("Brazil", date(2026, 3, 1))
+
+
+def test_average_metric_for_roast_level(router):
+    match = route(router, "average weight loss for light roasts")
+    assert match.route == "average_metric_for_roast_level"
+    assert match.params == ("Light",)
+    assert 'AVG("WEIGHT_LOSS")' in match.sql
+
+
+@pytest.mark.parametrize("question", [
+    # A period is never read as a batch count.
+    "show batches from Bondi in the last 7 days",
+    "Bondi batches over the past 2 weeks",
+    # Templates without a date filter can't answer time-bounded questions.
+    "average weight loss for light roasts this month",
+    "latest batch from Coogee today",
+    "latest batch from Coogee yesterday",
+    "average moisture for dark roasts in 2025",
+    "average weight loss for medium roasts since January",
+    # Filters the templates don't express.
+    "latest batches at Bondi with weight loss above 15",
+    "average weight loss for light roasts and dark roasts",
+    "Kenyan batches from today and yesterday",
+])
+def test_questions_the_templates_cannot_answer_go_to_the_llm(router, question):
+    assert route(router, question) is None
+
+
+def test_unrecognized_questions_fall_back(router):
+    assert route(router, "What goes well with an Ethiopian roast?") is None
+
+
+def test_stats(router):
+    route(router, "Show me the latest batch from Coogee")
+    route(router, "latest batch from Coogee today")
+    route(router, "What pairs with a dark roast?")
+    stats = router.stats()
+    assert stats["routes"] == {"latest_batch_at_store": 1}
+    assert stats["low_confidence"] == 1
+    assert stats["fallbacks"] == 1
+    assert stats["hit_rate"] == pytest.approx(0.333)
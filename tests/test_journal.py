@@ -0,0 +1,124 @@
+import snowflake.connector.errors as sf_errors
+
+from cloud_roasters import reports
+from cloud_roasters.journal import JournalFlusher, RecordJournal, is_record_error
+
+
+def make_journal(tmp_path, count):
+    journal = RecordJournal(tmp_path / "journal.sqlite3")
+    for batch_id in range(1, count + 1):
+        journal.append({"BATCH_ID": batch_id})
+    return journal
+
+
+def drain(flusher, rounds=50):
+    for _ in range(rounds):
+        try:
+            if not flusher.flush_once() and not flusher.journal.depth():
+                return
+        except Exception:
+            pass
+
+
+def test_poison_record_is_dead_lettered_and_the_rest_land(tmp_path):
+    journal = make_journal(tmp_path, 10)
+    written = []
+
+    def write_batch(records):
+        if any(record["BATCH_ID"] == 4 for record in records):
+            raise ValueError("Numeric value 'abc' is not recognized")
+        written.extend(record["BATCH_ID"] for record in records)
+
+    flusher = JournalFlusher(journal, write_batch, batch_size=8, max_attempts=3)
+    drain(flusher)
+
+    assert sorted(written) == [1, 2, 3, 5, 6, 7, 8, 9, 10]
+    assert journal.depth() == 0
+    [(entry_id, record, attempts, error, _)] = journal.dead_letters()
+    assert record == {"BATCH_ID": 4}
+    assert attempts == 3
+    assert "not recognized" in error
+    assert flusher.dead_lettered == 1
+
+
+def test_batch_failures_do_not_count_towards_dead_lettering(tmp_path):
+    journal = make_journal(tmp_path, 4)
+    calls = []
+
+    def write_batch(records):
+        calls.append(len(records))
+        if len(calls) <= 2:
+            raise sf_errors.ProgrammingError(msg="Numeric value 'abc' is not recognized", sqlstate="22018")
+
+    flusher = JournalFlusher(journal, write_batch, batch_size=4, max_attempts=1)
+    drain(flusher)
+
+    assert calls[:3] == [4, 2, 1]
+    assert journal.dead_letter_count() == 0
+    assert journal.depth() == 0
+
+
+def test_outage_longer_than_max_attempts_dead_letters_nothing(tmp_path):
+    journal = make_journal(tmp_path, 10)
+    calls = []
+    written = []
+    outage = [
+        ConnectionError("warehouse unavailable"),
+        TimeoutError("read timed out"),
+        sf_errors.OperationalError(msg="Failed to connect to DB"),
+    ]
+
+    def write_batch(records):
+        calls.append(len(records))
+        if len(calls) <= 25:
+            raise outage[len(calls) % len(outage)]
+        written.extend(record["BATCH_ID"] for record in records)
+
+    flusher = JournalFlusher(journal, write_batch, batch_size=8, max_attempts=3)
+    drain(flusher, rounds=40)
+
+    # The batch is neither halved nor charged to any record during the outage.
+    assert set(calls[:25]) == {8}
+    assert sorted(written) == list(range(1, 11))
+    assert journal.dead_letter_count() == 0
+    assert flusher.dead_lettered == 0
+
+
+def test_is_record_error():
+    assert is_record_error(ValueError("bad date"))
+    assert is_record_error(sf_errors.IntegrityError(msg="NULL result in a non-nullable column"))
+    assert is_record_error(sf_errors.ProgrammingError(msg="Numeric value 'abc' is not recognized", sqlstate="22018"))
+    assert not is_record_error(sf_errors.ProgrammingError(msg="Object does not exist", sqlstate="42S02"))
+    assert not is_record_error(sf_errors.OperationalError(msg="Failed to connect to DB"))
+    assert not is_record_error(ConnectionError("warehouse unavailable"))
+    assert not is_record_error(TimeoutError("read timed out"))
+
+
+def test_requeued_dead_letters_are_written(tmp_path):
+    journal = make_journal(tmp_path, 2)
+    broken = {2}
+
+    def write_batch(records):
+        if any(record["BATCH_ID"] in broken for record in records):
+            raise ValueError("constraint violated")
+
+    flusher = JournalFlusher(journal, write_batch, batch_size=2, max_attempts=1)
+    drain(flusher)
+    assert journal.dead_letter_count() == 1
+
+    broken.clear()
+    assert journal.requeue_dead_letters() == 1
+    drain(flusher)
+    assert journal.dead_letter_count() == 0
+    assert journal.depth() == 0
+
+
+def test_failing_write_listener_does_not_fail_the_write(monkeypatch):
+    seen = []
+
+    def broken_listener(written):
+        raise RuntimeError("listener failed")
+
+    monkeypatch.setattr(reports, "_write_listeners", [broken_listener, seen.append])
+    reports._notify_listeners([{"BATCH_ID": 1}])
+    assert seen == [[{"BATCH_ID": 1}]]
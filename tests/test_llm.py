@@ -0,0 +1,75 @@
+import socket
+
+import pytest
+
+from benchmarks.mock_mistral import PROSE_ANSWER, SQL_ANSWER, MockMistral
+from cloud_roasters.llm import LLMError, MistralClient, split_sql_stream
+
+
+@pytest.fixture
+def mistral():
+    server = MockMistral(first_token_latency=0, chunk_delay=0).start()
+    yield server
+    server.stop()
+
+
+def client_for(base_url, **kwargs):
+    return MistralClient("test-key", base_url=base_url, backoff=0.01, **kwargs)
+
+
+def ask(question):
+    return [{"role": "system", "content": "rules"}, {"role": "user", "content": question}]
+
+
+def test_stream_yields_deltas_and_reports_usage(mistral):
+    usage = []
+    chunks = list(client_for(mistral.base_url).stream(ask("How many batches?"), "mistral-small", on_usage=usage.append))
+    assert len(chunks) > 1
+    assert "".join(chunks) == SQL_ANSWER
+    assert usage and usage[0]["completion_tokens"] == len(SQL_ANSWER) // 4
+
+
+def test_session_is_reused_across_requests(mistral):
+    client = client_for(mistral.base_url)
+    for _ in range(3):
+        list(client.stream(ask("What pairs with a light roast?"), "mistral-small"))
+    adapter = client.session.get_adapter(mistral.base_url)
+    assert mistral.requests == 3
+    assert len(adapter.poolmanager.pools) == 1
+
+
+def test_retryable_statuses_are_retried(mistral):
+    mistral.fail_next(429, 503)
+    chunks = client_for(mistral.base_url, max_retries=2).stream(ask("What pairs with a light roast?"), "mistral-small")
+    assert "".join(chunks) == PROSE_ANSWER
+    assert mistral.requests == 3
+
+
+def test_retries_give_up_after_max_retries(mistral):
+    mistral.fail_next(503, 503, 503)
+    with pytest.raises(LLMError, match="after 2 attempt"):
+        list(client_for(mistral.base_url, max_retries=1).stream(ask("q"), "mistral-small"))
+    assert mistral.requests == 2
+
+
+def test_client_errors_are_not_retried(mistral):
+    mistral.fail_next(401)
+    with pytest.raises(LLMError, match="401"):
+        list(client_for(mistral.base_url).stream(ask("q"), "mistral-small"))
+    assert mistral.requests == 1
+
+
+def test_connection_failures_are_retried_then_raised():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    client = client_for(f"http://127.0.0.1:{port}", max_retries=1, connect_timeout=0.5)
+    with pytest.raises(LLMError, match="after 2 attempt"):
+        list(client.stream(ask("q"), "mistral-small"))
+
+
+def test_split_sql_stream_tells_sql_from_prose():
+    is_sql, chunks = split_sql_stream(iter(["  SEL", "ECT 1", " FROM t"]))
+    assert is_sql and "".join(chunks) == "  SELECT 1 FROM t"
+    is_sql, chunks = split_sql_stream(iter(["A washed ", "Ethiopian"]))
+    assert not is_sql and "".join(chunks) == "A washed Ethiopian"
@@ -0,0 +1,77 @@
+from cloud_roasters import llm_cache
+from cloud_roasters.llm_cache import AnswerCache, answer_key
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_ignores_case_whitespace_and_trailing_punctuation():
+    assert answer_key("How many batches per roastery?", "2:abc", "mistral-small") == answer_key(
+        "  how many   BATCHES per roastery ", "2:abc", "mistral-small"
+    )
+    assert answer_key("How many batches?", "2:abc", "mistral-small") != answer_key(
+        "How many roasts?", "2:abc", "mistral-small"
+    )
+
+
+def test_prompt_version_and_model_change_the_key(tmp_path):
+    cache = AnswerCache(tmp_path / "answers.sqlite3")
+    question = "Average weight loss by roast level"
+    cache.put(answer_key(question, "2:abc", "mistral-small"), question, "SELECT 1")
+
+    assert cache.get(answer_key(question, "2:abc", "mistral-small")) == "SELECT 1"
+    assert cache.get(answer_key(question, "3:abc", "mistral-small")) is None
+    assert cache.get(answer_key(question, "2:def", "mistral-small")) is None
+    assert cache.get(answer_key(question, "2:abc", "mistral-large")) is None
+
+
+def test_entries_survive_a_restart(tmp_path):
+    key = answer_key("q", "1", "m")
+    AnswerCache(tmp_path / "answers.sqlite3").put(key, "q", "answer")
+    assert AnswerCache(tmp_path / "answers.sqlite3").get(key) == "answer"
+
+
+def test_expired_entries_miss_and_are_removed(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    cache = AnswerCache(tmp_path / "answers.sqlite3", ttl=60)
+    key = answer_key("q", "1", "m")
+    cache.put(key, "q", "answer")
+
+    clock.now += 59
+    assert cache.get(key) == "answer"
+    clock.now += 2
+    assert cache.get(key) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    cache = AnswerCache(tmp_path / "answers.sqlite3", max_entries=2)
+    keys = [answer_key(f"q{index}", "1", "m") for index in range(3)]
+    for index, key in enumerate(keys[:2]):
+        clock.now += 1
+        cache.put(key, f"q{index}", f"a{index}")
+    clock.now += 1
+    cache.get(keys[0])
+    clock.now += 1
+    cache.put(keys[2], "q2", "a2")
+
+    assert cache.get(keys[0]) == "a0"
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) == "a2"
+
+
+def test_stats_count_hits_and_misses(tmp_path):
+    cache = AnswerCache(tmp_path / "answers.sqlite3")
+    key = answer_key("q", "1", "m")
+    cache.get(key)
+    cache.put(key, "q", "answer")
+    cache.get(key)
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1, "hit_rate": 0.5}
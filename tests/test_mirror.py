@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from cloud_roasters.mirror import LocalMirror
+from cloud_roasters.reports import REPORT_COLUMNS
+
+START = datetime(2026, 3, 1, 9, 0)
+
+
+def report(batch_id, submitted, roastery="Coogee"):
+    row = dict.fromkeys(REPORT_COLUMNS)
+    row.update(BATCH_ID=batch_id, ROASTERY=roastery, SUBMISSION_TIMESTAMP=submitted)
+    return row
+
+
+class Upstream:
+    # In-memory ROASTING_REPORTS behind the mirror's source callable.
+    def __init__(self, rows):
+        self.rows = {row["BATCH_ID"]: row for row in rows}
+        self.calls = []
+
+    def put(self, row):
+        self.rows[row["BATCH_ID"]] = row
+
+    def __call__(self, since, after_batch_id):
+        self.calls.append(since)
+        rows = [
+            row for row in self.rows.values()
+            if since is None or row["SUBMISSION_TIMESTAMP"] >= since or row["BATCH_ID"] > after_batch_id
+        ]
+        return pd.DataFrame(rows, columns=list(REPORT_COLUMNS)), len(self.rows)
+
+
+@pytest.fixture
+def upstream():
+    return Upstream([report(batch_id, START + timedelta(days=batch_id)) for batch_id in range(1, 6)])
+
+
+@pytest.fixture
+def mirror(tmp_path, upstream):
+    return LocalMirror(tmp_path / "mirror.duckdb", upstream, lookback=timedelta(hours=1))
+
+
+def roastery(mirror, batch_id):
+    return mirror.query('SELECT "ROASTERY" FROM ROASTING_REPORTS WHERE "BATCH_ID" = %s', (batch_id,))["ROASTERY"][0]
+
+
+def test_first_sync_is_full(mirror, upstream):
+    assert mirror.sync() == 5
+    assert upstream.calls == [None]
+    assert mirror.is_fresh()
+    assert len(mirror.query("SELECT * FROM ROASTING_REPORTS")) == 5
+
+
+def test_incremental_sync_pulls_only_new_rows(mirror, upstream):
+    mirror.sync()
+    upstream.put(report(6, START + timedelta(days=6)))
+    # Only the lookback window and the new batch come back.
+    assert mirror.sync() == 2
+    assert upstream.calls[-1] == START + timedelta(days=5) - timedelta(hours=1)
+    assert len(mirror.query("SELECT * FROM ROASTING_REPORTS")) == 6
+
+
+def test_replaced_row_with_fresh_timestamp_is_pulled(mirror, upstream):
+    mirror.sync()
+    upstream.put(report(2, START + timedelta(days=7), roastery="Bondi"))
+    mirror.sync()
+    assert roastery(mirror, 2) == "Bondi"
+
+
+def test_replaced_row_outside_window_needs_the_bulk_load_listener(mirror, upstream):
+    mirror.sync()
+    # Replaced in place with its old timestamp: same count, same max BATCH_ID.
+    upstream.put(report(2, START + timedelta(days=2), roastery="Bondi"))
+    mirror.sync()
+    assert roastery(mirror, 2) == "Coogee"
+
+    mirror.request_sync(pd.DataFrame([upstream.rows[2]]))
+    mirror.sync()
+    assert upstream.calls[-1] is None
+    assert roastery(mirror, 2) == "Bondi"
+    # Only the sync after the bulk load is a full refresh.
+    mirror.sync()
+    assert upstream.calls[-1] is not None
+
+
+def test_single_writes_keep_syncs_incremental(mirror, upstream):
+    mirror.sync()
+    mirror.request_sync([report(6, START + timedelta(days=6))])
+    mirror.sync()
+    assert upstream.calls[-1] is not None
+
+
+def test_failed_full_refresh_is_retried(mirror, upstream):
+    mirror.sync()
+    mirror.request_sync(pd.DataFrame([upstream.rows[1]]))
+
+    def unreachable(since, after_batch_id):
+        raise ConnectionError("Snowflake is unreachable")
+
+    mirror.source = unreachable
+    with pytest.raises(ConnectionError):
+        mirror.sync()
+    mirror.source = upstream
+    mirror.sync()
+    assert upstream.calls[-1] is None
+
+
+def test_count_mismatch_falls_back_to_full_refresh(mirror, upstream):
+    mirror.sync()
+    del upstream.rows[3]
+    mirror.sync()
+    assert upstream.calls[-1] is None
+    assert len(mirror.query("SELECT * FROM ROASTING_REPORTS")) == 4
@@ -0,0 +1,159 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from cloud_roasters.pool import ConnectionPool, PoolTimeoutError
+
+
+class FlakyConnection:
+    # sqlite3 connection whose session can be "dropped" like a Snowflake one.
+    def __init__(self):
+        self.inner = sqlite3.connect(":memory:", check_same_thread=False)
+        self.dropped = False
+        self.closed = False
+
+    def cursor(self):
+        if self.dropped:
+            raise sqlite3.OperationalError("session expired")
+        return self.inner.cursor()
+
+    def rollback(self):
+        if self.dropped:
+            raise sqlite3.OperationalError("session expired")
+        self.inner.rollback()
+
+    def is_closed(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+        self.inner.close()
+
+
+def make_pool(**kwargs):
+    opened = []
+
+    def connect():
+        conn = FlakyConnection()
+        opened.append(conn)
+        return conn
+
+    return ConnectionPool(connect, **kwargs), opened
+
+
+def test_checkout_reuses_idle_connection():
+    pool, opened = make_pool()
+    with pool.connection() as first:
+        first.cursor().execute("SELECT 1")
+    with pool.connection() as second:
+        pass
+    assert first is second
+    assert len(opened) == 1
+    stats = pool.stats.snapshot()
+    assert (stats["created"], stats["reused"], stats["checkouts"]) == (1, 1, 2)
+    assert pool.size == 1 and pool.idle_count == 1
+
+
+def test_checkout_times_out_when_pool_is_exhausted():
+    pool, _ = make_pool(max_size=1, checkout_timeout=0.05)
+    with pool.connection():
+        with pytest.raises(PoolTimeoutError):
+            with pool.connection():
+                pass
+    assert pool.size == 1
+
+
+def test_waiter_gets_released_connection():
+    pool, opened = make_pool(max_size=1, checkout_timeout=5)
+    got = []
+
+    def wait_for_connection():
+        with pool.connection() as conn:
+            got.append(conn)
+
+    with pool.connection() as held:
+        waiter = threading.Thread(target=wait_for_connection)
+        waiter.start()
+        time.sleep(0.05)
+        assert not got
+    waiter.join(1)
+    assert got == [held]
+    assert len(opened) == 1
+
+
+def test_failed_health_check_reconnects_in_place():
+    pool, opened = make_pool(max_size=1, health_check_interval=0)
+    with pool.connection() as first:
+        pass
+    first.dropped = True
+    with pool.connection() as second:
+        second.cursor().execute("SELECT 1")
+    assert second is not first
+    assert first.closed
+    assert pool.stats.snapshot()["health_failures"] == 1
+    assert pool.size == 1
+
+
+def test_health_check_skipped_within_interval():
+    pool, _ = make_pool(health_check_interval=60)
+    with pool.connection() as first:
+        pass
+    first.dropped = True
+    with pool.connection() as second:
+        pass
+    assert second is first
+
+
+def test_closed_connection_is_replaced():
+    pool, opened = make_pool(health_check_interval=60)
+    with pool.connection() as first:
+        pass
+    first.closed = True
+    with pool.connection() as second:
+        pass
+    assert second is not first
+    assert len(opened) == 2
+
+
+def test_broken_connection_is_discarded_after_error():
+    pool, _ = make_pool()
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            conn.dropped = True
+            raise RuntimeError("query failed")
+    assert conn.closed
+    assert pool.size == 0
+    assert pool.stats.snapshot()["discarded"] == 1
+
+
+def test_healthy_connection_survives_error():
+    pool, _ = make_pool()
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            raise RuntimeError("query failed")
+    assert not conn.closed
+    assert pool.idle_count == 1
+
+
+def test_idle_connections_are_evicted():
+    pool, opened = make_pool(idle_timeout=0.01)
+    with pool.connection() as first:
+        pass
+    time.sleep(0.05)
+    with pool.connection() as second:
+        pass
+    assert second is not first
+    assert first.closed
+    assert pool.stats.snapshot()["evicted"] == 1
+    assert pool.size == 1
+
+
+def test_close_all_releases_idle_slots():
+    pool, opened = make_pool()
+    with pool.connection():
+        pass
+    pool.close_all()
+    assert pool.size == 0
+    assert all(conn.closed for conn in opened)
@@ -0,0 +1,94 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from cloud_roasters import query_cache
+from cloud_roasters.query_cache import QueryResultCache
+
+SQL = 'SELECT "ROASTERY", COUNT(*) FROM ROASTING_REPORTS GROUP BY 1'
+
+
+class Watermarked:
+    # sqlite3 table whose watermark query stands in for Snowflake metadata.
+    def __init__(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute('CREATE TABLE ROASTING_REPORTS ("BATCH_ID" INTEGER PRIMARY KEY, "SUBMISSION_TIMESTAMP" TEXT)')
+        self.conn.execute("INSERT INTO ROASTING_REPORTS VALUES (1, '2026-01-01 10:00:00')")
+
+    def cursor(self):
+        return Cursor(self.conn.cursor())
+
+
+class Cursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __enter__(self):
+        return self.cursor
+
+    def __exit__(self, *exc_info):
+        self.cursor.close()
+
+
+def test_entry_served_until_the_watermark_moves():
+    table = Watermarked()
+    cache = QueryResultCache(watermark_ttl=0)
+    cache.put(SQL, cache.watermark(table), pd.DataFrame({"BATCHES": [1]}))
+    assert cache.get(SQL + " ;", cache.watermark(table)) is not None
+
+    table.conn.execute("INSERT INTO ROASTING_REPORTS VALUES (2, '2026-01-01 11:00:00')")
+    assert cache.get(SQL, cache.watermark(table)) is None
+
+
+def test_local_write_invalidates_an_in_place_replacement():
+    table = Watermarked()
+    cache = QueryResultCache(watermark_ttl=60)
+    cache.put(SQL, cache.watermark(table), pd.DataFrame({"BATCHES": [1]}))
+
+    # Same row count, max BATCH_ID and max SUBMISSION_TIMESTAMP.
+    table.conn.execute("UPDATE ROASTING_REPORTS SET \"SUBMISSION_TIMESTAMP\" = '2026-01-01 10:00:00'")
+    cache.invalidate([{"BATCH_ID": 1}])
+    assert cache.get(SQL, cache.watermark(table)) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_result_of_a_query_running_across_a_write_is_not_served():
+    table = Watermarked()
+    cache = QueryResultCache(watermark_ttl=60)
+    started_with = cache.watermark(table)
+    cache.invalidate([{"BATCH_ID": 1}])
+    cache.put(SQL, started_with, pd.DataFrame({"BATCHES": [1]}))
+    assert cache.get(SQL, cache.watermark(table)) is None
+
+
+def test_current_date_queries_are_keyed_on_the_sydney_date(monkeypatch):
+    table = Watermarked()
+    cache = QueryResultCache(watermark_ttl=60)
+    sql = 'SELECT * FROM ROASTING_REPORTS WHERE "ROAST_DATE" >= DATEADD(day, -1, CURRENT_DATE())'
+    monkeypatch.setattr(query_cache, "sydney_now", lambda: pd.Timestamp("2026-03-18 23:59:00"))
+    assert cache.put(sql, cache.watermark(table), pd.DataFrame({"BATCH_ID": [1]}))
+    assert cache.get(sql, cache.watermark(table)) is not None
+
+    # Same watermark, but it is tomorrow now.
+    monkeypatch.setattr(query_cache, "sydney_now", lambda: pd.Timestamp("2026-03-19 00:01:00"))
+    assert cache.get(sql, cache.watermark(table)) is None
+
+
+@pytest.mark.parametrize("sql", [
+    'SELECT * FROM ROASTING_REPORTS WHERE "SUBMISSION_TIMESTAMP" >= DATEADD(hour, -1, CURRENT_TIMESTAMP())',
+    "SELECT SYSDATE()",
+    "SELECT CURRENT_TIME()",
+])
+def test_time_of_day_queries_are_not_cached(sql):
+    table = Watermarked()
+    cache = QueryResultCache(watermark_ttl=60)
+    assert not cache.put(sql, cache.watermark(table), pd.DataFrame({"BATCH_ID": [1]}))
+    assert cache.get(sql, cache.watermark(table)) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_clock_dependence():
+    assert query_cache.clock_dependence(SQL) is None
+    assert query_cache.clock_dependence("SELECT CURRENT_DATE") == "date"
+    assert query_cache.clock_dependence("SELECT NOW()") == "time"
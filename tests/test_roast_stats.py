@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cloud_roasters.roast_stats import MARKERS, MetricStats, P2Quantiles, RoastStats
+
+GROUP = ("Ethiopia", "Light")
+
+
+def summary(values):
+    values = np.asarray(values, dtype=float)
+    return len(values), values.mean(), values.var(ddof=1) if len(values) > 1 else None, np.quantile(values, MARKERS)
+
+
+def history(values, group=GROUP):
+    count, mean, variance, heights = summary(values)
+    return [(*group, "WEIGHT_LOSS", count, mean, variance, list(heights))]
+
+
+def record(weight_loss, group=GROUP):
+    return {"ORIGIN": group[0], "ROAST_LEVEL": group[1], "WEIGHT_LOSS": weight_loss}
+
+
+@pytest.mark.parametrize("distribution", ["normal", "exponential", "uniform"])
+def test_p2_tracks_numpy_quantiles(distribution):
+    rng = np.random.default_rng(7)
+    values = getattr(rng, distribution)(size=20_000)
+    quantiles = P2Quantiles()
+    for value in values:
+        quantiles.add(float(value))
+    spread = np.quantile(values, 0.975) - np.quantile(values, 0.025)
+    for probability in MARKERS[1:-1]:
+        assert quantiles.quantile(probability) == pytest.approx(np.quantile(values, probability), abs=0.02 * spread)
+    assert quantiles.heights[0] == values.min()
+    assert quantiles.heights[-1] == values.max()
+
+
+def test_welford_continues_a_seeded_summary():
+    rng = np.random.default_rng(11)
+    seeded, added = rng.normal(15, 2, 500), rng.normal(16, 3, 300)
+    stats = MetricStats.from_summary(*summary(seeded))
+    for value in added:
+        stats.add(float(value))
+    combined = np.concatenate([seeded, added])
+    assert stats.count == len(combined)
+    assert stats.mean == pytest.approx(combined.mean())
+    assert stats.std == pytest.approx(combined.std(ddof=1))
+    assert stats.quantiles.count == len(combined)
+    assert stats.quantiles.quantile(0.5) == pytest.approx(np.median(combined), abs=0.3)
+
+
+@pytest.mark.parametrize("count", [1, 3, 6])
+def test_small_groups_are_seeded_consistently(count):
+    seeded = [14.0, 15.0, 16.0, 13.0, 17.0, 15.5][:count]
+    stats = MetricStats.from_summary(*summary(seeded))
+    assert stats.quantiles.count == stats.count == count
+    assert stats.quantiles.heights == sorted(stats.quantiles.heights)
+    assert min(seeded) == stats.quantiles.heights[0]
+    for value in (12.0, 18.0, 15.2, 14.1, 16.3, 15.9, 14.7):
+        stats.add(value)
+    assert stats.quantiles.count == stats.count == count + 7
+    assert stats.quantiles.ready
+    # The seeded range is kept rather than rebuilt from new observations only.
+    assert stats.quantiles.heights[0] == 12.0 and stats.quantiles.heights[-1] == 18.0
+
+
+def test_scores_flag_outliers_once_there_is_enough_history():
+    rng = np.random.default_rng(3)
+    store = RoastStats(lambda: history(rng.normal(15, 1, 200)), min_samples=10, z_threshold=3.0)
+    store.rebuild()
+
+    typical = store.score(record(15.2))
+    assert not typical.flagged
+    assert typical.score < 1
+    [check] = typical.checks
+    assert check.enough_history and check.low < 15.2 < check.high
+
+    outlier = store.score(record(21.0))
+    assert [check.metric for check in outlier.flagged] == ["WEIGHT_LOSS"]
+    assert outlier.score > 3
+
+
+def test_min_samples():
+    store = RoastStats(lambda: history([15.0, 15.5, 14.5]), min_samples=10)
+    store.rebuild()
+    report = store.score(record(30.0))
+    assert report.score is None and not report.flagged
+    assert report.checks[0].count == 3 and not report.checks[0].enough_history
+
+    # Unknown groups have no history at all.
+    assert store.score(record(15.0, group=("Kenya", "Dark"))).checks[0].count == 0
+
+
+def test_observations_during_a_rebuild_are_kept():
+    def load_history():
+        # A report is written while the rebuild is still reading history.
+        store.observe([record(40.0)])
+        return history([15.0] * 20)
+
+    store = RoastStats(load_history, min_samples=10)
+    store.rebuild()
+    stats = store._groups[GROUP]["WEIGHT_LOSS"]
+    assert stats.count == 21
+    assert stats.quantiles.heights[-1] == 40.0
+
+
+def test_bulk_load_during_a_rebuild_keeps_the_store_stale():
+    def load_history():
+        store.observe(pd.DataFrame([record(15.0)]))
+        return history([15.0] * 20)
+
+    store = RoastStats(load_history)
+    store.rebuild()
+    assert store._stale
@@ -0,0 +1,108 @@
+import pytest
+
+from cloud_roasters.sql_guard import SQLGuardError, guard_sql, split_statements
+
+DATABASE, SCHEMA = "ROASTING", "PUBLIC"
+
+ACCEPTED = [
+    'SELECT "ROASTERY", COUNT(*) AS BATCHES, AVG("WEIGHT_LOSS") AS AVG_WEIGHT_LOSS '
+    'FROM ROASTING_REPORTS GROUP BY "ROASTERY" ORDER BY BATCHES DESC',
+    "SELECT * FROM ROASTING_REPORTS WHERE ROASTERY ILIKE '%coogee%' ORDER BY SUBMISSION_TIMESTAMP DESC LIMIT 1",
+    "SELECT ROAST_LEVEL, ROUND(AVG(WEIGHT_LOSS), 2) FROM ROASTING_REPORTS "
+    "WHERE ROAST_DATE >= DATEADD(day, -30, CURRENT_DATE()) AND ORIGIN IN ('Brazil', 'Colombia') "
+    "GROUP BY ROAST_LEVEL HAVING COUNT(*) > 3",
+    "SELECT DATE_TRUNC('month', ROAST_DATE) AS MONTH, MEDIAN(ROAST_DURATION_MINS), STDDEV(WEIGHT_LOSS) "
+    "FROM ROASTING_REPORTS GROUP BY 1",
+    "SELECT ROASTERY, BATCH_ID, ROW_NUMBER() OVER (PARTITION BY ROASTERY ORDER BY ROAST_DATE DESC) AS RN "
+    "FROM ROASTING_REPORTS QUALIFY RN = 1",
+    "SELECT CASE WHEN WEIGHT_LOSS > 15 THEN 'high' ELSE 'normal' END AS BAND, COUNT(*) FROM ROASTING_REPORTS GROUP BY 1",
+    "SELECT IFF(COUNT(*) > 0, 1, 0), COALESCE(MAX(ROAST_NOTES), ''), UPPER(MIN(ORIGIN)) FROM ROASTING_REPORTS",
+    "WITH latest AS (SELECT ROASTERY, MAX(ROAST_DATE) AS D FROM ROASTING_REPORTS GROUP BY ROASTERY) "
+    "SELECT r.* FROM ROASTING_REPORTS r JOIN latest l ON r.ROASTERY = l.ROASTERY AND r.ROAST_DATE = l.D",
+    "SELECT * FROM ROASTING_REPORTS a JOIN ROASTING_REPORTS b USING (BATCH_ID)",
+    "SELECT * FROM (SELECT ROASTERY, COUNT(*) AS N FROM ROASTING_REPORTS GROUP BY 1) s WHERE s.N > 2",
+    "SELECT * FROM PUBLIC.ROASTING_REPORTS",
+    "SELECT * FROM roasting.public.roasting_reports",
+    # Aliases in the clauses that come after the select list.
+    "SELECT ROASTERY, COUNT(*) AS N FROM ROASTING_REPORTS GROUP BY ROASTERY HAVING N > 3 ORDER BY N DESC",
+    "SELECT DATE_TRUNC('month', ROAST_DATE) AS MONTH, COUNT(*) FROM ROASTING_REPORTS GROUP BY MONTH",
+    # Subquery and CTE output columns, and correlated references.
+    "SELECT s.N, N FROM (SELECT COUNT(*) AS N FROM ROASTING_REPORTS) s",
+    "WITH t(R, N) AS (SELECT ROASTERY, COUNT(*) FROM ROASTING_REPORTS GROUP BY 1) SELECT R, N FROM t",
+    "SELECT * FROM ROASTING_REPORTS a WHERE WEIGHT_LOSS > "
+    "(SELECT AVG(b.WEIGHT_LOSS) FROM ROASTING_REPORTS b WHERE b.ORIGIN = a.ORIGIN)",
+    "SELECT * FROM ROASTING_REPORTS a JOIN ROASTING_REPORTS b ON a.BEAN_CODE = b.BEAN_CODE AND a.BATCH_ID <> b.BATCH_ID",
+]
+
+REJECTED = [
+    ("UPDATE ROASTING_REPORTS SET WEIGHT_LOSS = 0", "read-only"),
+    ("SELECT 1; SELECT 2", "single SQL statement"),
+    ("SELECT * FROM SCHEMA_MIGRATIONS", "not available"),
+    ("SELECT PASSWORD FROM ROASTING_REPORTS", "Unknown column"),
+    # Side effects and unbounded waits.
+    ("SELECT SYSTEM$CANCEL_ALL_QUERIES(1)", "Function SYSTEM$CANCEL_ALL_QUERIES"),
+    ("SELECT SYSTEM$WAIT(300)", "Function SYSTEM$WAIT"),
+    ("SELECT CURRENT_USER()", "Function CURRENT_USER"),
+    # Table functions: other sessions' results and unbounded row generators.
+    ("SELECT * FROM TABLE(RESULT_SCAN(LAST_QUERY_ID()))", "not available"),
+    ("SELECT * FROM TABLE(GENERATOR(ROWCOUNT => 1000000000))", "not available"),
+    ("SELECT * FROM ROASTING_REPORTS, LATERAL FLATTEN(input => ROAST_NOTES)", "not available"),
+    ("SELECT * FROM VALUES (1), (2)", "not table functions"),
+    ("SELECT * FROM IDENTIFIER('ROASTING_REPORTS')", "not available"),
+    ("SELECT * FROM @reports_stage", "not available"),
+    # Same table name elsewhere.
+    ("SELECT * FROM OTHERDB.PUBLIC.ROASTING_REPORTS", "current database and schema"),
+    ("SELECT * FROM STAGING.ROASTING_REPORTS", "current database and schema"),
+    # Cross joins, however they are spelled.
+    ("SELECT * FROM ROASTING_REPORTS a, ROASTING_REPORTS b", "cross joins"),
+    ("SELECT * FROM ROASTING_REPORTS a JOIN ROASTING_REPORTS b ON 1=1", "cross joins"),
+    ("SELECT * FROM ROASTING_REPORTS a JOIN ROASTING_REPORTS b ON TRUE", "cross joins"),
+    ("SELECT * FROM ROASTING_REPORTS a JOIN ROASTING_REPORTS b ON a.BATCH_ID = b.BATCH_ID OR 1 = 1", "cross joins"),
+    ("SELECT * FROM ROASTING_REPORTS a JOIN ROASTING_REPORTS b ON a.BATCH_ID = a.BATCH_ID", "cross joins"),
+    ("SELECT * FROM ROASTING_REPORTS a JOIN ROASTING_REPORTS b ON a.BATCH_ID > 5", "cross joins"),
+    # Non-equi joins are nearly cross joins.
+    ("SELECT * FROM ROASTING_REPORTS a JOIN ROASTING_REPORTS b ON a.BATCH_ID <> b.BATCH_ID", "cross joins"),
+    ("SELECT * FROM ROASTING_REPORTS a JOIN ROASTING_REPORTS b ON a.BATCH_ID < b.BATCH_ID", "cross joins"),
+    ("SELECT * FROM ROASTING_REPORTS a JOIN ROASTING_REPORTS b ON a.BATCH_ID = b.BATCH_ID OR a.ORIGIN <> b.ORIGIN",
+     "cross joins"),
+    # An alias never vouches for the column it is defined from...
+    ("SELECT PASSWORD AS PASSWORD FROM ROASTING_REPORTS", "Unknown column PASSWORD"),
+    ("SELECT SECRET_COL AS X, X AS SECRET_COL FROM ROASTING_REPORTS", "Unknown column SECRET_COL"),
+    # ...nor for references in the select list or WHERE, which may read a real column of that name.
+    ("SELECT BATCH_ID AS SECRET_COL, SECRET_COL FROM ROASTING_REPORTS", "Unknown column SECRET_COL"),
+    ("SELECT BATCH_ID AS SECRET_COL FROM ROASTING_REPORTS WHERE SECRET_COL > 0", "Unknown column SECRET_COL"),
+    # ...nor outside its own scope.
+    ("SELECT SECRET FROM ROASTING_REPORTS WHERE BATCH_ID IN (SELECT BATCH_ID AS SECRET FROM ROASTING_REPORTS)",
+     "Unknown column SECRET"),
+    ("SELECT s.PASSWORD FROM (SELECT BATCH_ID FROM ROASTING_REPORTS) s", "Unknown column PASSWORD"),
+]
+
+
+@pytest.mark.parametrize("sql", ACCEPTED)
+def test_accepted(sql):
+    guard_sql(sql, database=DATABASE, schema=SCHEMA)
+
+
+@pytest.mark.parametrize("sql, reason", REJECTED)
+def test_rejected(sql, reason):
+    with pytest.raises(SQLGuardError, match=reason.replace("$", r"\$")):
+        guard_sql(sql, database=DATABASE, schema=SCHEMA)
+
+
+def test_qualified_table_rejected_without_known_connection():
+    with pytest.raises(SQLGuardError):
+        guard_sql("SELECT * FROM PUBLIC.ROASTING_REPORTS")
+
+
+def test_limit_is_added_or_lowered():
+    assert guard_sql("SELECT * FROM ROASTING_REPORTS", max_rows=50).endswith("LIMIT 50")
+    assert guard_sql("SELECT * FROM ROASTING_REPORTS LIMIT 10", max_rows=50).endswith("LIMIT 10")
+    assert guard_sql("SELECT * FROM ROASTING_REPORTS LIMIT 5000", max_rows=50).endswith("LIMIT 50")
+    assert guard_sql("SELECT * FROM ROASTING_REPORTS FETCH FIRST 5 ROWS ONLY", max_rows=50).endswith("LIMIT 5")
+    assert guard_sql("SELECT * FROM ROASTING_REPORTS FETCH FIRST 500 ROWS ONLY", max_rows=50).endswith("LIMIT 50")
+
+
+def test_split_statements():
+    assert len(split_statements("SELECT 1; SELECT 2")) == 2
+    with pytest.raises(SQLGuardError, match="At most 1"):
+        split_statements("SELECT 1; SELECT 2", max_statements=1)
@@ -0,0 +1,99 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from cloud_roasters.validation import compute_weight_loss, read_report_file, validate_frame, validate_record
+
+ROW = {
+    "ROASTERY": "Bondi Store",
+    "ROAST_DATE": "2026-03-18",
+    "BEAN_CODE": "ETH-YIRG-01",
+    "ORIGIN": "Ethiopia",
+    "ROAST_LEVEL": "Light",
+    "ROAST_DURATION_MINS": 12,
+    "FIRST_CRACK_TIME_MINS": 9,
+    "DEVELOPMENT_TIME_MINS": 3,
+    "GREEN_BEAN_WEIGHT_KG": 20.0,
+    "ROASTED_WEIGHT_KG": 17.0,
+}
+
+
+def frame(*overrides):
+    return pd.DataFrame([{**ROW, **override} for override in overrides])
+
+
+def test_valid_rows_are_cleaned():
+    valid, errors = validate_frame(frame({"ROAST_DURATION_MINS": 12.4}))
+    assert errors.empty
+    row = valid.iloc[0]
+    assert row["ROAST_DATE"] == date(2026, 3, 18)
+    assert row["ROAST_DURATION_MINS"] == 12
+    assert valid["ROAST_DURATION_MINS"].dtype == "int64"
+    assert row["WEIGHT_LOSS"] == 15.0
+    assert pd.isna(row["BATCH_ID"])
+    assert row["ROAST_NOTES"] == ""
+
+
+def test_column_names_are_normalized():
+    df = frame({}).rename(columns={"BEAN_CODE": " bean code "})
+    valid, errors = validate_frame(df)
+    assert errors.empty and len(valid) == 1
+
+
+def test_missing_columns():
+    valid, errors = validate_frame(frame({}).drop(columns=["ORIGIN", "ROAST_LEVEL"]))
+    assert valid.empty
+    assert errors["ERROR"].tolist() == ["Missing column(s): ORIGIN, ROAST_LEVEL"]
+
+
+@pytest.mark.parametrize("column, value, message", [
+    ("ROASTERY", None, "Roastery is required."),
+    ("ORIGIN", None, "Bean Origin is required."),
+    ("ROAST_LEVEL", " ", "Roast Level is required."),
+    ("BEAN_CODE", "", "Bean Name / Code is required."),
+    ("ROAST_DATE", "not a date", "Roast Date is missing or not a valid date."),
+    ("GREEN_BEAN_WEIGHT_KG", "abc", "Green Bean Weight must be greater than 0."),
+    ("ROASTED_WEIGHT_KG", -1, "Final Roasted Weight must be greater than 0."),
+    # Integer minutes are rounded before the check, not after.
+    ("ROAST_DURATION_MINS", 0.4, "Roast Duration must be greater than 0."),
+    ("DEVELOPMENT_TIME_MINS", 0, "Development Time must be greater than 0."),
+])
+def test_invalid_values_are_reported(column, value, message):
+    valid, errors = validate_frame(frame({}, {column: value}))
+    assert len(valid) == 1
+    assert errors.to_dict("records") == [{"ROW": 2, "ERROR": message}]
+
+
+def test_duplicate_batch_ids():
+    valid, errors = validate_frame(frame({"BATCH_ID": 7}, {"BATCH_ID": 7}, {"BATCH_ID": 8}, {}))
+    assert valid["BATCH_ID"].tolist()[0] == 8
+    assert len(valid) == 2
+    assert errors["ROW"].tolist() == [1, 2]
+    assert set(errors["ERROR"]) == {"BATCH_ID is duplicated in this file."}
+
+
+def test_timezone_aware_submission_timestamps_become_sydney_wall_clock():
+    valid, _ = validate_frame(frame({"SUBMISSION_TIMESTAMP": "2026-03-18T00:00:00Z"}))
+    assert valid["SUBMISSION_TIMESTAMP"][0] == pd.Timestamp("2026-03-18 11:00:00")
+
+
+def test_validate_record_matches_the_bulk_rules():
+    assert validate_record(ROW) == []
+    errors = validate_record({**ROW, "ORIGIN": None, "BEAN_CODE": "  ", "FIRST_CRACK_TIME_MINS": 0})
+    assert errors == [
+        "Bean Name / Code is required.",
+        "Bean Origin is required.",
+        "First Crack Time must be greater than 0.",
+    ]
+
+
+def test_compute_weight_loss():
+    assert compute_weight_loss(20.0, 17.0) == 15.0
+    assert compute_weight_loss(0, 0) == 0
+
+
+def test_read_report_file_csv_and_parquet():
+    df = frame({})
+    assert read_report_file("log.csv", df.to_csv(index=False).encode()).shape == df.shape
+    assert read_report_file("log.PARQUET", df.to_parquet()).shape == df.shape